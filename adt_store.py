@@ -0,0 +1,277 @@
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from vital_store import from_epoch_ms
+
+# Status event ADT (admission/discharge/transfer) sama dengan riwayat lokasi di dashboard
+ADMIT = 'Masuk'
+DISCHARGE = 'Keluar'
+# Batas kelas lama rawat (ms). Rawat yang selesai disimpan per kelas agar pencarian interval
+# hanya melihat rawat yang masuk setelah t1 - lama rawat terpanjang di kelas tersebut
+STAY_CLASSES = [60 * 60 * 1000, 24 * 60 * 60 * 1000, 7 * 24 * 60 * 60 * 1000]
+
+AdtEvent = namedtuple('AdtEvent', ['patient_id', 'unit', 'status', 'timestamp'])  # timestamp epoch ms
+Stay = namedtuple('Stay', ['unit', 'start', 'end'])  # rawat yang sudah selesai, epoch ms
+
+
+def to_ms(value):
+    # Timestamp (string, datetime atau epoch ms) ke epoch milidetik waktu lokal
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+class SortedStays:
+    # Rawat yang sudah selesai dalam satu kelas lama rawat, terurut menurut waktu masuk.
+    # Rawat yang tumpang tindih dengan [t1, t2] pasti masuk di antara t1 - max_length dan t2
+
+    def __init__(self):
+        self.start = np.empty(0, dtype='<i8')
+        self.end = np.empty(0, dtype='<i8')
+        self.patient = np.empty(0, dtype='<i4')
+        self.max_length = 0
+
+    def insert(self, start, end, patient):
+        i = int(np.searchsorted(self.start, start, side='right'))
+        self.start = np.insert(self.start, i, start)
+        self.end = np.insert(self.end, i, end)
+        self.patient = np.insert(self.patient, i, patient)
+        self.max_length = max(self.max_length, end - start)
+
+    def extend(self, start, end, patient):
+        # Tambah banyak rawat sekaligus (satu kali pengurutan)
+        start = np.concatenate([self.start, start])
+        order = np.argsort(start, kind='stable')
+        self.start = start[order]
+        self.end = np.concatenate([self.end, end])[order]
+        self.patient = np.concatenate([self.patient, patient])[order]
+        if len(self.start):
+            self.max_length = int((self.end - self.start).max())
+
+    def overlapping(self, t1, t2):
+        lo = int(np.searchsorted(self.start, t1 - self.max_length, side='left'))
+        hi = int(np.searchsorted(self.start, t2, side='right'))
+        return self.patient[lo:hi][self.end[lo:hi] > t1]
+
+
+class UnitIndex:
+    # Indeks interval satu unit: rawat selesai per kelas lama rawat, waktu masuk/keluar terurut
+    # untuk sensus di titik waktu mana pun, dan pasien yang masih dirawat
+
+    def __init__(self):
+        self.classes = [SortedStays() for _ in range(len(STAY_CLASSES) + 1)]
+        self.starts = np.empty(0, dtype='<i8')
+        self.ends = np.empty(0, dtype='<i8')
+        self.lengths = np.empty(0, dtype='<i8')
+        self.open = {}  # kode pasien -> waktu masuk
+
+    def close(self, patient, start, end):
+        self.classes[int(np.searchsorted(STAY_CLASSES, end - start, side='left'))].insert(start, end, patient)
+        self.starts = np.insert(self.starts, np.searchsorted(self.starts, start), start)
+        self.ends = np.insert(self.ends, np.searchsorted(self.ends, end), end)
+        self.lengths = np.append(self.lengths, end - start)
+
+    def extend(self, patients, starts, ends):
+        patients, starts, ends = (np.asarray(values, dtype=dtype) for values, dtype
+                                  in ((patients, '<i4'), (starts, '<i8'), (ends, '<i8')))
+        lengths = ends - starts
+        classes = np.searchsorted(STAY_CLASSES, lengths, side='left')
+        for i, stays in enumerate(self.classes):
+            selected = classes == i
+            if selected.any():
+                stays.extend(starts[selected], ends[selected], patients[selected])
+        self.starts = np.sort(np.concatenate([self.starts, starts]))
+        self.ends = np.sort(np.concatenate([self.ends, ends]))
+        self.lengths = np.concatenate([self.lengths, lengths])
+
+    def overlapping(self, t1, t2):
+        # Kode pasien yang berada di unit pada suatu saat dalam [t1, t2]
+        found = [stays.overlapping(t1, t2) for stays in self.classes]
+        found.append(np.fromiter((patient for patient, start in self.open.items() if start <= t2), dtype='<i4'))
+        return np.unique(np.concatenate(found))
+
+    def census(self, times):
+        # Jumlah pasien di unit pada setiap waktu (array epoch ms)
+        times = np.asarray(times, dtype='<i8')
+        closed = np.searchsorted(self.starts, times, side='right') - np.searchsorted(self.ends, times, side='right')
+        open_starts = np.fromiter(self.open.values(), dtype='<i8', count=len(self.open))
+        return closed + (open_starts[:, np.newaxis] <= times).sum(axis=0)
+
+
+class AdtStore:
+    # Penyimpanan event ADT semua pasien, dibagi oleh semua sesi dashboard. Setiap event
+    # memperbarui indeks secara inkremental; query tidak membaca ulang riwayat
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.patient_ids = []
+        self.patient_codes = {}
+        self.units = {}  # unit -> UnitIndex
+        self.current = {}  # patient_id -> (unit, waktu masuk)
+        self.stays = {}  # patient_id -> daftar Stay yang sudah selesai
+        self.events = {}  # patient_id -> daftar AdtEvent
+        self.ignored = 0  # event Keluar yang tidak cocok dengan lokasi pasien
+        self.version = 0
+        self.los_cache = (None, None)  # (versi, DataFrame lama rawat)
+
+    def _code(self, patient_id):
+        code = self.patient_codes.get(patient_id)
+        if code is None:
+            code = self.patient_codes[patient_id] = len(self.patient_ids)
+            self.patient_ids.append(patient_id)
+        return code
+
+    def _unit(self, unit):
+        index = self.units.get(unit)
+        if index is None:
+            index = self.units[unit] = UnitIndex()
+        return index
+
+    def _apply(self, event, closed=None):
+        # closed: jika diberikan, rawat yang selesai dikumpulkan untuk disisipkan sekaligus (load)
+        patient_id, unit, status, timestamp = event
+        code = self._code(patient_id)
+        current = self.current.get(patient_id)
+        if status == ADMIT:
+            if current is not None and current[0] == unit:
+                return False
+            if current is not None:
+                # Masuk ke unit lain tanpa event Keluar: rawat sebelumnya ditutup di waktu yang sama
+                self._close(patient_id, code, timestamp, closed)
+            self.current[patient_id] = (unit, timestamp)
+            self._unit(unit).open[code] = timestamp
+        elif status == DISCHARGE:
+            if current is None or current[0] != unit:
+                self.ignored += 1
+                return False
+            self._close(patient_id, code, timestamp, closed)
+        else:
+            raise ValueError(f"Status ADT tidak dikenal: {status}")
+        self.events.setdefault(patient_id, []).append(event)
+        return True
+
+    def _close(self, patient_id, code, timestamp, closed):
+        unit, start = self.current.pop(patient_id)
+        end = max(timestamp, start)
+        index = self._unit(unit)
+        del index.open[code]
+        self.stays.setdefault(patient_id, []).append(Stay(unit, start, end))
+        if closed is None:
+            index.close(code, start, end)
+        else:
+            closed.setdefault(unit, []).append((code, start, end))
+
+    def record(self, patient_id, unit, status, timestamp=None):
+        # Satu event ADT; hasil True jika event mengubah status pasien
+        event = AdtEvent(patient_id, unit, status, to_ms(timestamp or datetime.now()))
+        with self.lock:
+            changed = self._apply(event)
+            if changed:
+                self.version += 1
+            return changed
+
+    def transfer_events(self, patient_id, unit, timestamp=None):
+        # Event yang dihasilkan perpindahan ke unit (Keluar dari unit saat ini lalu Masuk unit baru
+        # pada waktu yang sama), tanpa menerapkannya; kosong jika pasien sudah berada di unit tersebut
+        timestamp = to_ms(timestamp or datetime.now())
+        with self.lock:
+            current = self.current.get(patient_id)
+        if current is not None and current[0] == unit:
+            return []
+        events = [] if current is None else [AdtEvent(patient_id, current[0], DISCHARGE, timestamp)]
+        return events + [AdtEvent(patient_id, unit, ADMIT, timestamp)]
+
+    def transfer(self, patient_id, unit, timestamp=None):
+        with self.lock:
+            events = self.transfer_events(patient_id, unit, timestamp)
+            for event in events:
+                self.record(*event)
+            return bool(events)
+
+    def load(self, events):
+        # Muat banyak event sekaligus (mis. dari database), urut waktu per pasien
+        with self.lock:
+            closed = {}
+            for patient_id, unit, status, timestamp in events:
+                self._apply(AdtEvent(patient_id, unit, status, to_ms(timestamp)), closed)
+            for unit, stays in closed.items():
+                self._unit(unit).extend(*zip(*stays))
+            self.version += 1
+
+    def has_patient(self, patient_id):
+        return patient_id in self.events
+
+    def current_unit(self, patient_id):
+        current = self.current.get(patient_id)
+        return None if current is None else current[0]
+
+    def patient_events(self, patient_id):
+        with self.lock:
+            return list(self.events.get(patient_id, []))
+
+    def patient_durations(self, patient_id, now=None):
+        # Total durasi perawatan per unit untuk satu pasien (pengganti calculate_duration)
+        now_ms = to_ms(now or datetime.now())
+        with self.lock:
+            stays = list(self.stays.get(patient_id, []))
+            current = self.current.get(patient_id)
+        if current is not None:
+            stays.append(Stay(current[0], current[1], max(now_ms, current[1])))
+        durations = {}
+        for unit, start, end in stays:
+            durations[unit] = durations.get(unit, timedelta()) + timedelta(milliseconds=end - start)
+        return durations
+
+    def patients_in(self, unit, t1, t2=None):
+        # Pasien yang berada di unit pada suatu saat antara t1 dan t2 (t2 None = titik waktu t1)
+        t1 = to_ms(t1)
+        t2 = t1 if t2 is None else to_ms(t2)
+        with self.lock:
+            index = self.units.get(unit)
+            if index is None:
+                return []
+            codes = index.overlapping(t1, t2)
+            return [self.patient_ids[code] for code in codes]
+
+    def census(self, at=None):
+        # Jumlah pasien per unit saat ini, atau pada waktu at
+        with self.lock:
+            if at is None:
+                counts = {unit: len(index.open) for unit, index in self.units.items()}
+            else:
+                at = to_ms(at)
+                counts = {unit: int(index.census([at])[0]) for unit, index in self.units.items()}
+        return pd.Series(counts, name='sensus', dtype=int).rename_axis('unit')
+
+    def census_series(self, times):
+        # Sensus per unit untuk banyak waktu sekaligus; DataFrame (waktu x unit)
+        times = np.asarray([to_ms(t) for t in times], dtype='<i8')
+        with self.lock:
+            data = {unit: index.census(times) for unit, index in self.units.items()}
+        return pd.DataFrame(data, index=from_epoch_ms(times))
+
+    def length_of_stay(self):
+        # Distribusi lama rawat (jam) per unit dari rawat yang sudah selesai; dihitung ulang
+        # hanya jika ada event baru sejak pemanggilan terakhir
+        rows = []
+        with self.lock:
+            version, cached = self.los_cache
+            if version == self.version:
+                return cached
+            for unit, index in self.units.items():
+                hours = index.lengths / 3_600_000
+                row = {'unit': unit, 'jumlah_rawat': len(hours), 'sedang_dirawat': len(index.open)}
+                if len(hours):
+                    row.update({
+                        'rata_rata_jam': hours.mean(),
+                        'median_jam': np.median(hours),
+                        'p90_jam': np.quantile(hours, 0.9),
+                        'maks_jam': hours.max(),
+                    })
+                rows.append(row)
+            df = pd.DataFrame(rows, columns=['unit', 'jumlah_rawat', 'sedang_dirawat', 'rata_rata_jam',
+                                             'median_jam', 'p90_jam', 'maks_jam']).round(2)
+            self.los_cache = (self.version, df)
+            return df
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import argparse
+from collections import deque
+import numpy as np
+from vital_store import VitalStore, VitalRing, records_to_values, now_epoch_ms, from_epoch_ms
+from validation import validate_block, mask_quarantined, FLATLINE_SAMPLES
+from alert_rules import (evaluate_block, cleared_mask, format_warning, ALERT_RULES, RULE_PARAMETERS,
+                         THRESHOLDS, MAX_WINDOW)
+
+POLL_INTERVAL = 0.2  # detik
+DISCOVERY_INTERVAL = 10  # detik, scan pasien baru di folder store
+DEBOUNCE_SAMPLES = 2  # jumlah sampel berturut-turut sebelum peringatan dinaikkan
+REPORT_INTERVAL = 30  # detik, interval laporan latensi
+# Selisih maksimum waktu tulis ring dengan timestamp sampel terbaru agar jam generator dianggap
+# real-time (mencakup jeda reorder server ingestion); di luar itu timestamp sampel adalah waktu
+# simulasi (SimClock dengan --speed atau replay) dan latensi sampel -> alert tidak dapat diukur
+REALTIME_SKEW_MS = 10000
+ALERT_LOG = 'data/alerts/alerts.jsonl'
+
+
+class AlertTracker:
+    # Status peringatan per (pasien, parameter) dengan debounce dan hysteresis
+
+    def __init__(self, patient_ids, debounce=DEBOUNCE_SAMPLES):
+        self.patient_ids = np.asarray(patient_ids)
+        self.debounce = debounce
+        shape = (len(patient_ids), len(RULE_PARAMETERS))
+        self.streak = np.zeros(shape, dtype=int)
+        self.active = np.zeros(shape, dtype=bool)
+
+    def update(self, block):
+        # block: (pasien, window, parameter) untuk satu sampel; hasil mask naik dan selesai
+        _, alerts = evaluate_block(block)
+        self.streak = np.where(alerts, self.streak + 1, 0)
+        raised = ~self.active & (self.streak >= self.debounce)
+        cleared = self.active & cleared_mask(block[:, 0, :])
+        self.active = (self.active | raised) & ~cleared
+        return raised, cleared
+
+
+class AlertLog:
+    # Antrian event peringatan dalam format JSON lines yang dibaca oleh dashboard
+
+    def __init__(self, path=ALERT_LOG):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, events):
+        if not events:
+            return
+        self.file.write(''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_alert_events(path, offset=0):
+    # Baca event baru mulai dari offset file; hasil (events, offset_baru)
+    if not os.path.exists(path):
+        return [], 0
+    if os.path.getsize(path) < offset:
+        offset = 0  # file dirotasi / dihapus
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # Hanya proses baris yang sudah lengkap
+    end = data.rfind(b'\n') + 1
+    events = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return events, offset + end
+
+
+def format_latency(event):
+    # Latensi sampel -> alert kosong (None) jika jam generator bukan real-time
+    if event.get('latency_ms') is None:
+        return f"jeda polling {event.get('poll_lag_ms')} ms"
+    return f"latensi {event['latency_ms']} ms"
+
+
+class AlertDaemon:
+    # Proses alert mandiri: membaca stream tanda vital saat data masuk, tidak bergantung pada browser
+
+    def __init__(self, store=None, log=None, debounce=DEBOUNCE_SAMPLES):
+        self.store = store or VitalStore(readonly=True)
+        self.log = log or AlertLog()
+        self.debounce = debounce
+        # nama sumber -> [ring/blok, counter terakhir, tracker, waktu dinding poll terakhir (epoch ms)]
+        self.sources = {}
+        # Latensi sampel -> alert (hanya untuk jam real-time) dan jeda polling dicatat terpisah
+        self.latencies = deque(maxlen=10000)
+        self.poll_lags = deque(maxlen=10000)
+        self.last_discovery = 0
+        self.last_report = time.monotonic()
+
+    def discover(self):
+        # Scan folder store untuk ring pasien dan blok ward baru
+        if os.path.exists(self.store.root):
+            for name in os.listdir(self.store.root):
+                if name.endswith('.vring') and name not in self.sources:
+                    ring = VitalRing(os.path.join(self.store.root, name), readonly=True)
+                    patient_id = name[:-len('.vring')]
+                    # Mulai dari data terbaru, data lama tidak dievaluasi ulang
+                    self.sources[name] = [ring, ring.count, AlertTracker([patient_id], self.debounce), now_epoch_ms()]
+        block = self.store.block()
+        if block is not None:
+            source = self.sources.get('ward')
+            if source is None or source[0] is not block:
+                self.sources['ward'] = [block, block.count, AlertTracker(block.patient_ids, self.debounce),
+                                        now_epoch_ms()]
+        self.last_discovery = time.monotonic()
+
+    def _window(self, source, n):
+        # Data n sampel terakhir sebagai (pasien, n, parameter) dan timestamp (pasien, n)
+        ring = source[0]
+        if isinstance(ring, VitalRing):
+            records = ring.latest(n)
+            return records_to_values(records, RULE_PARAMETERS)[np.newaxis], records['timestamp'][np.newaxis]
+        return ring.latest_window(n, RULE_PARAMETERS), ring.latest(n, 'timestamp').T
+
+    def _validated_window(self, source, new):
+        # Sampel baru + riwayat untuk aturan alert (MAX_WINDOW - 1) dan deteksi sensor beku
+        # (FLATLINE_SAMPLES). Seluruh jendela divalidasi sekaligus, lalu hanya baris yang dievaluasi
+        # aturan alert yang dikembalikan; sampel yang dikarantina menjadi NaN dan tidak dapat
+        # menaikkan atau menyelesaikan peringatan
+        window, timestamps = self._window(source, new + MAX_WINDOW + FLATLINE_SAMPLES - 1)
+        n = new + MAX_WINDOW - 1
+        flags = validate_block(window, timestamps)
+        return mask_quarantined(window[:, :n], flags[:, :n]), timestamps[:, :n]
+
+    def poll(self):
+        if time.monotonic() - self.last_discovery >= DISCOVERY_INTERVAL:
+            self.discover()
+
+        events = []
+        for source in self.sources.values():
+            ring, last_count, tracker, last_polled = source
+            count = ring.count
+            # Sampel baru masuk ring setelah poll sebelumnya yang masih melihat counter lama
+            source[3] = now_epoch_ms()
+            new = min(count - last_count, ring.capacity - MAX_WINDOW - FLATLINE_SAMPLES)
+            if new <= 0:
+                continue
+            source[1] = count
+            window, timestamps = self._validated_window(source, new)
+            realtime = self._realtime(ring, timestamps)
+
+            # Evaluasi setiap sampel baru secara berurutan (terlama dulu) agar debounce per sampel
+            for i in range(min(new, window.shape[1]) - 1, -1, -1):
+                block = window[:, i:i + MAX_WINDOW, :]
+                raised, cleared = tracker.update(block)
+                if raised.any() or cleared.any():
+                    events.extend(self._events(tracker, block, timestamps[:, i], realtime, last_polled,
+                                               raised, cleared))
+
+        self.log.write(events)
+        if time.monotonic() - self.last_report >= REPORT_INTERVAL:
+            self.report()
+        return events
+
+    def _realtime(self, ring, timestamps):
+        # Jam generator real-time jika sampel terbaru ditulis ke ring sekitar waktu timestampnya
+        written_at = ring.written_at
+        if written_at == 0:
+            return False  # file ring lama tanpa waktu tulis
+        return abs(written_at - int(timestamps[:, 0].max())) <= REALTIME_SKEW_MS
+
+    def _events(self, tracker, block, sample_timestamps, realtime, last_polled, raised, cleared):
+        # Latensi = sampel -> alert dari timestamp sampel, hanya jika jam generator real-time.
+        # Jeda polling (poll sebelumnya -> deteksi) dicatat terpisah dan bukan latensi alert
+        detected_at = now_epoch_ms()
+        poll_lag_ms = detected_at - last_polled
+        events = []
+        for kind, mask in (('raised', raised), ('cleared', cleared)):
+            for patient_index, rule_index in zip(*np.nonzero(mask)):
+                value = float(block[patient_index, 0, rule_index])
+                sample_ms = int(sample_timestamps[patient_index])
+                latency_ms = detected_at - sample_ms if realtime else None
+                if latency_ms is not None:
+                    self.latencies.append(latency_ms)
+                self.poll_lags.append(poll_lag_ms)
+                events.append({
+                    'event': kind,
+                    'patient_id': str(tracker.patient_ids[patient_index]),
+                    'parameter': RULE_PARAMETERS[rule_index],
+                    'value': value,
+                    'threshold': float(THRESHOLDS[rule_index]),
+                    'message': format_warning(rule_index, value) if kind == 'raised'
+                    else f"✅ {ALERT_RULES.iloc[rule_index]['label']} kembali normal ({value:.1f})",
+                    'sample_timestamp': from_epoch_ms([sample_ms])[0].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                    'latency_ms': latency_ms,
+                    'poll_lag_ms': poll_lag_ms,
+                })
+        return events
+
+    def report(self):
+        for label, values in (('Latensi sampel -> alert', self.latencies), ('Jeda polling', self.poll_lags)):
+            if values:
+                values = np.asarray(values)
+                print(f"{label}: p50 {np.percentile(values, 50):.0f} ms, "
+                      f"p95 {np.percentile(values, 95):.0f} ms, maks {values.max():.0f} ms "
+                      f"({len(values)} event)")
+        if self.poll_lags and not self.latencies:
+            print("Latensi sampel -> alert tidak diukur: jam generator bukan real-time")
+        self.last_report = time.monotonic()
+
+    def run(self, poll_interval=POLL_INTERVAL):
+        self.discover()
+        print(f"Alert daemon berjalan, event ditulis ke {self.log.path}")
+        try:
+            while True:
+                for event in self.poll():
+                    print(f"[{event['event']}] {event['patient_id']}: {event['message']} "
+                          f"({format_latency(event)})")
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.report()
+        finally:
+            self.log.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daemon peringatan kondisi kritis tanpa browser")
+    parser.add_argument("--debounce", type=int, default=DEBOUNCE_SAMPLES,
+                        help="Jumlah sampel kritis berturut-turut sebelum peringatan dinaikkan")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Interval polling (detik)")
+    parser.add_argument("--log", default=ALERT_LOG, help="File JSON lines untuk event peringatan")
+    args = parser.parse_args()
+    AlertDaemon(log=AlertLog(args.log), debounce=args.debounce).run(poll_interval=args.poll_interval)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from validation import validate_frame, clean_rows, validate_block, mask_quarantined, quarantine_mask, FLATLINE_SAMPLES
+
+# Tabel aturan peringatan: satu baris per parameter
+# direction 'below' = kritis jika di bawah threshold dan tren menurun,
+# direction 'above' = kritis jika di atas threshold dan tren meningkat
+# hysteresis = jarak dari threshold sebelum peringatan yang aktif dinyatakan selesai
+ALERT_RULES = pd.DataFrame([
+    {'parameter': 'heart_rate', 'threshold': 60, 'direction': 'below', 'trend_window': 5,
+     'label': 'Heart Rate', 'unit': ' bpm', 'hysteresis': 3},
+    {'parameter': 'blood_pressure_systolic', 'threshold': 90, 'direction': 'below', 'trend_window': 5,
+     'label': 'Tekanan Systolic', 'unit': ' mmHg', 'hysteresis': 5},
+    {'parameter': 'blood_pressure_diastolic', 'threshold': 50, 'direction': 'below', 'trend_window': 5,
+     'label': 'Tekanan Diastolic', 'unit': ' mmHg', 'hysteresis': 3},
+    {'parameter': 'oxygen_saturation', 'threshold': 95, 'direction': 'below', 'trend_window': 5,
+     'label': 'Saturasi Oksigen', 'unit': '%', 'hysteresis': 1},
+    {'parameter': 'temperature', 'threshold': 38, 'direction': 'above', 'trend_window': 5,
+     'label': 'Suhu', 'unit': '°C', 'hysteresis': 0.3},
+])
+
+RULE_PARAMETERS = ALERT_RULES['parameter'].tolist()
+THRESHOLDS = ALERT_RULES['threshold'].to_numpy(dtype=float)
+# +1 untuk 'above', -1 untuk 'below' sehingga kondisi kritis selalu sign * (nilai - acuan) > 0
+SIGNS = np.where(ALERT_RULES['direction'] == 'above', 1.0, -1.0)
+TREND_WINDOWS = ALERT_RULES['trend_window'].to_numpy(dtype=int)
+HYSTERESIS = ALERT_RULES['hysteresis'].to_numpy(dtype=float)
+MAX_WINDOW = int(TREND_WINDOWS.max()) + 1
+
+
+def critical_mask(values):
+    # values: array (..., parameter) -> True jika melewati threshold
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore'):
+        return SIGNS * (values - THRESHOLDS) > 0
+
+
+def cleared_mask(values):
+    # True jika nilai sudah kembali ke sisi aman melewati margin hysteresis
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore'):
+        return SIGNS * (values - (THRESHOLDS - SIGNS * HYSTERESIS)) < 0
+
+
+def trend_means(block):
+    # Rata-rata data sebelumnya per parameter sesuai trend_window masing-masing
+    # block: (pasien, window, parameter), window[0] = data terbaru.
+    # Nilai NaN (data yang dikarantina) tidak ikut dirata-rata
+    previous = block[:, 1:, :]
+    n_previous = previous.shape[1]
+    if n_previous == 0:
+        return np.full((block.shape[0], block.shape[2]), np.nan)
+    windows = np.minimum(TREND_WINDOWS, n_previous)
+    valid = ~np.isnan(previous)
+    sums = np.cumsum(np.where(valid, previous, 0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    columns = np.arange(block.shape[2])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums[:, windows - 1, columns] / counts[:, windows - 1, columns]
+
+
+def evaluate_block(block):
+    # Evaluasi seluruh aturan sekaligus untuk (pasien, window, parameter).
+    # Hasil: (kritis_saat_ini, peringatan) masing-masing berbentuk (pasien, parameter)
+    block = np.asarray(block, dtype=float)
+    latest = block[:, 0, :]
+    critical_now = critical_mask(latest)
+    with np.errstate(invalid='ignore'):
+        worsening = SIGNS * (latest - trend_means(block)) > 0
+    return critical_now, critical_now & worsening
+
+
+def frame_to_block(df, window=MAX_WINDOW):
+    # DataFrame satu pasien (data terbaru di baris 0) -> block (1, window, parameter)
+    return df[RULE_PARAMETERS].head(window).to_numpy(dtype=float)[np.newaxis]
+
+
+def format_warning(rule_index, value):
+    rule = ALERT_RULES.iloc[rule_index]
+    verb = 'meningkat' if rule['direction'] == 'above' else 'menurun'
+    return f"❗ PERHATIAN: {rule['label']} {verb} ke level kritis ({value:.1f}{rule['unit']})"
+
+
+def check_critical_conditions(df):
+    # Cek kondisi kritis satu pasien: nilai terbaru (baris 0) dan tren dari data sebelumnya.
+    # Baris yang dikarantina oleh validasi kualitas data tidak masuk jalur alert
+    if 'quarantine' not in df:
+        # Cukup validasi data yang dibutuhkan aturan (plus riwayat untuk deteksi flatline)
+        df = validate_frame(df.head(MAX_WINDOW + FLATLINE_SAMPLES))
+    df = clean_rows(df)
+    if len(df) == 0:
+        return []
+    block = frame_to_block(df)
+    _, alerts = evaluate_block(block)
+    latest = block[0, 0]
+    return [format_warning(i, latest[i]) for i in np.flatnonzero(alerts[0])]
+
+
+def ward_alerts(patient_ids, window, timestamps):
+    # Ringkasan pasien yang memicu peringatan dalam satu ward. window: (pasien, n, parameter) dan
+    # timestamps (pasien, n); n sebaiknya MAX_WINDOW + FLATLINE_SAMPLES agar sensor beku terdeteksi.
+    # Sampel yang dikarantina menjadi NaN sebelum evaluasi, sama seperti AlertDaemon.poll.
+    # Hasil: (DataFrame peringatan, DataFrame jumlah sampel dikarantina per pasien)
+    flags = validate_block(window, timestamps)
+    block = mask_quarantined(window, flags)[:, :MAX_WINDOW]
+    _, alerts = evaluate_block(block)
+    patient_index, rule_index = np.nonzero(alerts)
+    patient_ids = np.asarray(patient_ids)
+    df_alerts = pd.DataFrame({
+        'ID Pasien': patient_ids[patient_index],
+        'Parameter': ALERT_RULES['label'].to_numpy()[rule_index],
+        'Nilai': block[patient_index, 0, rule_index],
+        'Threshold': THRESHOLDS[rule_index],
+    })
+    quarantined = quarantine_mask(flags)
+    counts = quarantined.sum(axis=1)
+    selected = np.flatnonzero(counts)
+    df_quarantine = pd.DataFrame({
+        'ID Pasien': patient_ids[selected],
+        'Sampel Dikarantina': counts[selected],
+        'Sampel Terbaru Dikarantina': quarantined[selected, 0],
+    })
+    return df_alerts, df_quarantine
@@ -4,9 +4,22 @@ import numpy as np
 import plotly.express as px
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
-from statsmodels.tsa.arima.model import ARIMA
 import json
 import os
+from vital_store import DEFAULT_PATIENT_ID, ROLLUP_RESOLUTIONS, to_epoch_ms, from_epoch_ms, choose_resolution
+from ingestion import IngestionService
+from alert_daemon import format_latency
+from alert_rules import check_critical_conditions, critical_mask, ward_alerts, RULE_PARAMETERS, MAX_WINDOW
+from validation import FLATLINE_SAMPLES
+from forecasting import ForecastEngine, series_for_forecast, ARIMA_ORDER, FORECAST_STEPS, MAX_HISTORY
+from adt_store import AdtStore, AdtEvent, ADMIT, to_ms
+from patient_repository import PatientRepository
+from therapy_schedule import (DoseIndex, parse_frequency, DUE_SOON_MINUTES, OVERDUE_WINDOW_MS,
+                              SCHEDULE_HORIZON_MS)
+from bed_figures import add_occupancy, build_availability_figure, build_occupancy_heatmap, build_census_figure
+from bed_units import load_units, attach_units, filter_units, group_labels, summarize_groups, GROUPINGS
+from downsampling import downsample_frame, lttb_indices, visible_range, PIXEL_BUDGET
+from instrumentation import METRICS, METRICS_FILE, PROFILE_SLOW_MS, SamplingProfiler, finish_profile
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -15,775 +28,1006 @@ st.set_page_config(
     layout="wide"
 )
 
-# Inisialisasi session state
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = datetime.now()
-if 'patient_data' not in st.session_state:
-    st.session_state.patient_data = {
-        "ID Pasien": "P-2024-001",
-        "Nama": "Tn. Soleh",
-        "Usia": "45 tahun",
-        "Jenis Kelamin": "Laki-laki",
-        "Golongan Darah": "O+",
-        "Diagnosa": "Stroke Hemoragik",
-        "Dokter Penanggung Jawab": "dr. Agatha"
-    }
-if 'location_history' not in st.session_state:
-    # Set waktu awal sama dengan waktu pertama data vital signs
-    data_dir = 'data'
-    if os.path.exists(data_dir):
-        files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-        if files:
-            earliest_file = min(files)
-            df_first = pd.read_csv(os.path.join(data_dir, earliest_file))
-            initial_time = df_first['timestamp'].iloc[0]
-        else:
-            initial_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    else:
-        initial_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    st.session_state.location_history = [
-        {"timestamp": initial_time, "unit": "Instalasi Gawat Darurat", "status": "Masuk"}
-    ]
-if 'current_location' not in st.session_state:
-    st.session_state.current_location = "Instalasi Gawat Darurat"
-
-# Inisialisasi session state untuk advice terapi
-if 'therapy_advice' not in st.session_state:
-    st.session_state.therapy_advice = []
-
-# Tab untuk navigasi
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Dashboard Monitoring", "Update Data Pasien", "Upadate Tanda Vital", "Durasi Perawatan", "Ketersediaan Bed"])
-
-with tab1:
-    # Fungsi untuk mengecek kondisi kritis
-    def check_critical_conditions(df):
-        latest_data = df.iloc[0]  # Data terbaru
-        prev_data = df.iloc[1:6]  # 5 data sebelumnya untuk melihat tren
-        
-        warnings = []
-        
-        # Cek heart rate
-        if latest_data['heart_rate'] < 60:
-            if prev_data['heart_rate'].mean() > latest_data['heart_rate']:
-                warnings.append(f"❗ PERHATIAN: Heart Rate menurun ke level kritis ({latest_data['heart_rate']:.1f} bpm)")
-        
-        # Cek blood pressure systolic
-        if latest_data['blood_pressure_systolic'] < 90:
-            if prev_data['blood_pressure_systolic'].mean() > latest_data['blood_pressure_systolic']:
-                warnings.append(f"❗ PERHATIAN: Tekanan Systolic menurun ke level kritis ({latest_data['blood_pressure_systolic']:.1f} mmHg)")
-        
-        # Cek blood pressure diastolic
-        if latest_data['blood_pressure_diastolic'] < 50:
-            if prev_data['blood_pressure_diastolic'].mean() > latest_data['blood_pressure_diastolic']:
-                warnings.append(f"❗ PERHATIAN: Tekanan Diastolic menurun ke level kritis ({latest_data['blood_pressure_diastolic']:.1f} mmHg)")
-        
-        # Cek oxygen saturation
-        if latest_data['oxygen_saturation'] < 95:
-            if prev_data['oxygen_saturation'].mean() > latest_data['oxygen_saturation']:
-                warnings.append(f"❗ PERHATIAN: Saturasi Oksigen menurun ke level kritis ({latest_data['oxygen_saturation']:.1f}%)")
-        
-        # Cek temperature
-        if latest_data['temperature'] > 38:
-            if prev_data['temperature'].mean() < latest_data['temperature']:
-                warnings.append(f"❗ PERHATIAN: Suhu meningkat ke level kritis ({latest_data['temperature']:.1f}°C)")
-        
-        return warnings
+# Interval refresh per bagian halaman (detik)
+LIVE_REFRESH_SECONDS = 5  # nilai terkini dan grafik real-time
+FORECAST_REFRESH_SECONDS = 60  # analisis prediktif
+BED_REFRESH_SECONDS = 30  # ketersediaan bed
+# Batas tampilan bed agar waktu render tetap terbatas untuk ratusan unit
+MAX_UNIT_BARS = 40  # lebih dari ini, bar chart default dikelompokkan per gedung
+MAX_CENSUS_SERIES = 12  # garis riwayat sensus per unit
+MAX_FULL_WARNINGS = 5  # unit yang disebut dalam peringatan "diperkirakan penuh"
+SAMPLE_REFRESH_SECONDS = 300  # data simulasi dibuat ulang setiap 5 menit
+ARCHIVE_LOOKBACK_HOURS = 24  # riwayat arsip yang dibaca jika data sensor terkini belum cukup
+
+# Pasien contoh yang dibuat saat database masih kosong
+DEFAULT_PATIENT_DATA = {
+    "ID Pasien": DEFAULT_PATIENT_ID,
+    "Nama": "Tn. Soleh",
+    "Usia": "45 tahun",
+    "Jenis Kelamin": "Laki-laki",
+    "Golongan Darah": "O+",
+    "Diagnosa": "Stroke Hemoragik",
+    "Dokter Penanggung Jawab": "dr. Agatha"
+}
+
+# Rentang waktu grafik real-time (menit); None = seluruh riwayat yang tersimpan
+CHART_WINDOWS = {
+    "15 menit": 15,
+    "1 jam": 60,
+    "6 jam": 6 * 60,
+    "24 jam": 24 * 60,
+    "Semua": None,
+}
+
+# Worker ingestion tunggal per proses, dibagi oleh semua sesi
+@st.cache_resource
+def get_ingestion_service():
+    return IngestionService()
+
+def current_patient_id():
+    patient_id = st.session_state.get('patient_id')
+    return patient_id or DEFAULT_PATIENT_ID
+
+# Engine prediksi paralel (process pool) dengan model ARIMA inkremental per (pasien, parameter)
+@st.cache_resource
+def get_forecast_engine():
+    return ForecastEngine()
+
+# Data pasien, perpindahan dan terapi di SQLite (WAL), dibagi oleh semua sesi dan tahan reload
+@st.cache_resource
+def get_patient_repository():
+    return PatientRepository()
+
+# Event ADT (masuk/keluar/pindah unit) semua pasien dengan indeks interval, dimuat dari repository
+@st.cache_resource
+def get_adt_store():
+    store = AdtStore()
+    store.load(get_patient_repository().transfer_events())
+    return store
+
+# Indeks dosis terapi semua pasien (roda waktu), dimuat dari order dan pemberian di repository
+@st.cache_resource
+def get_dose_index():
+    repository = get_patient_repository()
+    index = DoseIndex()
+    now = datetime.now()
+    index.load(repository.therapy_orders(), repository.administrations(now - timedelta(milliseconds=OVERDUE_WINDOW_MS)), now)
+    return index
+
+# Semua grafik Plotly melewati helper ini agar waktu serialisasi dan pengiriman tercatat
+def plotly_chart(fig, container=None, **kwargs):
+    with METRICS.timer('plotly_chart'):
+        return (container or st).plotly_chart(fig, **kwargs)
+
+# Isi halaman dijalankan sebagai fungsi agar hanya pemanggilannya yang dibungkus instrumentasi
+def render_page():
+    ingestion_service = get_ingestion_service()
+    patient_repository = get_patient_repository()
+    adt_store = get_adt_store()
+    dose_index = get_dose_index()
+
+    # Inisialisasi session state
+    if 'last_refresh' not in st.session_state:
+        st.session_state.last_refresh = datetime.now()
+    if 'patient_id' not in st.session_state:
+        st.session_state.patient_id = DEFAULT_PATIENT_ID
+        if not patient_repository.has_patient(DEFAULT_PATIENT_ID):
+            # Pasien contoh dibuat sekali; waktu masuk awal sama dengan waktu pertama data vital signs
+            snapshot = ingestion_service.watch(DEFAULT_PATIENT_ID)
+            first_timestamp = snapshot.first_timestamps.get(DEFAULT_PATIENT_ID)
+            initial_time = first_timestamp if first_timestamp is not None else datetime.now()
+            initial_events = [AdtEvent(DEFAULT_PATIENT_ID, "Instalasi Gawat Darurat", ADMIT, to_ms(initial_time))]
+            if patient_repository.create_patient(DEFAULT_PATIENT_DATA, initial_events):
+                adt_store.load(initial_events)
+
+    # Rekam pasien terpilih dari cache repository (query berindeks hanya jika data berubah)
+    record = patient_repository.load_patient(st.session_state.patient_id)
 
-    # Kode dashboard yang sudah ada
-    st.title("Sistem Monitoring Pasien Kritis")
-    st.markdown("---")
+    # Tab untuk navigasi
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Dashboard Monitoring", "Update Data Pasien", "Upadate Tanda Vital", "Durasi Perawatan", "Ketersediaan Bed"])
+
+    with tab1:
+        tab_timer = METRICS.timer('tab.dashboard').start()
+        # Kode dashboard yang sudah ada
+        st.title("Sistem Monitoring Pasien Kritis")
+        st.markdown("---")
     
-    # Sidebar untuk informasi pasien
-    st.sidebar.title("Informasi Pasien")
-    for key, value in st.session_state.patient_data.items():
-        st.sidebar.text(f"{key}: {value}")
-
-    # Tampilkan waktu terakhir refresh
-    st.sidebar.markdown("---")
-    st.sidebar.write(f"Terakhir diperbarui: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
-
-    # Tracking lokasi pasien
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Tracking Lokasi Pasien")
-
-    # Status lokasi saat ini (simulasi)
-    current_location = st.session_state.current_location
-    st.sidebar.markdown(f"**Lokasi Saat Ini:** {current_location}")
-
-    # Timeline tracking
-    st.sidebar.markdown("### Riwayat Perpindahan")
-    for loc in st.session_state.location_history:
-        st.sidebar.markdown(
-            f"**{loc['timestamp']}**  \n"
-            f"{loc['unit']} - {loc['status']}"
+        # Sidebar untuk informasi pasien
+        st.sidebar.title("Informasi Pasien")
+        # Pilih pasien dari database bersama (sesi perawat dan dokter dapat membuka pasien yang sama)
+        patient_ids = patient_repository.list_patients()
+        selected_patient = st.sidebar.selectbox(
+            "Pilih Pasien", patient_ids,
+            index=patient_ids.index(st.session_state.patient_id) if st.session_state.patient_id in patient_ids else None
         )
+        if selected_patient is not None and selected_patient != st.session_state.patient_id:
+            st.session_state.patient_id = selected_patient
+            st.rerun()
+        for key, value in record.patient_data.items():
+            st.sidebar.text(f"{key}: {value}")
 
-    # Visualisasi alur perpindahan
-    st.sidebar.markdown("### Alur Perawatan")
-    locations = ["Instalasi Gawat Darurat", "Ruang ICU", "Instalasi Bedah Sentral", "Ruang Rawat Inap"]
-    current_index = locations.index(st.session_state.current_location)
-
-    # Buat progress bar untuk visualisasi alur
-    progress_html = """
-    <style>
-        .location-tracker {
-            display: flex;
-            flex-direction: column;
-            gap: 5px;
-            margin-top: 10px;
-        }
-        .location-item {
-            padding: 5px;
-            border-radius: 5px;
-            font-size: 12px;
-            text-align: center;
-        }
-        .current {
-            background-color: #2ecc71;
-            color: white;
-        }
-        .passed {
-            background-color: #95a5a6;
-            color: white;
-        }
-        .upcoming {
-            background-color: #ecf0f1;
-            color: #2c3e50;
-        }
-    </style>
-    <div class="location-tracker">
-    """
-
-    for i, loc in enumerate(locations):
-        if i < current_index:
-            status_class = "passed"
-        elif i == current_index:
-            status_class = "current"
-        else:
-            status_class = "upcoming"
-        progress_html += f'<div class="location-item {status_class}">{loc}</div>'
+        # Waktu refresh dan event alert daemon di sidebar diperbarui bersama bagian live,
+        # tanpa menunggu pengguna menyentuh widget (fragment dipanggil di dalam st.sidebar)
+        @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+        @METRICS.timed('fragment.sidebar_alerts', profile_slow_ms=PROFILE_SLOW_MS)
+        def sidebar_live_section():
+            # Tampilkan waktu terakhir refresh
+            st.markdown("---")
+            st.write(f"Terakhir diperbarui: {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    progress_html += "</div>"
-    st.sidebar.markdown(progress_html, unsafe_allow_html=True)
+            # Event dari alert daemon untuk pasien ini
+            daemon_alerts = [event for event in ingestion_service.snapshot().alerts
+                             if event['patient_id'] == current_patient_id()]
+            if daemon_alerts:
+                st.markdown("---")
+                st.subheader("Alert Daemon")
+                for event in reversed(daemon_alerts[-5:]):
+                    st.markdown(
+                        f"**{event['sample_timestamp']}**  \n"
+                        f"{event['message']} ({format_latency(event)})"
+                    )
 
-    # Fungsi untuk membuat data simulasi
-    def generate_sample_data():
-        current_time = datetime.now()
-        dates = [(current_time - timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S') 
-                 for i in range(500)]
-        
-        data = {
-            'timestamp': dates,
-            'heart_rate': [int(x) for x in np.random.normal(75, 5, 500)],
-            'blood_pressure_systolic': [int(x) for x in np.random.normal(120, 10, 500)],
-            'blood_pressure_diastolic': [int(x) for x in np.random.normal(80, 8, 500)],
-            'oxygen_saturation': [int(x) for x in np.random.normal(98, 1, 500)],
-            'temperature': [int(x) for x in np.random.normal(37, 0.3, 500)]
-        }
-        
-        return pd.DataFrame(data)
+        with st.sidebar:
+            sidebar_live_section()
+
+        # Tracking lokasi pasien
+        st.sidebar.markdown("---")
+        st.sidebar.subheader("Tracking Lokasi Pasien")
 
-    # Load data
-    df = generate_sample_data()
+        # Status lokasi saat ini (simulasi)
+        current_location = record.current_location
+        st.sidebar.markdown(f"**Lokasi Saat Ini:** {current_location}")
 
-    # Cek kondisi kritis dan tampilkan peringatan
-    warnings = check_critical_conditions(df)
-    if warnings:
-        # Buat HTML untuk popup warning
-        warning_html = """
+        # Timeline tracking
+        st.sidebar.markdown("### Riwayat Perpindahan")
+        for loc in record.location_history:
+            st.sidebar.markdown(
+                f"**{loc['timestamp']}**  \n"
+                f"{loc['unit']} - {loc['status']}"
+            )
+
+        # Visualisasi alur perpindahan
+        st.sidebar.markdown("### Alur Perawatan")
+        locations = ["Instalasi Gawat Darurat", "Ruang ICU", "Instalasi Bedah Sentral", "Ruang Rawat Inap"]
+        current_index = locations.index(record.current_location) if record.current_location in locations else -1
+
+        # Buat progress bar untuk visualisasi alur
+        progress_html = """
         <style>
-            .warning-popup {
-                position: fixed;
-                top: 50%;
-                left: 50%;
-                transform: translate(-50%, -50%);
-                background-color: #ff4444;
-                color: white;
-                padding: 20px;
-                border-radius: 10px;
-                z-index: 1000;
-                box-shadow: 0 0 20px rgba(0,0,0,0.3);
-                max-width: 80%;
-                width: 400px;
+            .location-tracker {
+                display: flex;
+                flex-direction: column;
+                gap: 5px;
+                margin-top: 10px;
             }
-            .warning-header {
-                font-size: 20px;
-                font-weight: bold;
-                margin-bottom: 10px;
-                text-align: center;
-            }
-            .warning-message {
-                margin-bottom: 5px;
+            .location-item {
                 padding: 5px;
-                background-color: rgba(255,255,255,0.1);
                 border-radius: 5px;
-            }
-            .warning-footer {
+                font-size: 12px;
                 text-align: center;
-                margin-top: 15px;
-                font-weight: bold;
+            }
+            .current {
+                background-color: #2ecc71;
+                color: white;
+            }
+            .passed {
+                background-color: #95a5a6;
+                color: white;
+            }
+            .upcoming {
+                background-color: #ecf0f1;
+                color: #2c3e50;
             }
         </style>
-        <div class="warning-popup">
-            <div class="warning-header">⚠️ PERINGATAN KONDISI KRITIS ⚠️</div>
+        <div class="location-tracker">
         """
+
+        for i, loc in enumerate(locations):
+            if i < current_index:
+                status_class = "passed"
+            elif i == current_index:
+                status_class = "current"
+            else:
+                status_class = "upcoming"
+            progress_html += f'<div class="location-item {status_class}">{loc}</div>'
+
+        progress_html += "</div>"
+        st.sidebar.markdown(progress_html, unsafe_allow_html=True)
+
+        # Fungsi untuk membuat data simulasi
+        def generate_sample_data():
+            current_time = datetime.now()
+            dates = [(current_time - timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S') 
+                     for i in range(500)]
         
-        for warning in warnings:
-            warning_html += f'<div class="warning-message">{warning}</div>'
+            data = {
+                'timestamp': dates,
+                'heart_rate': [int(x) for x in np.random.normal(75, 5, 500)],
+                'blood_pressure_systolic': [int(x) for x in np.random.normal(120, 10, 500)],
+                'blood_pressure_diastolic': [int(x) for x in np.random.normal(80, 8, 500)],
+                'oxygen_saturation': [min(int(x), 100) for x in np.random.normal(98, 1, 500)],
+                # Suhu desimal resolusi 0.1 °C, sama seperti generator dan validasi kualitas data
+                'temperature': [round(x, 1) for x in np.random.normal(37, 0.3, 500)]
+            }
         
-        warning_html += """
-            <div class="warning-footer">
-                Harap segera tindak lanjuti!<br>
-                Waktu: """ + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + """
-            </div>
-        </div>
-        """
+            return pd.DataFrame(data)
+
+        # Load data (data simulasi hanya dibuat ulang setiap 5 menit, bukan setiap rerun)
+        def load_sample_data():
+            current_time = datetime.now()
+            if (current_time - st.session_state.last_refresh).seconds >= SAMPLE_REFRESH_SECONDS:
+                st.session_state.last_refresh = current_time
+            if st.session_state.get('sample_data_refresh') != st.session_state.last_refresh:
+                st.session_state.sample_data = generate_sample_data()
+                st.session_state.sample_data_refresh = st.session_state.last_refresh
+            return st.session_state.sample_data
+
+        df = load_sample_data()
+
+        # Modifikasi dashboard untuk menampilkan semua parameter
+        parameters = ["heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic", 
+                     "oxygen_saturation", "temperature"]
+
+        # Fungsi untuk membaca data IoT terbaru dari snapshot bersama (tanpa I/O per sesi)
+        @METRICS.timed('get_latest_iot_data')
+        def get_latest_iot_data():
+            try:
+                snapshot = ingestion_service.watch(current_patient_id())
+                return snapshot.vitals.get(current_patient_id())
+            except Exception as e:
+                st.error(f"Error membaca data IoT: {str(e)}")
+            return None
+
+        # Riwayat untuk grafik dan prediksi: data sensor jika sudah cukup panjang, lalu arsip,
+        # dan data simulasi hanya jika pasien belum memiliki riwayat sama sekali
+        def get_vitals_history():
+            current_iot_data = get_latest_iot_data()
+            if current_iot_data is not None and len(current_iot_data) >= 30:
+                return current_iot_data, current_iot_data, current_patient_id()
+            end = datetime.now()
+            df_archive = ingestion_service.store.query(current_patient_id(), end - timedelta(hours=ARCHIVE_LOOKBACK_HOURS), end)
+            if df_archive is not None and len(df_archive) >= 30:
+                df_archive = df_archive.iloc[::-1].head(500).reset_index(drop=True)
+                return (current_iot_data if current_iot_data is not None else df_archive), df_archive, current_patient_id()
+            return current_iot_data, load_sample_data(), 'simulasi'
+
+        # Riwayat untuk rentang waktu yang ditampilkan, urut dari lama ke baru. Rentang panjang dibaca
+        # dari rollup dengan resolusi terkecil yang cukup, rentang pendek dari data mentah.
+        def get_chart_history(df_history, source, window_minutes):
+            timestamps = pd.to_datetime(df_history['timestamp'])
+            end = timestamps.max()
+            start = None if window_minutes is None else end - timedelta(minutes=window_minutes)
+            df_range = None
+            resolution = None
+            if source != 'simulasi':
+                start_ms = 0 if start is None else int(to_epoch_ms([start])[0])
+                end_ms = int(to_epoch_ms([end])[0])
+                if start is None:
+                    start_ms = ingestion_service.store.history_start(source) or end_ms
+                sample_interval = timestamps.diff().abs().median()
+                sample_interval_ms = 1000 if pd.isna(sample_interval) else sample_interval.total_seconds() * 1000
+                resolution = choose_resolution(end_ms - start_ms, sample_interval_ms, PIXEL_BUDGET)
+                if resolution is not None:
+                    df_range = ingestion_service.store.rollup_frame(source, resolution, start_ms, end_ms)
+                if df_range is None:
+                    resolution = None
+                    df_range = ingestion_service.store.query(source, start_ms, end_ms)
+            if df_range is None:
+                df_range = df_history.assign(timestamp=timestamps)
+                if start is not None:
+                    df_range = visible_range(df_range, 'timestamp', start, end)
+                if df_range['timestamp'].is_monotonic_decreasing:
+                    df_range = df_range.iloc[::-1]
+                elif not df_range['timestamp'].is_monotonic_increasing:
+                    df_range = df_range.sort_values('timestamp')
+            return df_range.reset_index(drop=True), resolution
+
+        # Bagian live: diperbarui sendiri setiap beberapa detik tanpa menjalankan ulang seluruh halaman
+        @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+        @METRICS.timed('fragment.live_vitals', profile_slow_ms=PROFILE_SLOW_MS)
+        def live_vitals_section():
+            current_iot_data, df_history, source = get_vitals_history()
+            latest_values = current_iot_data if current_iot_data is not None else df_history
+            st.caption(f"Data terkini per {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+            # Cek kondisi kritis dan tampilkan peringatan
+            warnings = check_critical_conditions(latest_values)
+            if warnings:
+                # Buat HTML untuk popup warning
+                warning_html = """
+                <style>
+                    .warning-popup {
+                        position: fixed;
+                        top: 50%;
+                        left: 50%;
+                        transform: translate(-50%, -50%);
+                        background-color: #ff4444;
+                        color: white;
+                        padding: 20px;
+                        border-radius: 10px;
+                        z-index: 1000;
+                        box-shadow: 0 0 20px rgba(0,0,0,0.3);
+                        max-width: 80%;
+                        width: 400px;
+                    }
+                    .warning-header {
+                        font-size: 20px;
+                        font-weight: bold;
+                        margin-bottom: 10px;
+                        text-align: center;
+                    }
+                    .warning-message {
+                        margin-bottom: 5px;
+                        padding: 5px;
+                        background-color: rgba(255,255,255,0.1);
+                        border-radius: 5px;
+                    }
+                    .warning-footer {
+                        text-align: center;
+                        margin-top: 15px;
+                        font-weight: bold;
+                    }
+                </style>
+                <div class="warning-popup">
+                    <div class="warning-header">⚠️ PERINGATAN KONDISI KRITIS ⚠️</div>
+                """
         
-        st.markdown(warning_html, unsafe_allow_html=True)
+                for warning in warnings:
+                    warning_html += f'<div class="warning-message">{warning}</div>'
         
-        # Tambahkan suara alert (opsional)
-        st.audio("data/alert.mp3", format='audio/mp3')
-
-    # Auto refresh setiap 5 menit
-    current_time = datetime.now()
-    if (current_time - st.session_state.last_refresh).seconds >= 300:  # 5 menit = 300 detik
-        st.session_state.last_refresh = current_time
-        st.rerun()
-
-    # Modifikasi dashboard untuk menampilkan semua parameter
-    parameters = ["heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic", 
-                 "oxygen_saturation", "temperature"]
-
-    # Fungsi untuk membaca data IoT terbaru
-    def get_latest_iot_data():
-        try:
-            data_dir = 'data'
-            if os.path.exists(data_dir):
-                files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-                if files:
-                    latest_file = max(files)
-                    df_iot = pd.read_csv(os.path.join(data_dir, latest_file))
-                    return df_iot
-        except Exception as e:
-            st.error(f"Error membaca data IoT: {str(e)}")
-        return None
-
-    # Inisialisasi session state untuk data IoT
-    if 'last_iot_update' not in st.session_state:
-        st.session_state.last_iot_update = datetime.now()
-    if 'current_iot_data' not in st.session_state:
-        st.session_state.current_iot_data = None
-
-    # Cek apakah perlu update data IoT (setiap 1 menit)
-    current_time = datetime.now()
-    if (current_time - st.session_state.last_iot_update).seconds >= 60:  # 1 menit = 60 detik
-        new_data = get_latest_iot_data()
-        if new_data is not None:
-            st.session_state.current_iot_data = new_data
-            st.session_state.last_iot_update = current_time
-
-    # Nilai terkini untuk semua parameter
-    st.subheader("Nilai Terkini")
-    cols_current = st.columns(len(parameters))
-    for i, param in enumerate(parameters):
-        with cols_current[i]:
-            # Gunakan data IoT jika tersedia, jika tidak gunakan data simulasi
-            if st.session_state.current_iot_data is not None:
-                current_value = st.session_state.current_iot_data[param].iloc[0]
-            else:
-                current_value = df[param].iloc[0]
+                warning_html += """
+                    <div class="warning-footer">
+                        Harap segera tindak lanjuti!<br>
+                        Waktu: """ + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + """
+                    </div>
+                </div>
+                """
+        
+                st.markdown(warning_html, unsafe_allow_html=True)
+        
+                # Tambahkan suara alert (opsional, hanya jika file suara tersedia)
+                if os.path.exists("data/alert.mp3"):
+                    st.audio("data/alert.mp3", format='audio/mp3')
+
+            # Nilai terkini untuk semua parameter
+            st.subheader("Nilai Terkini")
+            # Nilai yang dikarantina validasi (mis. glitch SpO2 = 0) tidak ditandai kritis
+            latest_quarantined = latest_values['quarantine'].iloc[0] != '' if 'quarantine' in latest_values else False
+            current_critical = critical_mask(latest_values[RULE_PARAMETERS].iloc[0].to_numpy(dtype=float)) & ~latest_quarantined
+            cols_current = st.columns(len(parameters))
+            for i, param in enumerate(parameters):
+                with cols_current[i]:
+                    # Gunakan data IoT jika tersedia, jika tidak gunakan data simulasi
+                    if current_iot_data is not None:
+                        current_value = current_iot_data[param].iloc[0]
+                    else:
+                        current_value = df_history[param].iloc[0]
             
-            # Tambahkan warna untuk nilai kritis
-            if (param == 'heart_rate' and current_value < 60) or \
-               (param == 'blood_pressure_systolic' and current_value < 90) or \
-               (param == 'blood_pressure_diastolic' and current_value < 50) or \
-               (param == 'oxygen_saturation' and current_value < 95) or \
-               (param == 'temperature' and current_value > 38):
-                delta_color = "inverse"
-            else:
-                delta_color = "normal"
+                    # Tambahkan warna untuk nilai kritis (threshold dari tabel aturan peringatan)
+                    if current_critical[RULE_PARAMETERS.index(param)]:
+                        delta_color = "inverse"
+                    else:
+                        delta_color = "normal"
             
-            st.metric(
-                label=param.replace("_", " ").title(),
-                value=f"{current_value:.1f}",
-                delta="Kritis" if delta_color == "inverse" else None,
-                delta_color=delta_color
-            )
+                    st.metric(
+                        label=param.replace("_", " ").title(),
+                        value=f"{current_value:.1f}",
+                        delta="Kritis" if delta_color == "inverse" else None,
+                        delta_color=delta_color
+                    )
 
-    # Grafik real-time untuk semua parameter
-    st.subheader("Monitoring Real-time")
-    cols_realtime = st.columns(2)
-    for i, param in enumerate(parameters):
-        with cols_realtime[i % 2]:
-            fig = px.line(
-                df.head(100),
-                x='timestamp',
-                y=param,
-                title=f'Trend {param.replace("_", " ").title()} (100 data terakhir)'
-            )
-            st.plotly_chart(fig, use_container_width=True)
-
-    # Prediksi untuk semua parameter
-    st.subheader("Analisis Prediktif")
-    cols_forecast = st.columns(2)
-    for i, param in enumerate(parameters):
-        with cols_forecast[i % 2]:
-            # Persiapkan data untuk prediksi
-            ts_data = df[['timestamp', param]].copy()
-            ts_data['timestamp'] = pd.to_datetime(ts_data['timestamp'])
-            ts_data = ts_data.set_index('timestamp')
-            
-            try:
-                # Gunakan parameter ARIMA yang tetap (1,1,1)
-                model = ARIMA(ts_data[param], order=(1,1,1))
-                fitted_model = model.fit()
-                
-                # Buat prediksi untuk 60 menit ke depan
-                forecast_steps = 60
-                forecast = fitted_model.forecast(steps=forecast_steps)
-                forecast_index = pd.date_range(
-                    start=ts_data.index[-1],
-                    periods=forecast_steps + 1,
-                    freq='min'
-                )[1:]
-                
-                # Plot hasil prediksi
+            # Data yang gagal validasi kualitas ditampilkan terpisah dari jalur alert
+            if 'quarantine' in latest_values:
+                df_quarantine = latest_values.loc[latest_values['quarantine'] != '', ['timestamp', 'quarantine']]
+                if len(df_quarantine):
+                    with st.expander(f"Data dikarantina ({len(df_quarantine)} dari {len(latest_values)} sampel)"):
+                        st.dataframe(df_quarantine.head(20), use_container_width=True, hide_index=True)
+
+            # Peringatan seluruh ward (mode multi-pasien), dievaluasi sekaligus dalam satu blok
+            ward_block = ingestion_service.store.block()
+            if ward_block is not None and len(ward_block) > 0:
+                ward_window = MAX_WINDOW + FLATLINE_SAMPLES
+                df_ward_alerts, df_ward_quarantine = ward_alerts(
+                    ward_block.patient_ids, ward_block.latest_window(ward_window, RULE_PARAMETERS),
+                    ward_block.latest(ward_window, 'timestamp').T)
+                with st.expander(f"Peringatan Ward: {df_ward_alerts['ID Pasien'].nunique()} dari {ward_block.width} pasien"):
+                    st.dataframe(df_ward_alerts, use_container_width=True, hide_index=True)
+                    if len(df_ward_quarantine):
+                        st.caption(f"Data dikarantina (tidak masuk peringatan): "
+                                   f"{int(df_ward_quarantine['Sampel Dikarantina'].sum())} sampel dari "
+                                   f"{len(df_ward_quarantine)} pasien, "
+                                   f"{int(df_ward_quarantine['Sampel Terbaru Dikarantina'].sum())} pada sampel terbaru")
+                        st.dataframe(df_ward_quarantine, use_container_width=True, hide_index=True)
+
+            # Grafik real-time untuk semua parameter
+            st.subheader("Monitoring Real-time")
+            col_window, col_method = st.columns(2)
+            with col_window:
+                window_label = st.radio("Rentang waktu", list(CHART_WINDOWS), index=1, horizontal=True,
+                                        key="realtime_window")
+            with col_method:
+                method_label = st.radio("Downsampling", ["LTTB", "Min/Max"], horizontal=True,
+                                        key="realtime_downsampling")
+            df_chart, resolution = get_chart_history(df_history, source, CHART_WINDOWS[window_label])
+            cols_realtime = st.columns(2)
+            for i, param in enumerate(parameters):
+                with cols_realtime[i % 2]:
+                    # Kirim paling banyak PIXEL_BUDGET titik ke browser, lonjakan tetap dipertahankan
+                    df_points = downsample_frame(df_chart, 'timestamp', param, PIXEL_BUDGET,
+                                                 method='minmax' if method_label == "Min/Max" else 'lttb')
+                    label = f'{len(df_points)} dari {len(df_chart)} titik'
+                    if resolution is not None:
+                        label = f'rata-rata per {resolution}, {label}'
+                    fig = px.line(
+                        df_points,
+                        x='timestamp',
+                        y=param,
+                        title=f'Trend {param.replace("_", " ").title()} ({label})'
+                    )
+                    if resolution is not None:
+                        # Rentang min-max setiap bucket agar lonjakan tetap terlihat
+                        fig.add_trace(go.Scatter(x=df_points['timestamp'], y=df_points[f'{param}_max'],
+                                                 mode='lines', line=dict(width=0), showlegend=False))
+                        fig.add_trace(go.Scatter(x=df_points['timestamp'], y=df_points[f'{param}_min'],
+                                                 mode='lines', line=dict(width=0), fill='tonexty',
+                                                 name='Min-Max', showlegend=False))
+                    plotly_chart(fig, use_container_width=True)
+
+        live_vitals_section()
+
+        # Bagian prediksi: jadwal refresh sendiri yang lebih lambat
+        @st.fragment(run_every=FORECAST_REFRESH_SECONDS)
+        @METRICS.timed('fragment.forecast', profile_slow_ms=PROFILE_SLOW_MS)
+        def forecast_section():
+            # Prediksi untuk semua parameter
+            st.subheader("Analisis Prediktif")
+            forecast_engine = get_forecast_engine()
+            _, df_forecast, forecast_source = get_vitals_history()
+
+            # Input prediksi dapat diambil dari rollup agar horizon lebih panjang tanpa membaca data mentah
+            forecast_resolution = st.radio("Resolusi data prediksi", ["Mentah"] + list(ROLLUP_RESOLUTIONS),
+                                           horizontal=True, key="forecast_resolution")
+            if forecast_resolution != "Mentah":
+                df_rollup = None
+                if forecast_source != 'simulasi':
+                    df_rollup = ingestion_service.store.rollup_frame(forecast_source, forecast_resolution)
+                if df_rollup is not None and len(df_rollup) >= 30:
+                    df_forecast = df_rollup.tail(MAX_HISTORY)
+                else:
+                    st.info(f"Rollup {forecast_resolution} belum cukup, prediksi memakai data mentah")
+                    forecast_resolution = "Mentah"
+    
+            # Fungsi untuk membuat grafik aktual dan prediksi
+            def build_forecast_figure(ts_data, param, forecast=None):
+                # Interval prediksi mengikuti interval sampling data
+                sample_interval = pd.Series(ts_data.index).diff().median()
+                if pd.isna(sample_interval) or sample_interval <= timedelta(0):
+                    sample_interval = timedelta(minutes=1)
+                horizon_minutes = int((sample_interval * FORECAST_STEPS).total_seconds() // 60)
+        
+                # Riwayat panjang diperkecil ke PIXEL_BUDGET titik sebelum dikirim ke browser
+                actual = ts_data.iloc[lttb_indices(ts_data.index.to_numpy(), ts_data[param].to_numpy(), PIXEL_BUDGET)]
                 fig_forecast = go.Figure()
                 fig_forecast.add_trace(go.Scatter(
-                    x=ts_data.index,
-                    y=ts_data[param],
+                    x=actual.index,
+                    y=actual[param],
                     name='Aktual',
                     mode='lines'
                 ))
-                fig_forecast.add_trace(go.Scatter(
-                    x=forecast_index,
-                    y=forecast,
-                    name='Prediksi',
-                    mode='lines'
-                ))
+                if forecast is not None:
+                    forecast_index = pd.date_range(
+                        start=ts_data.index[-1],
+                        periods=len(forecast) + 1,
+                        freq=sample_interval
+                    )[1:]
+                    fig_forecast.add_trace(go.Scatter(
+                        x=forecast_index,
+                        y=forecast,
+                        name='Prediksi',
+                        mode='lines'
+                    ))
                 fig_forecast.update_layout(
-                    title=f'Prediksi {param.replace("_", " ").title()} 60 Menit Ke Depan (ARIMA(1,1,1))',
+                    title=f'Prediksi {param.replace("_", " ").title()} {horizon_minutes} Menit Ke Depan (ARIMA{ARIMA_ORDER})',
                     xaxis_title='Waktu',
                     yaxis_title=param.replace('_', ' ').title()
                 )
-                st.plotly_chart(fig_forecast, use_container_width=True)
-                
-            except Exception as e:
-                st.error(f"Error dalam prediksi {param}: {str(e)}")
-                continue
+                return fig_forecast
+    
+            # Tampilkan data aktual terlebih dahulu, prediksi diisi saat job selesai
+            cols_forecast = st.columns(2)
+            forecast_jobs = {}
+            forecast_slots = {}
+            for i, param in enumerate(parameters):
+                with cols_forecast[i % 2]:
+                    # Persiapkan data untuk prediksi (urut dari lama ke baru)
+                    ts_data, timestamps, values = series_for_forecast(df_forecast, param)
+                    ts_data = ts_data.set_index('timestamp')
+            
+                    chart_slot = st.empty()
+                    status_slot = st.empty()
+                    plotly_chart(build_forecast_figure(ts_data, param), chart_slot, use_container_width=True)
+                    forecast_slots[param] = (ts_data, chart_slot, status_slot)
+            
+                    try:
+                        forecast_jobs[param] = forecast_engine.submit((forecast_source, forecast_resolution, param),
+                                                               timestamps, values)
+                        if not forecast_jobs[param].done():
+                            status_slot.info(f"Menghitung prediksi {param.replace('_', ' ')}...")
+                    except Exception as e:
+                        status_slot.error(f"Error dalam prediksi {param}: {str(e)}")
+    
+            for param, job in forecast_engine.iter_completed(forecast_jobs):
+                ts_data, chart_slot, status_slot = forecast_slots[param]
+                if job is None:
+                    status_slot.warning(f"Prediksi {param} melebihi batas waktu {forecast_engine.timeout:.0f} detik")
+                    continue
+                try:
+                    plotly_chart(build_forecast_figure(ts_data, param, job.result()), chart_slot,
+                                 use_container_width=True)
+                    status_slot.empty()
+                except Exception as e:
+                    status_slot.error(f"Error dalam prediksi {param}: {str(e)}")
 
-    # Tabel data mentah
-    st.markdown("---")
-    st.subheader("Data Mentah IoT")
-    st.dataframe(df.head(10))
+        forecast_section()
 
-with tab2:
-    st.title("Form Update Data Pasien")
+        # Tabel data mentah
+        st.markdown("---")
+        st.subheader("Data Mentah IoT")
+        st.dataframe(df.head(10))
+        tab_timer.stop()
+
+    with tab2:
+        tab_timer = METRICS.timer('tab.update_pasien').start()
+        st.title("Form Update Data Pasien")
     
-    # Tombol reset data
-    if st.button("Reset Semua Data Pasien"):
-        # Reset data pasien ke default
-        st.session_state.patient_data = {
-            "ID Pasien": "",
-            "Nama": "",
-            "Usia": "",
-            "Jenis Kelamin": "Laki-laki",
-            "Golongan Darah": "O+",
-            "Diagnosa": "",
-            "Dokter Penanggung Jawab": ""
-        }
-        # Reset riwayat lokasi
-        st.session_state.location_history = []
-        # Reset lokasi saat ini
-        st.session_state.current_location = ""
-        # Reset advice terapi
-        st.session_state.therapy_advice = []
-        st.success("Data pasien berhasil direset!")
-        st.rerun()
+        # Tombol reset data
+        if st.button("Reset Semua Data Pasien"):
+            # Kosongkan form untuk pasien baru; data pasien lain di database tidak dihapus
+            st.session_state.patient_id = ""
+            st.success("Data pasien berhasil direset!")
+            st.rerun()
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # Form untuk update data pasien
-    with st.form("patient_update_form"):
-        st.subheader("Data Identitas Pasien")
-        new_patient_data = {}
-        new_patient_data["ID Pasien"] = st.text_input("ID Pasien", st.session_state.patient_data["ID Pasien"])
-        new_patient_data["Nama"] = st.text_input("Nama", st.session_state.patient_data["Nama"])
-        new_patient_data["Usia"] = st.text_input("Usia", st.session_state.patient_data["Usia"])
-        new_patient_data["Jenis Kelamin"] = st.selectbox("Jenis Kelamin", ["Laki-laki", "Perempuan"], 
-            index=0 if st.session_state.patient_data["Jenis Kelamin"] == "Laki-laki" else 1)
-        new_patient_data["Golongan Darah"] = st.selectbox("Golongan Darah", 
-            ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"])
-        new_patient_data["Diagnosa"] = st.text_area("Diagnosa", st.session_state.patient_data["Diagnosa"])
-        new_patient_data["Dokter Penanggung Jawab"] = st.text_input("Dokter Penanggung Jawab", 
-            st.session_state.patient_data["Dokter Penanggung Jawab"])
-
-        st.subheader("Update Lokasi Pasien")
-        new_location = st.selectbox("Lokasi Saat Ini", 
-            ["Instalasi Gawat Darurat", "Ruang ICU", "Instalasi Bedah Sentral", "Ruang Rawat Inap"])
+        # Form untuk update data pasien
+        with st.form("patient_update_form"):
+            st.subheader("Data Identitas Pasien")
+            new_patient_data = {}
+            new_patient_data["ID Pasien"] = st.text_input("ID Pasien", record.patient_data["ID Pasien"])
+            new_patient_data["Nama"] = st.text_input("Nama", record.patient_data["Nama"])
+            new_patient_data["Usia"] = st.text_input("Usia", record.patient_data["Usia"])
+            new_patient_data["Jenis Kelamin"] = st.selectbox("Jenis Kelamin", ["Laki-laki", "Perempuan"], 
+                index=0 if record.patient_data["Jenis Kelamin"] == "Laki-laki" else 1)
+            blood_types = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+            new_patient_data["Golongan Darah"] = st.selectbox("Golongan Darah", blood_types,
+                index=blood_types.index(record.patient_data["Golongan Darah"]) if record.patient_data["Golongan Darah"] in blood_types else 0)
+            new_patient_data["Diagnosa"] = st.text_area("Diagnosa", record.patient_data["Diagnosa"])
+            new_patient_data["Dokter Penanggung Jawab"] = st.text_input("Dokter Penanggung Jawab", 
+                record.patient_data["Dokter Penanggung Jawab"])
+
+            st.subheader("Update Lokasi Pasien")
+            new_location = st.selectbox("Lokasi Saat Ini", 
+                ["Instalasi Gawat Darurat", "Ruang ICU", "Instalasi Bedah Sentral", "Ruang Rawat Inap"])
         
-        st.subheader("Advice Terapi")
+            st.subheader("Advice Terapi")
         
-        # Input untuk advice terapi baru
-        new_medicine = st.text_input("Nama Obat")
-        new_dosage = st.text_input("Dosis")
-        new_frequency = st.text_input("Frekuensi Pemberian")
-        new_route = st.selectbox("Rute Pemberian", 
-            ["Oral", "Intravena", "Intramuskular", "Subkutan", "Inhalasi"])
-        new_notes = st.text_area("Catatan Khusus")
+            # Input untuk advice terapi baru
+            new_medicine = st.text_input("Nama Obat")
+            new_dosage = st.text_input("Dosis")
+            new_frequency = st.text_input("Frekuensi Pemberian")
+            new_route = st.selectbox("Rute Pemberian", 
+                ["Oral", "Intravena", "Intramuskular", "Subkutan", "Inhalasi"])
+            new_notes = st.text_area("Catatan Khusus")
         
-        submitted = st.form_submit_button("Update Data")
-        if submitted:
-            # Update data pasien
-            st.session_state.patient_data = new_patient_data
+            submitted = st.form_submit_button("Update Data")
+            if submitted and not new_patient_data["ID Pasien"]:
+                st.error("ID Pasien wajib diisi")
+            elif submitted:
+                patient_id = new_patient_data["ID Pasien"]
+                now = datetime.now()
             
-            # Update lokasi jika berubah
-            if new_location != st.session_state.current_location:
-                # Tambah record keluar dari lokasi lama jika ada lokasi sebelumnya
-                if st.session_state.current_location:
-                    st.session_state.location_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "unit": st.session_state.current_location,
-                        "status": "Keluar"
+                # Event perpindahan jika lokasi berubah (Keluar dari unit lama lalu Masuk unit baru)
+                events = adt_store.transfer_events(patient_id, new_location, now)
+            
+                # Tambahkan advice terapi baru jika ada
+                therapy_orders = []
+                if new_medicine and new_dosage and new_frequency:
+                    therapy_orders.append({
+                        "patient_id": patient_id,
+                        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+                        "medicine": new_medicine,
+                        "dosage": new_dosage,
+                        "frequency": new_frequency,
+                        "route": new_route,
+                        "notes": new_notes,
+                        "doctor": new_patient_data["Dokter Penanggung Jawab"]
                     })
-                # Tambah record masuk ke lokasi baru
-                st.session_state.location_history.append({
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "unit": new_location,
-                    "status": "Masuk"
-                })
-                st.session_state.current_location = new_location
             
-            # Tambahkan advice terapi baru jika ada
-            if new_medicine and new_dosage and new_frequency:
-                st.session_state.therapy_advice.append({
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "medicine": new_medicine,
-                    "dosage": new_dosage,
-                    "frequency": new_frequency,
-                    "route": new_route,
-                    "notes": new_notes,
-                    "doctor": st.session_state.patient_data["Dokter Penanggung Jawab"]
-                })
+                # Satu transaksi untuk data pasien, perpindahan dan terapi; indeks ADT diperbarui setelah tersimpan
+                order_ids = patient_repository.save_form(new_patient_data, events, therapy_orders)
+                adt_store.load(events)
+                for order, order_id in zip(therapy_orders, order_ids):
+                    dose_index.add_order(order_id, patient_id, order["medicine"], order["dosage"], order["route"],
+                                         order["frequency"], order["timestamp"])
+                st.session_state.patient_id = patient_id
             
-            st.success("Data berhasil diperbarui!")
-            st.rerun()
+                st.success("Data berhasil diperbarui!")
+                st.rerun()
+
+        # Tampilkan riwayat advice terapi
+        if record.therapy_advice:
+            st.subheader("Riwayat Advice Terapi")
+            for advice in reversed(record.therapy_advice):
+                with st.expander(f"{advice['medicine']} - {advice['timestamp']}"):
+                    st.write(f"**Obat:** {advice['medicine']}")
+                    st.write(f"**Dosis:** {advice['dosage']}")
+                    st.write(f"**Frekuensi:** {advice['frequency']}")
+                    st.write(f"**Rute Pemberian:** {advice['route']}")
+                    st.write(f"**Catatan:** {advice['notes']}")
+                    st.write(f"**Dokter:** {advice['doctor']}")
+        tab_timer.stop()
 
-    # Tampilkan riwayat advice terapi
-    if st.session_state.therapy_advice:
-        st.subheader("Riwayat Advice Terapi")
-        for advice in reversed(st.session_state.therapy_advice):
-            with st.expander(f"{advice['medicine']} - {advice['timestamp']}"):
-                st.write(f"**Obat:** {advice['medicine']}")
-                st.write(f"**Dosis:** {advice['dosage']}")
-                st.write(f"**Frekuensi:** {advice['frequency']}")
-                st.write(f"**Rute Pemberian:** {advice['route']}")
-                st.write(f"**Catatan:** {advice['notes']}")
-                st.write(f"**Dokter:** {advice['doctor']}")
-
-with tab3:
-    st.title("Upload Data Vital")
+    with tab3:
+        tab_timer = METRICS.timer('tab.update_vital').start()
+        st.title("Upload Data Vital")
     
-    # Tab untuk data vital dan terapi
-    vital_tab, therapy_tab = st.tabs(["Data Vital Signs", "Pemantauan Terapi"])
+        # Tab untuk data vital dan terapi
+        vital_tab, therapy_tab = st.tabs(["Data Vital Signs", "Pemantauan Terapi"])
     
-    with vital_tab:
-        # Pilihan sumber data
-        data_source = st.radio("Sumber Data :", ["IoT Sensor"])
+        with vital_tab:
+            # Pilihan sumber data
+            data_source = st.radio("Sumber Data :", ["IoT Sensor"])
         
-        if data_source == "IoT Sensor":
-            st.info("Mengambil data dari sensor IoT...")
+            if data_source == "IoT Sensor":
+                st.info("Mengambil data dari sensor IoT...")
             
-            try:
-                # Baca file CSV terbaru dari folder data
-                data_dir = 'data'
-                if os.path.exists(data_dir):
-                    files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-                    if files:
-                        # Ambil file terbaru berdasarkan nama file (timestamp)
-                        latest_file = max(files)
-                        df_iot = pd.read_csv(os.path.join(data_dir, latest_file))
-                        
-                        st.success(f"Data berhasil diambil dari sensor! (File: {latest_file})")
-                        
+                try:
+                    # Ambil data terbaru dari snapshot ingestion bersama
+                    snapshot = ingestion_service.watch(current_patient_id())
+                    df_iot = snapshot.vitals.get(current_patient_id())
+                    if df_iot is not None:
+                        source = snapshot.sources.get(current_patient_id())
+                        st.success(f"Data berhasil diambil dari sensor! (Sumber: {source})")
+                    
                         # Preview data (20 data terakhir)
                         st.subheader("Preview Data Sensor (20 Data Terakhir)")
                         st.dataframe(df_iot.head(20))
-                        
+                    
                         # Langsung gunakan data tanpa tombol
                         df = df_iot
                         st.success("Data sensor otomatis diperbarui!")
                     else:
                         st.warning("Belum ada data sensor tersedia. Mohon tunggu...")
-                else:
-                    st.error("Folder data tidak ditemukan!")
                     
-            except Exception as e:
-                st.error(f"Terjadi kesalahan saat membaca data sensor: {str(e)}")
+                except Exception as e:
+                    st.error(f"Terjadi kesalahan saat membaca data sensor: {str(e)}")
 
-    with therapy_tab:
-        st.subheader("Dashboard Pemantauan Terapi")
+        with therapy_tab:
+            st.subheader("Dashboard Pemantauan Terapi")
         
-        if st.session_state.therapy_advice:
-            # Tampilkan ringkasan terapi aktif
-            st.markdown("### Terapi Aktif")
+            if record.therapy_advice:
+                # Tampilkan ringkasan terapi aktif
+                st.markdown("### Terapi Aktif")
             
-            # Buat tabel terapi
-            therapy_data = []
-            for advice in st.session_state.therapy_advice:
-                # Hitung waktu berakhir berdasarkan frekuensi
-                start_time = datetime.strptime(advice['timestamp'], '%Y-%m-%d %H:%M:%S')
-                # Asumsi durasi 1 jam untuk setiap pemberian
-                end_time = start_time + timedelta(hours=1)
-                
-                therapy_data.append({
-                    'Waktu Pemberian': advice['timestamp'],
-                    'Waktu Mulai': start_time,
-                    'Waktu Selesai': end_time,
-                    'Nama Obat': advice['medicine'],
-                    'Dosis': advice['dosage'],
-                    'Frekuensi': advice['frequency'],
-                    'Rute': advice['route'],
-                    'Dokter': advice['doctor']
+                # Tabel terapi langsung dari rekam pasien; jadwal hasil parsing frekuensi dari indeks dosis
+                df_therapy = pd.DataFrame(record.therapy_advice).rename(columns={
+                    'timestamp': 'Waktu Pemberian',
+                    'medicine': 'Nama Obat',
+                    'dosage': 'Dosis',
+                    'frequency': 'Frekuensi',
+                    'route': 'Rute',
+                    'doctor': 'Dokter'
                 })
+                df_therapy['Jadwal'] = [(dose_index.schedule(order_id) or parse_frequency(frequency)).label
+                                        for order_id, frequency in zip(df_therapy['order_id'], df_therapy['Frekuensi'])]
             
-            df_therapy = pd.DataFrame(therapy_data)
-            
-            # Tampilkan dalam format tabel
-            st.dataframe(
-                df_therapy[['Waktu Pemberian', 'Nama Obat', 'Dosis', 'Frekuensi', 'Rute', 'Dokter']],
-                use_container_width=True,
-                hide_index=True
-            )
+                # Tampilkan dalam format tabel
+                st.dataframe(
+                    df_therapy[['Waktu Pemberian', 'Nama Obat', 'Dosis', 'Frekuensi', 'Jadwal', 'Rute', 'Dokter']],
+                    use_container_width=True,
+                    hide_index=True
+                )
             
-            # Visualisasi distribusi rute pemberian
-            st.markdown("### Distribusi Rute Pemberian")
-            route_counts = pd.DataFrame(df_therapy['Rute'].value_counts()).reset_index()
-            route_counts.columns = ['Rute', 'Jumlah']
+                # Visualisasi distribusi rute pemberian
+                st.markdown("### Distribusi Rute Pemberian")
+                route_counts = pd.DataFrame(df_therapy['Rute'].value_counts()).reset_index()
+                route_counts.columns = ['Rute', 'Jumlah']
             
-            fig = px.pie(route_counts, 
-                        values='Jumlah', 
-                        names='Rute',
-                        title='Distribusi Rute Pemberian Obat')
-            st.plotly_chart(fig, use_container_width=True)
+                fig = px.pie(route_counts, 
+                            values='Jumlah', 
+                            names='Rute',
+                            title='Distribusi Rute Pemberian Obat')
+                plotly_chart(fig, use_container_width=True)
             
-            # Timeline terapi
-            st.markdown("### Timeline Terapi")
-            fig_timeline = px.timeline(
-                df_therapy,
-                x_start='Waktu Mulai',
-                x_end='Waktu Selesai',
-                y='Nama Obat',
-                color='Rute',
-                title='Timeline Pemberian Obat'
-            )
-            fig_timeline.update_yaxes(autorange="reversed")
-            st.plotly_chart(fig_timeline, use_container_width=True)
+                # Timeline dosis dari indeks dosis: terlambat (belum diberikan) sampai 24 jam ke depan
+                st.markdown("### Timeline Terapi")
+                now = datetime.now()
+                doses = dose_index.between(now - timedelta(milliseconds=OVERDUE_WINDOW_MS),
+                                           now + timedelta(milliseconds=SCHEDULE_HORIZON_MS),
+                                           patient_id=st.session_state.patient_id)
+                if doses:
+                    df_doses = dose_index.frame(doses, now)
+                    fig_timeline = px.scatter(
+                        df_doses,
+                        x='waktu',
+                        y='medicine',
+                        color='status',
+                        symbol='route',
+                        hover_data=['dosage'],
+                        labels={'waktu': 'Waktu', 'medicine': 'Nama Obat', 'status': 'Status', 'route': 'Rute'},
+                        color_discrete_map={'terlambat': 'red', 'terjadwal': 'royalblue'},
+                        title='Jadwal Pemberian Obat'
+                    )
+                    fig_timeline.add_vline(x=now, line_dash='dash', line_color='gray')
+                    fig_timeline.update_traces(marker={'size': 12})
+                    fig_timeline.update_yaxes(autorange="reversed")
+                    plotly_chart(fig_timeline, use_container_width=True)
+                else:
+                    st.caption("Tidak ada dosis terjadwal (frekuensi jika perlu atau tidak dikenali)")
             
-            # Tabel detail per obat
-            st.markdown("### Detail per Obat")
-            selected_medicine = st.selectbox(
-                "Pilih Obat",
-                options=df_therapy['Nama Obat'].unique()
-            )
+                # Tabel detail per obat
+                st.markdown("### Detail per Obat")
+                selected_medicine = st.selectbox(
+                    "Pilih Obat",
+                    options=df_therapy['Nama Obat'].unique()
+                )
             
-            medicine_details = df_therapy[df_therapy['Nama Obat'] == selected_medicine]
-            st.dataframe(
-                medicine_details[['Waktu Pemberian', 'Dosis', 'Frekuensi', 'Rute', 'Dokter']],
-                use_container_width=True,
-                hide_index=True
-            )
-        else:
-            st.info("Belum ada data terapi yang diinput")
+                medicine_details = df_therapy[df_therapy['Nama Obat'] == selected_medicine]
+                st.dataframe(
+                    medicine_details[['Waktu Pemberian', 'Dosis', 'Frekuensi', 'Jadwal', 'Rute', 'Dokter']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info("Belum ada data terapi yang diinput")
 
-with tab4:
-    st.title("Dashboard Durasi Perawatan")
-    
-    # Fungsi untuk menghitung durasi
-    def calculate_duration(history):
-        durations = {}
-        current_unit = None
-        current_time = None
-        
-        for record in history:
-            timestamp = datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S')
-            unit = record['unit']
-            status = record['status']
-            
-            if status == 'Masuk':
-                current_unit = unit
-                current_time = timestamp
-            elif status == 'Keluar' and current_unit == unit:
-                if unit not in durations:
-                    durations[unit] = timedelta()
-                duration = timestamp - current_time
-                durations[unit] += duration
-                current_unit = None
-                
-        # Tambahkan durasi untuk lokasi saat ini jika masih dalam perawatan
-        if current_unit:
-            if current_unit not in durations:
-                durations[current_unit] = timedelta()
-            durations[current_unit] += datetime.now() - current_time
-            
-        return durations
+            # Tampilan bangsal: dosis semua pasien yang jatuh tempo dan terlambat, langsung dari indeks dosis
+            st.markdown(f"### Dosis {DUE_SOON_MINUTES} Menit ke Depan (Semua Pasien)")
+            now = datetime.now()
+            due_doses = dose_index.overdue(now) + dose_index.due_soon(now)
+            if due_doses:
+                df_due = dose_index.frame(due_doses, now)
+                st.dataframe(
+                    df_due[['waktu', 'status', 'patient_id', 'medicine', 'dosage', 'route']].rename(columns={
+                        'waktu': 'Waktu', 'status': 'Status', 'patient_id': 'ID Pasien',
+                        'medicine': 'Nama Obat', 'dosage': 'Dosis', 'route': 'Rute'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                labels = {f"{dose.patient_id} - {dose.medicine} ({from_epoch_ms([dose.due])[0]:%H:%M})": dose
+                          for dose in due_doses}
+                given = st.multiselect("Dosis yang sudah diberikan", list(labels), key="doses_given")
+                if st.button("Tandai Diberikan", disabled=not given):
+                    patient_repository.record_administrations([(labels[label].order_id, labels[label].due) for label in given])
+                    for label in given:
+                        dose_index.mark_given(labels[label].order_id, labels[label].due)
+                    st.success(f"{len(given)} dosis ditandai diberikan")
+                    st.rerun()
+            else:
+                st.caption("Tidak ada dosis yang jatuh tempo atau terlambat")
+        tab_timer.stop()
+
+    with tab4:
+        tab_timer = METRICS.timer('tab.durasi_perawatan').start()
+        st.title("Dashboard Durasi Perawatan")
     
-    # Hitung durasi perawatan
-    durations = calculate_duration(st.session_state.location_history)
+        # Hitung durasi perawatan dari indeks ADT (tanpa membaca ulang seluruh riwayat)
+        durations = adt_store.patient_durations(st.session_state.patient_id)
     
-    # Tampilkan ringkasan durasi
-    st.subheader("Ringkasan Durasi Perawatan")
+        # Tampilkan ringkasan durasi
+        st.subheader("Ringkasan Durasi Perawatan")
     
-    # Buat dataframe untuk visualisasi
-    duration_data = []
-    for unit, duration in durations.items():
-        # Konversi durasi ke jam dan menit
-        total_seconds = duration.total_seconds()
-        hours = int(total_seconds // 3600)
-        minutes = int((total_seconds % 3600) // 60)
+        # Buat dataframe untuk visualisasi
+        duration_data = []
+        for unit, duration in durations.items():
+            # Konversi durasi ke jam dan menit
+            total_seconds = duration.total_seconds()
+            hours = int(total_seconds // 3600)
+            minutes = int((total_seconds % 3600) // 60)
         
-        duration_data.append({
-            'Unit': unit,
-            'Durasi (Jam)': round(total_seconds/3600, 2),
-            'Durasi Formatted': f"{hours} jam {minutes} menit",
-            'Dokter PJ': st.session_state.patient_data['Dokter Penanggung Jawab']
-        })
+            duration_data.append({
+                'Unit': unit,
+                'Durasi (Jam)': round(total_seconds/3600, 2),
+                'Durasi Formatted': f"{hours} jam {minutes} menit",
+                'Dokter PJ': record.patient_data['Dokter Penanggung Jawab']
+            })
     
-    df_duration = pd.DataFrame(duration_data)
+        df_duration = pd.DataFrame(duration_data, columns=['Unit', 'Durasi (Jam)', 'Durasi Formatted', 'Dokter PJ'])
     
-    # Visualisasi dengan bar chart
-    fig = px.bar(df_duration, 
-                 x='Unit', 
-                 y='Durasi (Jam)',
-                 title='Durasi Perawatan per Unit',
-                 text='Durasi Formatted')
+        # Visualisasi dengan bar chart
+        fig = px.bar(df_duration, 
+                     x='Unit', 
+                     y='Durasi (Jam)',
+                     title='Durasi Perawatan per Unit',
+                     text='Durasi Formatted')
     
-    fig.update_traces(textposition='outside')
-    st.plotly_chart(fig, use_container_width=True)
+        fig.update_traces(textposition='outside')
+        plotly_chart(fig, use_container_width=True)
     
-    # Tampilkan tabel detail
-    st.subheader("Detail Perawatan per Unit")
+        # Tampilkan tabel detail
+        st.subheader("Detail Perawatan per Unit")
     
-    # Format tabel
-    df_display = df_duration[['Unit', 'Durasi Formatted', 'Dokter PJ']]
-    df_display.columns = ['Unit Perawatan', 'Total Durasi', 'Dokter Penanggung Jawab']
+        # Format tabel
+        df_display = df_duration[['Unit', 'Durasi Formatted', 'Dokter PJ']]
+        df_display.columns = ['Unit Perawatan', 'Total Durasi', 'Dokter Penanggung Jawab']
     
-    # Tampilkan dalam format yang lebih menarik
-    st.dataframe(
-        df_display,
-        use_container_width=True,
-        hide_index=True
-    )
+        # Tampilkan dalam format yang lebih menarik
+        st.dataframe(
+            df_display,
+            use_container_width=True,
+            hide_index=True
+        )
     
-    # Tampilkan timeline detail
-    st.subheader("Timeline Detail Perpindahan")
+        # Tampilkan timeline detail
+        st.subheader("Timeline Detail Perpindahan")
     
-    # Buat dataframe untuk timeline
-    timeline_data = []
-    for record in st.session_state.location_history:
-        timeline_data.append({
-            'Waktu': record['timestamp'],
-            'Unit': record['unit'],
-            'Status': record['status']
+        # Buat dataframe untuk timeline
+        events = adt_store.patient_events(st.session_state.patient_id)
+        df_timeline = pd.DataFrame({
+            'Waktu': from_epoch_ms([event.timestamp for event in events]).strftime('%Y-%m-%d %H:%M:%S'),
+            'Unit': [event.unit for event in events],
+            'Status': [event.status for event in events]
         })
     
-    df_timeline = pd.DataFrame(timeline_data)
-    
-    # Tampilkan timeline dalam format tabel
-    st.dataframe(
-        df_timeline,
-        use_container_width=True,
-        hide_index=True
-    )
-
-with tab5:
-    st.title("Pemantauan Ketersediaan Bed")
-    
-    try:
-        # Baca file CSV terbaru dari folder bed_availability
-        bed_dir = 'data/bed_availability'
-        if os.path.exists(bed_dir):
-            bed_files = [f for f in os.listdir(bed_dir) if f.endswith('.csv')]
-            if bed_files:
-                latest_bed_file = max(bed_files)
-                df_bed = pd.read_csv(os.path.join(bed_dir, latest_bed_file))
-                
-                # Tampilkan waktu terakhir update
-                st.info(f"Terakhir diperbarui: {df_bed['timestamp'].iloc[0]}")
-                
-                # Tampilkan ringkasan dalam bentuk metrik
-                st.subheader("Status Ketersediaan Real-time")
-                cols = st.columns(len(df_bed))
-                
-                for i, (_, row) in enumerate(df_bed.iterrows()):
-                    with cols[i]:
-                        st.metric(
-                            label=row['unit'],
-                            value=f"{row['bed_tersedia']} Bed",
-                            delta=f"dari {row['kapasitas_total']} total"
-                        )
-                
-                # Visualisasi dengan bar chart
-                st.subheader("Visualisasi Ketersediaan Bed")
-                
-                # Siapkan data untuk visualisasi
-                fig = go.Figure(data=[
-                    go.Bar(name='Bed Terpakai', x=df_bed['unit'], y=df_bed['bed_terpakai']),
-                    go.Bar(name='Bed Tersedia', x=df_bed['unit'], y=df_bed['bed_tersedia'])
-                ])
-                
-                fig.update_layout(
-                    barmode='stack',
-                    title='Distribusi Ketersediaan Bed per Unit',
-                    xaxis_title='Unit',
-                    yaxis_title='Jumlah Bed'
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Tampilkan persentase okupansi
-                st.subheader("Persentase Okupansi")
-                df_bed['okupansi'] = (df_bed['bed_terpakai'] / df_bed['kapasitas_total'] * 100).round(1)
-                
-                # Gunakan gauge chart untuk menampilkan okupansi
-                for _, row in df_bed.iterrows():
-                    fig = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=row['okupansi'],
-                        title={'text': row['unit']},
-                        domain={'x': [0, 1], 'y': [0, 1]},
-                        gauge={
-                            'axis': {'range': [None, 100]},
-                            'steps': [
-                                {'range': [0, 50], 'color': "lightgreen"},
-                                {'range': [50, 75], 'color': "yellow"},
-                                {'range': [75, 100], 'color': "red"}
-                            ],
-                            'threshold': {
-                                'line': {'color': "red", 'width': 4},
-                                'thickness': 0.75,
-                                'value': 90
-                            }
-                        }
-                    ))
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Tampilkan data detail dalam tabel
-                st.subheader("Detail Status Bed per Unit")
-                st.dataframe(
-                    df_bed[['unit', 'kapasitas_total', 'bed_terpakai', 'bed_tersedia', 'okupansi']],
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-            else:
-                st.warning("Belum ada data ketersediaan bed. Mohon tunggu...")
+        # Tampilkan timeline dalam format tabel
+        st.dataframe(
+            df_timeline,
+            use_container_width=True,
+            hide_index=True
+        )
+
+        # Sensus dan lama rawat seluruh pasien dari indeks ADT bersama
+        st.subheader("Sensus dan Lama Rawat Semua Pasien")
+        census = adt_store.census()
+        if census.empty:
+            st.info("Belum ada event masuk/keluar unit")
         else:
-            st.error("Folder data bed availability tidak ditemukan!")
-            
-    except Exception as e:
-        st.error(f"Terjadi kesalahan saat membaca data ketersediaan bed: {str(e)}")
+            st.dataframe(
+                adt_store.length_of_stay().merge(census.reset_index(), on='unit', how='left'),
+                use_container_width=True,
+                hide_index=True
+            )
+
+            # Query interval: siapa yang berada di suatu unit pada rentang waktu tertentu
+            st.markdown("**Pasien di Unit pada Rentang Waktu**")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                query_unit = st.selectbox("Unit", sorted(census.index), key="adt_query_unit")
+            with col2:
+                query_start = st.date_input("Dari tanggal", datetime.now().date(), key="adt_query_start")
+            with col3:
+                query_end = st.date_input("Sampai tanggal", datetime.now().date(), key="adt_query_end")
+            t1 = datetime.combine(query_start, datetime.min.time())
+            t2 = datetime.combine(query_end, datetime.max.time())
+            present = adt_store.patients_in(query_unit, t1, t2)
+            st.write(f"{len(present)} pasien berada di {query_unit} antara {t1:%Y-%m-%d} dan {t2:%Y-%m-%d}")
+            if present:
+                st.dataframe(pd.DataFrame({'ID Pasien': present}), use_container_width=True, hide_index=True)
+        tab_timer.stop()
+
+    with tab5:
+        tab_timer = METRICS.timer('tab.ketersediaan_bed').start()
+        st.title("Pemantauan Ketersediaan Bed")
     
-    
\ No newline at end of file
+        # Bagian bed: jadwal refresh sendiri
+        @st.fragment(run_every=BED_REFRESH_SECONDS)
+        @METRICS.timed('fragment.bed', profile_slow_ms=PROFILE_SLOW_MS)
+        def bed_section():
+            try:
+                # Ambil data bed terbaru dari snapshot ingestion bersama
+                snapshot = ingestion_service.snapshot()
+                if snapshot.beds is not None:
+                    units = load_units()
+                    df_all = add_occupancy(attach_units(snapshot.beds, units))
+            
+                    # Tampilkan waktu terakhir update
+                    st.info(f"Terakhir diperbarui: {df_all['timestamp'].iloc[0]}")
+
+                    # Filter gedung/lantai dan pengelompokan; semua perhitungan di bawah hanya untuk unit terpilih
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        buildings = st.multiselect("Gedung", sorted(df_all['gedung'].unique()), key="bed_buildings")
+                    with col2:
+                        floor_options = filter_units(df_all, buildings)['lantai'].unique()
+                        floors = st.multiselect("Lantai", sorted(floor_options), key="bed_floors")
+                    with col3:
+                        group_by = st.selectbox("Kelompokkan per", list(GROUPINGS), format_func=GROUPINGS.get,
+                                                index=0 if len(df_all) <= MAX_UNIT_BARS else 1, key="bed_group_by")
+                    df_bed = filter_units(df_all, buildings, floors)
+                    if df_bed.empty:
+                        st.warning("Tidak ada unit untuk filter yang dipilih")
+                        return
+            
+                    # Tampilkan ringkasan dalam bentuk metrik (total unit terpilih)
+                    st.subheader("Status Ketersediaan Real-time")
+                    totals = df_bed[['kapasitas_total', 'bed_terpakai', 'bed_tersedia']].sum()
+                    cols = st.columns(4)
+                    cols[0].metric("Unit", f"{len(df_bed)}")
+                    cols[1].metric("Bed Tersedia", f"{totals['bed_tersedia']} Bed", delta=f"dari {totals['kapasitas_total']} total")
+                    cols[2].metric("Bed Terpakai", f"{totals['bed_terpakai']} Bed")
+                    cols[3].metric("Okupansi", f"{totals['bed_terpakai'] / max(totals['kapasitas_total'], 1) * 100:.1f}%")
+            
+                    # Visualisasi dengan bar chart per kelompok
+                    st.subheader("Visualisasi Ketersediaan Bed")
+                    df_groups = summarize_groups(df_bed, group_by)
+                    fig = build_availability_figure(df_groups)
+                    plotly_chart(fig, use_container_width=True)
+            
+                    # Okupansi semua unit terpilih dalam satu heatmap
+                    st.subheader("Persentase Okupansi")
+                    plotly_chart(build_occupancy_heatmap(df_bed), use_container_width=True)
+            
+                    # Tampilkan data detail dalam tabel
+                    st.subheader(f"Detail Status Bed per {GROUPINGS[group_by]}")
+                    st.dataframe(
+                        df_groups if group_by != 'unit' else
+                        df_bed[['unit', 'gedung', 'lantai', 'kapasitas_total', 'bed_terpakai', 'bed_tersedia', 'okupansi']],
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+                    # Statistik okupansi dan prediksi sensus, diperbarui inkremental oleh thread ingestion
+                    if snapshot.bed_stats is not None:
+                        st.subheader("Tren dan Prediksi Sensus")
+                        df_stats = snapshot.bed_stats[snapshot.bed_stats['unit'].isin(df_bed['unit'])]
+                        filling = df_stats[df_stats['penuh_dalam_menit'].notna()].sort_values('penuh_dalam_menit')
+                        if not filling.empty:
+                            names = [f"{unit} ({minutes:.0f} menit)" for unit, minutes
+                                     in zip(filling['unit'].head(MAX_FULL_WARNINGS), filling['penuh_dalam_menit'])]
+                            more = len(filling) - len(names)
+                            st.warning("Diperkirakan penuh: " + ", ".join(names) + (f" dan {more} unit lainnya" if more else ""))
+
+                        hours = st.selectbox("Rentang riwayat", [1, 6, 24], index=1, format_func=lambda h: f"{h} jam",
+                                             key="bed_history_hours")
+                        history = ingestion_service.bed_census.history
+                        ring_units = attach_units(pd.DataFrame({'unit': ingestion_service.bed_census.units}), units)
+                        labels = group_labels(ring_units, group_by).where(ring_units['unit'].isin(df_bed['unit']))
+                        if group_by == 'unit' and labels.notna().sum() > MAX_CENSUS_SERIES:
+                            # Terlalu banyak garis: tampilkan unit dengan okupansi tertinggi
+                            top = df_bed.nlargest(MAX_CENSUS_SERIES, 'okupansi')['unit']
+                            labels = labels.where(ring_units['unit'].isin(top))
+                            st.caption(f"Menampilkan {MAX_CENSUS_SERIES} unit dengan okupansi tertinggi; "
+                                       "kelompokkan per gedung/lantai untuk melihat semua unit")
+                        df_history = history.grouped_window_frame(hours * 3600, labels.tolist())
+                        df_forecast = None
+                        if snapshot.bed_forecast is not None:
+                            df_forecast = snapshot.bed_forecast.assign(
+                                unit=snapshot.bed_forecast['unit'].map(dict(zip(ring_units['unit'], labels))))
+                            df_forecast = df_forecast.dropna(subset=['unit']).groupby(
+                                ['timestamp', 'unit'], as_index=False)['prediksi_terpakai'].sum()
+                        if df_history is not None:
+                            plotly_chart(build_census_figure(df_history, df_forecast), use_container_width=True)
+                        st.dataframe(df_stats, use_container_width=True, hide_index=True)
+            
+                else:
+                    st.warning("Belum ada data ketersediaan bed. Mohon tunggu...")
+            
+            except Exception as e:
+                st.error(f"Terjadi kesalahan saat membaca data ketersediaan bed: {str(e)}")
+
+        bed_section()
+        tab_timer.stop()
+
+    # Panel diagnostik tersembunyi: buka dashboard dengan ?diagnostics=1
+    if st.query_params.get("diagnostics") == "1":
+        with st.sidebar.expander("Diagnostik Performa", expanded=True):
+            st.dataframe(pd.DataFrame(METRICS.summary()).round(2), use_container_width=True, hide_index=True)
+            cache_stats = get_forecast_engine().cache.stats()
+            st.caption(f"Cache prediksi: {cache_stats['size']} entri, hit rate {cache_stats['hit_rate']:.0%}")
+            st.caption(f"Metrik Prometheus: {METRICS_FILE}")
+            if st.button("Profil rerun berikutnya"):
+                st.session_state.profile_next_rerun = True
+
+# Instrumentasi: durasi seluruh rerun dan profiler sampling opsional untuk rerun yang lambat.
+# Dihentikan di finally agar st.rerun() atau exception tidak meninggalkan thread profiler
+rerun_timer = METRICS.timer('script_run').start()
+profile_forced = st.session_state.pop('profile_next_rerun', False)
+rerun_profiler = SamplingProfiler().start() if profile_forced or PROFILE_SLOW_MS else None
+try:
+    render_page()
+finally:
+    rerun_timer.stop()
+    profile_path = finish_profile(rerun_profiler, 0 if profile_forced else PROFILE_SLOW_MS)
+if profile_path is not None and profile_forced:
+    st.toast(f"Profil rerun disimpan ke {profile_path}")
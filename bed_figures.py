@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from downsampling import downsample_frame, PIXEL_BUDGET
+
+HEATMAP_MAX_COLUMNS = 20  # unit per baris heatmap
+DEFAULT_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
+
+
+def add_occupancy(df_bed):
+    # Persentase okupansi per unit
+    df_bed['okupansi'] = (df_bed['bed_terpakai'] / df_bed['kapasitas_total'] * 100).round(1)
+    return df_bed
+
+
+def build_availability_figure(df_bed):
+    # Bar chart bertumpuk bed terpakai dan tersedia per unit
+    fig = go.Figure(data=[
+        go.Bar(name='Bed Terpakai', x=df_bed['unit'], y=df_bed['bed_terpakai']),
+        go.Bar(name='Bed Tersedia', x=df_bed['unit'], y=df_bed['bed_tersedia'])
+    ])
+    
+    fig.update_layout(
+        barmode='stack',
+        title='Distribusi Ketersediaan Bed per Unit',
+        xaxis_title='Unit',
+        yaxis_title='Jumlah Bed'
+    )
+    return fig
+
+
+def build_occupancy_heatmap(df_bed, max_columns=HEATMAP_MAX_COLUMNS):
+    # Okupansi semua unit dalam satu heatmap (satu trace, diserialisasi sekali):
+    # satu baris per gedung/lantai, unit di lantai yang sama berjajar ke kanan
+    # (lantai dengan unit lebih dari max_columns dilanjutkan ke baris berikutnya)
+    df_bed = df_bed.sort_values(['gedung', 'lantai', 'unit'])
+    floor = (df_bed['gedung'] + ' / Lt ' + df_bed['lantai'].astype(str)).to_numpy()
+    position = df_bed.groupby(floor, sort=False).cumcount().to_numpy()
+    row_label = np.where(position >= max_columns,
+                         floor + ' (' + (position // max_columns + 1).astype(str) + ')', floor)
+    rows, labels = pd.factorize(row_label)
+    columns = position % max_columns
+    n_columns = columns.max() + 1
+
+    z = np.full((len(labels), n_columns), np.nan)
+    z[rows, columns] = df_bed['okupansi'].to_numpy()
+    text = np.full(z.shape, '', dtype=object)
+    text[rows, columns] = (df_bed['unit'] + '<br>' + df_bed['bed_terpakai'].astype(str) + '/'
+                           + df_bed['kapasitas_total'].astype(str) + ' bed').to_numpy()
+
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        y=list(labels),
+        customdata=text,
+        hovertemplate='%{customdata}<br>Okupansi %{z}%<extra></extra>',
+        zmin=0,
+        zmax=100,
+        colorscale=[[0, 'lightgreen'], [0.5, 'lightgreen'], [0.75, 'yellow'], [0.9, 'red'], [1, 'darkred']],
+        colorbar={'title': 'Okupansi (%)'},
+        xgap=2,
+        ygap=2
+    ))
+    fig.update_layout(
+        title='Peta Okupansi per Unit',
+        xaxis={'visible': False},
+        yaxis={'autorange': 'reversed'},
+        height=max(300, 28 * len(labels) + 120)
+    )
+    return fig
+
+
+def build_census_figure(df_history, df_forecast=None, n_out=PIXEL_BUDGET):
+    # Riwayat bed terpakai per unit (garis) dan prediksi sensus Holt (garis putus-putus)
+    fig = go.Figure()
+    for i, (unit, group) in enumerate(df_history.groupby('unit', sort=False)):
+        color = DEFAULT_COLORS[i % len(DEFAULT_COLORS)]
+        group = downsample_frame(group, 'timestamp', 'bed_terpakai', n_out)
+        fig.add_trace(go.Scatter(x=group['timestamp'], y=group['bed_terpakai'], mode='lines',
+                                 name=unit, legendgroup=unit, line=dict(color=color)))
+        if df_forecast is None:
+            continue
+        forecast = df_forecast[df_forecast['unit'] == unit]
+        # Sambungkan prediksi ke snapshot terakhir agar garisnya kontinu
+        x = [group['timestamp'].iloc[-1]] + forecast['timestamp'].tolist()
+        y = [group['bed_terpakai'].iloc[-1]] + forecast['prediksi_terpakai'].tolist()
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=f'{unit} (prediksi)', legendgroup=unit,
+                                 showlegend=False, line=dict(color=color, dash='dash')))
+
+    fig.update_layout(
+        title='Riwayat dan Prediksi Bed Terpakai per Unit',
+        xaxis_title='Waktu',
+        yaxis_title='Bed Terpakai',
+        hovermode='x unified'
+    )
+    return fig
@@ -0,0 +1,282 @@
+import os
+import numpy as np
+import pandas as pd
+from vital_store import VitalBlockRing, from_epoch_ms, to_epoch_ms, DEFAULT_STORE_DIR
+
+# Riwayat ketersediaan bed: satu blok kolumnar (tick x unit) per snapshot, seperti ring multi-pasien
+BED_DTYPE = np.dtype([
+    ('timestamp', '<i8'),                 # epoch milidetik (waktu lokal)
+    ('kapasitas_total', '<i2'),
+    ('bed_terpakai', '<i2'),
+    ('bed_tersedia', '<i2'),
+])
+BED_HISTORY_PATH = os.path.join(DEFAULT_STORE_DIR, 'beds.vblock')
+BED_HISTORY_CAPACITY = 17280  # 24 jam snapshot dengan interval 5 detik
+
+# Statistik okupansi dan prediksi sensus (Holt: level + tren, diperbarui per snapshot)
+EWMA_ALPHA = 0.1
+# Konstanta waktu pemulusan (detik): bobot per snapshot = 1 - exp(-jarak / tau), sehingga hasilnya
+# tidak bergantung pada interval snapshot (5 detik atau 1 menit sama-sama memulus selama tau)
+HOLT_LEVEL_TAU = 10 * 60
+HOLT_TREND_TAU = 60 * 60
+FORECAST_HORIZONS = [15 * 60, 30 * 60, 60 * 60, 2 * 60 * 60, 4 * 60 * 60]  # detik
+CAPACITY_HORIZON = FORECAST_HORIZONS[-1]  # waktu sampai penuh hanya dilaporkan dalam horizon prediksi terjauh
+
+
+class BedHistory:
+    # Menyimpan setiap snapshot bed (semua unit sekaligus) ke ring buffer blok
+
+    def __init__(self, path=BED_HISTORY_PATH, capacity=BED_HISTORY_CAPACITY, readonly=False):
+        self.path = path
+        self.capacity = capacity
+        self.readonly = readonly
+        self.ring = None
+        self.inode = None
+
+    def block(self, units=None):
+        if self.readonly:
+            # Buka ulang jika generator membuat blok baru (daftar unit berubah)
+            if not os.path.exists(self.path):
+                return None
+            inode = os.stat(self.path).st_ino
+            if self.ring is None or inode != self.inode:
+                self.ring = VitalBlockRing(self.path, readonly=True, dtype=BED_DTYPE)
+                self.inode = inode
+            return self.ring
+
+        if self.ring is None or (units is not None and self.ring.patient_ids != list(units)):
+            if units is not None and os.path.exists(self.path):
+                ring = VitalBlockRing(self.path, readonly=False, dtype=BED_DTYPE)
+                if ring.patient_ids != list(units) or ring.capacity != self.capacity:
+                    # Daftar unit berbeda, ganti dengan blok baru
+                    del ring
+                    os.remove(self.path)
+            if units is None and not os.path.exists(self.path):
+                return None
+            self.ring = VitalBlockRing(self.path, patient_ids=units, capacity=self.capacity, dtype=BED_DTYPE)
+        return self.ring
+
+    def append(self, df_bed, current_time=None):
+        # df_bed: satu snapshot (satu baris per unit) seperti hasil generate_bed_availability
+        units = df_bed['unit'].astype(str).tolist()
+        ring = self.block(units)
+        records = np.empty(len(units), dtype=BED_DTYPE)
+        timestamp = df_bed['timestamp'] if current_time is None else [current_time] * len(units)
+        records['timestamp'] = to_epoch_ms(timestamp)
+        for name in BED_DTYPE.names[1:]:
+            records[name] = df_bed[name].to_numpy()
+        ring.append_block(records)
+
+    def latest_frame(self):
+        # Snapshot terakhir dalam format yang sama dengan file bed_status
+        ring = self.block()
+        if ring is None or ring.count == 0:
+            return None
+        df = pd.DataFrame({name: ring.latest(1, name)[0] for name in BED_DTYPE.names})
+        df.insert(1, 'unit', ring.patient_ids)
+        df['timestamp'] = from_epoch_ms(df['timestamp'])
+        return df
+
+    def history_frame(self, n):
+        # n tick terakhir sebagai DataFrame panjang (timestamp, unit, ...), urut dari lama ke baru
+        ring = self.block()
+        if ring is None or ring.count == 0:
+            return None
+        columns = {name: ring.latest(n, name)[::-1] for name in BED_DTYPE.names}
+        n_ticks, n_units = columns['timestamp'].shape
+        df = pd.DataFrame({name: values.ravel() for name, values in columns.items()})
+        df.insert(1, 'unit', np.tile(np.asarray(ring.patient_ids), n_ticks))
+        df['timestamp'] = from_epoch_ms(df['timestamp'])
+        return df
+
+    def _window_length(self, ring, seconds):
+        # Jumlah tick dalam beberapa detik terakhir (diukur dari snapshot terbaru), tanpa asumsi interval tetap
+        timestamps = ring.latest(min(ring.count, ring.capacity), 'timestamp')[:, 0]
+        return int(np.count_nonzero(timestamps >= timestamps[0] - seconds * 1000))
+
+    def window_frame(self, seconds):
+        ring = self.block()
+        if ring is None or ring.count == 0:
+            return None
+        return self.history_frame(self._window_length(ring, seconds))
+
+    def grouped_window_frame(self, seconds, labels):
+        # Riwayat beberapa detik terakhir dijumlahkan per kelompok (mis. gedung). labels sejajar dengan
+        # urutan unit di ring, None = unit tidak diikutkan. Penjumlahan lewat perkalian matriks
+        # (tick x unit) @ (unit x kelompok), sehingga ukurannya tetap kecil walaupun unit ratusan
+        ring = self.block()
+        if ring is None or ring.count == 0 or len(labels) != len(ring.patient_ids):
+            return None
+        n = self._window_length(ring, seconds)
+        codes, groups = pd.factorize(pd.Series(labels, dtype=object))
+        selected = np.flatnonzero(codes >= 0)
+        membership = np.zeros((len(codes), len(groups)))
+        membership[selected, codes[selected]] = 1
+        timestamps = ring.latest(n, 'timestamp')[::-1, 0]
+        df = pd.DataFrame({'timestamp': from_epoch_ms(np.repeat(timestamps, len(groups))),
+                           'unit': np.tile(np.asarray(groups, dtype=object), n)})
+        for name in BED_DTYPE.names[1:]:
+            df[name] = (ring.latest(n, name)[::-1] @ membership).ravel()
+        return df
+
+    def flush(self):
+        if self.ring is not None:
+            self.ring.flush()
+
+
+class OccupancyStats:
+    # Statistik okupansi (%) per unit yang diperbarui per snapshot tanpa membaca ulang riwayat:
+    # jumlah, rata-rata dan varians (digabung per batch), minimum, maksimum, EWMA dan nilai terakhir
+
+    def __init__(self, n_units):
+        self.count = 0
+        self.mean = np.zeros(n_units)
+        self.m2 = np.zeros(n_units)
+        self.min = np.full(n_units, np.inf)
+        self.max = np.full(n_units, -np.inf)
+        self.ewma = np.zeros(n_units)
+        self.last = np.full(n_units, np.nan)
+
+    def update(self, occupancy):
+        # occupancy: (snapshot, unit), terlama dulu; beberapa snapshot digabung sekaligus
+        occupancy = np.atleast_2d(occupancy)
+        n = len(occupancy)
+        if n == 0:
+            return
+        batch_mean = occupancy.mean(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.m2 = self.m2 + ((occupancy - batch_mean) ** 2).sum(axis=0) + delta ** 2 * self.count * n / total
+        self.mean = self.mean + delta * n / total
+        self.min = np.minimum(self.min, occupancy.min(axis=0))
+        self.max = np.maximum(self.max, occupancy.max(axis=0))
+        # EWMA dalam bentuk tertutup: bobot (1 - alpha)^k untuk snapshot ke-k dari yang terbaru
+        prior, rest = (self.ewma, occupancy) if self.count else (occupancy[0], occupancy[1:])
+        decay = (1 - EWMA_ALPHA) ** np.arange(len(rest) - 1, -1, -1)
+        self.ewma = (1 - EWMA_ALPHA) ** len(rest) * prior + EWMA_ALPHA * (decay @ rest)
+        self.last = occupancy[-1]
+        self.count = total
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+
+class HoltCensus:
+    # Prediksi sensus (bed terpakai) per unit dengan pemulusan eksponensial ganda (Holt).
+    # Tren dalam bed per detik sehingga interval snapshot tidak harus tetap; satu update = O(unit)
+
+    def __init__(self, n_units, level_tau=HOLT_LEVEL_TAU, trend_tau=HOLT_TREND_TAU):
+        self.level_tau = level_tau
+        self.trend_tau = trend_tau
+        self.level = None
+        self.trend = np.zeros(n_units)
+        self.last_timestamp = None
+
+    def update(self, timestamp_ms, census):
+        census = np.asarray(census, dtype=float)
+        if self.level is None:
+            self.level = census.copy()
+            self.last_timestamp = timestamp_ms
+            return
+        seconds = (timestamp_ms - self.last_timestamp) / 1000
+        if seconds <= 0:
+            return
+        alpha = 1 - np.exp(-seconds / self.level_tau)
+        beta = 1 - np.exp(-seconds / self.trend_tau)
+        predicted = self.level + self.trend * seconds
+        level = alpha * census + (1 - alpha) * predicted
+        self.trend = beta * (level - self.level) / seconds + (1 - beta) * self.trend
+        self.level = level
+        self.last_timestamp = timestamp_ms
+
+    def forecast(self, horizons, capacity=None):
+        # Hasil (unit, horizon) dalam jumlah bed; dibatasi 0..kapasitas jika diberikan
+        values = self.level[:, np.newaxis] + self.trend[:, np.newaxis] * np.asarray(horizons, dtype=float)
+        upper = np.inf if capacity is None else np.asarray(capacity, dtype=float)[:, np.newaxis]
+        return np.clip(values, 0, upper)
+
+    def seconds_until(self, target):
+        # Perkiraan detik sampai sensus mencapai target; inf jika tren tidak menuju target
+        target = np.asarray(target, dtype=float)
+        remaining = target - self.level
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seconds = np.where(self.trend > 0, remaining / self.trend, np.inf)
+        return np.where(remaining <= 0, 0.0, seconds)
+
+
+class BedCensusTracker:
+    # Membaca snapshot bed baru dari ring (hanya tick yang belum diproses) dan memperbarui
+    # statistik okupansi serta prediksi sensus per unit secara inkremental
+
+    def __init__(self, history=None):
+        self.history = history or BedHistory(readonly=True)
+        self.ring = None
+        self.processed = 0
+        self.units = []
+        self.stats = None
+        self.census = None
+        self.capacity = None
+
+    def refresh(self):
+        # True jika ada snapshot baru yang diproses
+        ring = self.history.block()
+        if ring is None:
+            return False
+        if ring is not self.ring:
+            # Blok baru (mis. daftar unit berubah): mulai ulang dari isi ring
+            self.ring = ring
+            self.units = list(ring.patient_ids)
+            self.processed = 0
+            self.stats = OccupancyStats(len(self.units))
+            self.census = HoltCensus(len(self.units))
+        count = ring.count
+        new = min(count - self.processed, ring.capacity)
+        if new <= 0:
+            return False
+        timestamps = ring.latest(new, 'timestamp')[::-1]
+        used = ring.latest(new, 'bed_terpakai')[::-1].astype(float)
+        capacity = ring.latest(new, 'kapasitas_total')[::-1].astype(float)
+        occupancy = used / np.maximum(capacity, 1) * 100
+        self.stats.update(occupancy)
+        # Holt bersifat rekursif: satu langkah per snapshot baru (terlama dulu), vektor untuk semua unit
+        for i in range(new):
+            self.census.update(int(timestamps[i, 0]), used[i])
+        self.capacity = capacity[-1]
+        self.processed = count
+        return True
+
+    def summary(self):
+        # Satu baris per unit: okupansi terkini, statistik, tren dan prediksi sensus
+        if self.stats is None or self.stats.count == 0:
+            return None
+        forecast = self.census.forecast([60 * 60], self.capacity)[:, 0]
+        seconds_full = self.census.seconds_until(self.capacity)
+        full_in = np.where(seconds_full <= CAPACITY_HORIZON, seconds_full / 60, np.nan)
+        return pd.DataFrame({
+            'unit': self.units,
+            'kapasitas_total': self.capacity.astype(int),
+            'okupansi': np.round(self.stats.last, 1),
+            'rata_rata': np.round(self.stats.mean, 1),
+            'std': np.round(self.stats.std, 1),
+            'min': np.round(self.stats.min, 1),
+            'maks': np.round(self.stats.max, 1),
+            'ewma': np.round(self.stats.ewma, 1),
+            'tren_per_jam': np.round(self.census.trend * 3600, 2),
+            'prediksi_1_jam': np.round(forecast, 1),
+            'penuh_dalam_menit': np.round(full_in, 0),
+            'jumlah_snapshot': self.stats.count,
+        })
+
+    def forecast_frame(self, horizons=FORECAST_HORIZONS):
+        # Prediksi sensus per unit untuk beberapa horizon, format panjang (timestamp, unit, prediksi)
+        if self.census is None or self.census.level is None:
+            return None
+        values = self.census.forecast(horizons, self.capacity)
+        start = self.census.last_timestamp
+        timestamps = from_epoch_ms(start + np.asarray(horizons, dtype='<i8') * 1000)
+        return pd.DataFrame({
+            'timestamp': np.tile(timestamps, len(self.units)),
+            'unit': np.repeat(self.units, len(horizons)),
+            'prediksi_terpakai': values.ravel(),
+        })
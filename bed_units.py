@@ -0,0 +1,109 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Daftar unit (ruangan) rumah sakit: satu baris per unit dengan gedung, lantai dan kapasitas bed.
+# Dibaca dari file konfigurasi CSV/JSON; tanpa file dipakai empat unit bawaan
+UNITS_FILE = os.environ.get('BED_UNITS_FILE', 'data/config/units.csv')
+UNIT_COLUMNS = ['unit', 'gedung', 'lantai', 'kapasitas_total']
+DEFAULT_UNITS = pd.DataFrame([
+    {'unit': 'Instalasi Gawat Darurat', 'gedung': 'Gedung Utama', 'lantai': 1, 'kapasitas_total': 10},
+    {'unit': 'Ruang ICU', 'gedung': 'Gedung Utama', 'lantai': 2, 'kapasitas_total': 8},
+    {'unit': 'Instalasi Bedah Sentral', 'gedung': 'Gedung Utama', 'lantai': 2, 'kapasitas_total': 5},
+    {'unit': 'Ruang Rawat Inap', 'gedung': 'Gedung Utama', 'lantai': 3, 'kapasitas_total': 20},
+])
+UNKNOWN_BUILDING = 'Lainnya'
+# Pilihan pengelompokan di dashboard: kolom -> label
+GROUPINGS = {'unit': 'Unit', 'gedung': 'Gedung', 'lantai': 'Lantai'}
+
+_cache = {}
+
+
+def load_units(path=UNITS_FILE):
+    # Daftar unit dari file konfigurasi; dibaca ulang hanya jika file berubah
+    if not os.path.exists(path):
+        return DEFAULT_UNITS
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    if path.endswith('.json'):
+        units = pd.read_json(path)
+    else:
+        units = pd.read_csv(path)
+    missing = [column for column in UNIT_COLUMNS if column not in units]
+    if missing:
+        raise ValueError(f"Konfigurasi unit {path} tidak memiliki kolom: {', '.join(missing)}")
+    units = units[UNIT_COLUMNS].drop_duplicates('unit').reset_index(drop=True)
+    units['unit'] = units['unit'].astype(str)
+    units['gedung'] = units['gedung'].astype(str)
+    units['lantai'] = units['lantai'].astype(int)
+    units['kapasitas_total'] = units['kapasitas_total'].astype(int)
+    _cache[path] = (mtime, units)
+    return units
+
+
+def generate_units(n_units, n_buildings=4, floors=8, seed=0):
+    # Daftar unit sintetis untuk grup rumah sakit besar (mis. 300 bangsal), dibagi rata ke gedung dan lantai
+    rng = np.random.default_rng(seed)
+    index = np.arange(n_units)
+    building = index % n_buildings
+    floor = (index // n_buildings) % floors + 1
+    number = index // (n_buildings * floors) + 1
+    letters = np.array([chr(ord('A') + i % 26) for i in range(n_buildings)])
+    return pd.DataFrame({
+        'unit': [f'Gedung {b} Lt {f} - Bangsal {n:02d}' for b, f, n in zip(letters[building], floor, number)],
+        'gedung': [f'Gedung {b}' for b in letters[building]],
+        'lantai': floor,
+        'kapasitas_total': rng.integers(4, 31, n_units),
+    })
+
+
+def attach_units(df, units=None):
+    # Tambahkan kolom gedung dan lantai ke DataFrame per unit; unit di luar konfigurasi masuk "Lainnya"
+    units = load_units() if units is None else units
+    df = df.merge(units[['unit', 'gedung', 'lantai']], on='unit', how='left')
+    df['gedung'] = df['gedung'].fillna(UNKNOWN_BUILDING)
+    df['lantai'] = df['lantai'].fillna(0).astype(int)
+    return df
+
+
+def group_labels(df, by):
+    # Label kelompok per baris; lantai diberi nama gedungnya agar lantai 3 di dua gedung tidak tergabung
+    if by == 'lantai':
+        return df['gedung'] + ' / Lt ' + df['lantai'].astype(str)
+    return df[by].astype(str)
+
+
+def filter_units(df, buildings=None, floors=None):
+    # Saring DataFrame per unit berdasarkan gedung dan lantai (None atau kosong = semua)
+    mask = np.ones(len(df), dtype=bool)
+    if buildings:
+        mask &= df['gedung'].isin(buildings).to_numpy()
+    if floors:
+        mask &= df['lantai'].isin(floors).to_numpy()
+    return df[mask]
+
+
+def summarize_groups(df_bed, by):
+    # Jumlah kapasitas, bed terpakai dan tersedia per kelompok, dengan okupansi kelompok
+    columns = ['kapasitas_total', 'bed_terpakai', 'bed_tersedia']
+    grouped = df_bed[columns].groupby(group_labels(df_bed, by).to_numpy(), sort=True).sum()
+    grouped['okupansi'] = (grouped['bed_terpakai'] / grouped['kapasitas_total'].clip(lower=1) * 100).round(1)
+    grouped['jumlah_unit'] = df_bed.groupby(group_labels(df_bed, by).to_numpy(), sort=True).size()
+    return grouped.rename_axis('unit').reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buat file konfigurasi unit sintetis untuk simulasi")
+    parser.add_argument("--units", type=int, default=300)
+    parser.add_argument("--buildings", type=int, default=4)
+    parser.add_argument("--floors", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=UNITS_FILE)
+    args = parser.parse_args()
+    units = generate_units(args.units, args.buildings, args.floors, args.seed)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    units.to_csv(args.output, index=False)
+    print(f"{len(units)} unit di {units['gedung'].nunique()} gedung ditulis ke {args.output}")
@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from data_generator import (generate_vital_signs_data, generate_bed_availability, generator_tick,
+                            DATA_DIR, BED_DIR)
+from csv_publisher import CsvPublisher, RetentionPolicy
+from columnar_io import write_frame, read_frame
+from ingestion import newest_file
+from alert_rules import check_critical_conditions
+from validation import validate_block
+from forecasting import fit_arima, FORECAST_STEPS
+from patient_flow import calculate_duration
+from adt_store import AdtStore
+from therapy_schedule import DoseIndex
+from bed_figures import add_occupancy, build_availability_figure, build_occupancy_heatmap
+from bed_units import generate_units, summarize_groups
+from vital_store import VITAL_PARAMETERS
+
+SEED = 42
+RESULTS_DIR = 'data/benchmarks'
+REGRESSION_THRESHOLD = 0.2  # lebih lambat 20% dari hasil pembanding dianggap regresi
+
+# Ukuran input dasar per benchmark; dikalikan dengan --scale
+BASE_SIZES = {
+    'generate_vital_signs_data': [1, 100],
+    'generate_bed_availability': [1, 100],
+    'generator_tick_csv': [10, 100],
+    'check_critical_conditions': [10, 500, 10000],
+    'validate_block': [100, 10000],
+    'arima_fit_forecast': [100, 500],
+    'calculate_duration': [100, 10000],
+    'adt_queries': [100, 10000],
+    'dose_due_soon': [100, 10000],
+    'bed_figures': [4, 300],
+    'read_newest_file': [10, 1000],
+}
+
+
+def make_vitals_frame(n_rows, rng):
+    # DataFrame tanda vital seperti hasil generator, terbaru di baris 0
+    timestamps = pd.date_range(end='2024-01-01', periods=n_rows, freq='5s')[::-1]
+    return pd.DataFrame({
+        'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'heart_rate': rng.normal(75, 5, n_rows).astype(int),
+        'blood_pressure_systolic': rng.normal(120, 10, n_rows).astype(int),
+        'blood_pressure_diastolic': rng.normal(80, 8, n_rows).astype(int),
+        'oxygen_saturation': rng.normal(98, 1, n_rows).astype(int),
+        'temperature': rng.normal(37, 0.3, n_rows).round(1),
+    })
+
+
+def make_location_history(n_records, rng):
+    units = ['Instalasi Gawat Darurat', 'Ruang ICU', 'Instalasi Bedah Sentral', 'Ruang Rawat Inap']
+    start = datetime(2024, 1, 1)
+    history = []
+    for i in range(n_records):
+        history.append({
+            'timestamp': (start + timedelta(minutes=30 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'unit': units[(i // 2) % len(units)],
+            'status': 'Masuk' if i % 2 == 0 else 'Keluar',
+        })
+    return history
+
+
+def make_adt_events(n_patients, rng):
+    # Event masuk/keluar untuk banyak pasien, masing-masing 1-3 unit berurutan dalam 30 hari
+    units = ['Instalasi Gawat Darurat', 'Ruang ICU', 'Instalasi Bedah Sentral', 'Ruang Rawat Inap']
+    events = []
+    for patient in range(n_patients):
+        timestamp = int(rng.integers(0, 30 * 86400)) * 1000
+        for _ in range(rng.integers(1, 4)):
+            unit = units[rng.integers(len(units))]
+            events.append((f'P{patient}', unit, 'Masuk', timestamp))
+            timestamp += int(rng.exponential(36 * 3600)) * 1000
+            events.append((f'P{patient}', unit, 'Keluar', timestamp))
+    events.sort(key=lambda event: event[3])
+    return events
+
+
+def make_bed_frame(n_units, rng):
+    units = generate_units(n_units)
+    capacity = rng.integers(5, 30, n_units)
+    used = np.minimum(capacity, (capacity * 0.7).astype(int))
+    return pd.DataFrame({
+        'timestamp': '2024-01-01 00:00:00',
+        'unit': units['unit'],
+        'gedung': units['gedung'],
+        'lantai': units['lantai'],
+        'kapasitas_total': capacity,
+        'bed_terpakai': used,
+        'bed_tersedia': capacity - used,
+    })
+
+
+# Setiap setup menerima (ukuran, rng, folder kerja) dan mengembalikan fungsi yang diukur
+def setup_generate_vitals(size, rng, workdir):
+    return lambda: [generate_vital_signs_data(is_critical=i % 2 == 0) for i in range(size)]
+
+
+def setup_generate_beds(size, rng, workdir):
+    return lambda: [generate_bed_availability() for _ in range(size)]
+
+
+def setup_generator_tick(size, rng, workdir):
+    # Loop tick mode CSV termasuk publikasi atomik dan retensi (tanpa jeda 5 detik)
+    def run():
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            shutil.rmtree(DATA_DIR, ignore_errors=True)
+            vital_publisher = CsvPublisher(DATA_DIR, 'vital_signs', RetentionPolicy())
+            bed_publisher = CsvPublisher(BED_DIR, 'bed_status', RetentionPolicy())
+            start = datetime(2024, 1, 1)
+            for tick in range(size):
+                generator_tick(start + timedelta(seconds=5 * tick), 5 * tick, 'BENCH',
+                               None, vital_publisher, bed_publisher)
+        finally:
+            os.chdir(cwd)
+    return run
+
+
+def setup_check_critical(size, rng, workdir):
+    df = make_vitals_frame(size, rng)
+    return lambda: check_critical_conditions(df)
+
+
+def setup_validate_block(size, rng, workdir):
+    # size = jumlah pasien, masing-masing 60 sampel (5 menit)
+    values = rng.normal([75, 120, 80, 97, 37], [5, 10, 8, 1, 0.3], size=(size, 60, len(VITAL_PARAMETERS)))
+    timestamps = np.broadcast_to(np.arange(60)[::-1] * 5000, (size, 60))
+    return lambda: validate_block(values, timestamps)
+
+
+def setup_arima(size, rng, workdir):
+    df = make_vitals_frame(size, rng)
+    series = {param: df[param].to_numpy(dtype=float)[::-1] for param in VITAL_PARAMETERS}
+    return lambda: [fit_arima(values).forecast(steps=FORECAST_STEPS) for values in series.values()]
+
+
+def setup_calculate_duration(size, rng, workdir):
+    history = make_location_history(size, rng)
+    return lambda: calculate_duration(history, now=datetime(2024, 6, 1))
+
+
+def setup_adt_queries(size, rng, workdir):
+    # size = jumlah pasien; query interval, sensus dan durasi satu pasien pada indeks ADT
+    store = AdtStore()
+    store.load(make_adt_events(size, rng))
+    day = 86400 * 1000
+
+    def run():
+        store.patients_in('Ruang ICU', 10 * day, 11 * day)
+        store.census(15 * day)
+        store.patient_durations('P0', now=30 * day)
+    return run
+
+
+def setup_dose_due_soon(size, rng, workdir):
+    # size = jumlah order terapi berulang; dosis 30 menit ke depan untuk semua pasien
+    now = datetime(2024, 1, 2)
+    frequencies = ['q6h', 'q8h', '3x1', '2x1', 'q4h']
+    index = DoseIndex()
+    index.load([(i, f'P{i % 1000}', 'Obat', '1', 'Intravena', frequencies[i % len(frequencies)],
+                 now - timedelta(seconds=int(rng.integers(0, 3 * 86400)))) for i in range(size)], now=now)
+    return lambda: index.due_soon(now)
+
+
+def setup_bed_figures(size, rng, workdir):
+    df_bed = make_bed_frame(size, rng)
+
+    def run():
+        df = add_occupancy(df_bed.copy())
+        build_availability_figure(summarize_groups(df, 'gedung')).to_json()
+        build_occupancy_heatmap(df).to_json()
+    return run
+
+
+def setup_read_newest(size, rng, workdir):
+    directory = os.path.join(workdir, f'newest_{size}')
+    os.makedirs(directory, exist_ok=True)
+    df_bed = make_bed_frame(4, rng)
+    start = datetime(2024, 1, 1)
+    for i in range(size):
+        name = f'bed_status_{(start + timedelta(seconds=5 * i)).strftime("%Y%m%d_%H%M%S")}.csv'
+        write_frame(df_bed, os.path.join(directory, name))
+    return lambda: read_frame(os.path.join(directory, newest_file(directory)))
+
+
+BENCHMARKS = {
+    'generate_vital_signs_data': setup_generate_vitals,
+    'generate_bed_availability': setup_generate_beds,
+    'generator_tick_csv': setup_generator_tick,
+    'check_critical_conditions': setup_check_critical,
+    'validate_block': setup_validate_block,
+    'arima_fit_forecast': setup_arima,
+    'calculate_duration': setup_calculate_duration,
+    'adt_queries': setup_adt_queries,
+    'dose_due_soon': setup_dose_due_soon,
+    'bed_figures': setup_bed_figures,
+    'read_newest_file': setup_read_newest,
+}
+
+
+def time_function(function, repeat, min_time=0.2):
+    # Jalankan sekali untuk pemanasan, lalu ukur sampai repeat kali atau min_time detik tercapai
+    function()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+        if len(timings) >= 1000:
+            break
+    timings = np.asarray(timings) * 1000
+    return {
+        'runs': len(timings),
+        'min_ms': float(timings.min()),
+        'median_ms': float(np.median(timings)),
+        'mean_ms': float(timings.mean()),
+        'max_ms': float(timings.max()),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, scale=1, repeat=5):
+    results = []
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    try:
+        for name in names or BENCHMARKS:
+            for base_size in BASE_SIZES[name]:
+                size = max(1, int(base_size * scale))
+                # Seed tetap per (benchmark, ukuran) agar input identik antar run
+                np.random.seed(SEED)
+                rng = np.random.default_rng(SEED)
+                function = BENCHMARKS[name](size, rng, workdir)
+                result = time_function(function, repeat)
+                result.update({'name': name, 'size': size})
+                results.append(result)
+                print(f"{name:28s} n={size:<8d} median {result['median_ms']:10.3f} ms "
+                      f"(min {result['min_ms']:.3f} ms, {result['runs']} run)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'seed': SEED,
+        'scale': scale,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    # Bandingkan median per (benchmark, ukuran); hasil daftar regresi
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['name'], result['size']))
+        if old is None:
+            continue
+        ratio = result['median_ms'] / max(old['median_ms'], 1e-9)
+        marker = 'REGRESI' if ratio > 1 + threshold else ''
+        print(f"{result['name']:28s} n={result['size']:<8d} {old['median_ms']:10.3f} -> "
+              f"{result['median_ms']:10.3f} ms ({ratio:5.2f}x) {marker}")
+        if marker:
+            regressions.append({'name': result['name'], 'size': result['size'], 'ratio': ratio})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark jalur utama aplikasi monitoring")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="Jalankan benchmark tertentu saja")
+    parser.add_argument("--scale", type=float, default=1, help="Pengali ukuran input")
+    parser.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan minimal per benchmark")
+    parser.add_argument("--output", default=None, help="File JSON hasil (default: data/benchmarks/<commit>_<waktu>.json)")
+    parser.add_argument("--compare", default=None, help="File JSON hasil sebelumnya sebagai pembanding")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.only, args.scale, args.repeat)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['commit'] or 'unknown'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regresi melebihi {args.threshold:.0%}")
+            sys.exit(1)
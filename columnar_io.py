@@ -0,0 +1,198 @@
+import os
+import gc
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Format file yang didukung untuk stream vital signs dan bed availability
+FILE_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+FILE_EXTENSIONS = tuple(FILE_FORMATS.values())
+
+# Skema kolumnar: timestamp epoch ms (waktu lokal), dtype kecil untuk tanda vital,
+# suhu float32 dan unit bed sebagai kategori (dictionary)
+VITAL_SCHEMA = pa.schema([
+    ('timestamp', pa.int64()),
+    ('heart_rate', pa.int16()),
+    ('blood_pressure_systolic', pa.int16()),
+    ('blood_pressure_diastolic', pa.int16()),
+    ('oxygen_saturation', pa.uint8()),
+    ('temperature', pa.float32()),
+])
+BED_SCHEMA = pa.schema([
+    ('timestamp', pa.int64()),
+    ('unit', pa.dictionary(pa.int8(), pa.string())),
+    ('kapasitas_total', pa.int16()),
+    ('bed_terpakai', pa.int16()),
+    ('bed_tersedia', pa.int16()),
+])
+SCHEMAS = {'vital_signs': VITAL_SCHEMA, 'bed_status': BED_SCHEMA}
+
+
+def schema_for(path):
+    # Skema ditentukan dari prefix nama file (vital_signs_*, bed_status_*)
+    name = os.path.basename(path)
+    for prefix, schema in SCHEMAS.items():
+        if name.startswith(prefix) or name.startswith(f'.{prefix}'):
+            return schema
+    raise ValueError(f"Skema tidak dikenal untuk file: {name}")
+
+
+def frame_to_table(df, schema):
+    data = {}
+    for field in schema:
+        column = df[field.name]
+        if field.name == 'timestamp':
+            column = pd.to_datetime(column).to_numpy(dtype='datetime64[ms]').astype('<i8')
+        elif pa.types.is_dictionary(field.type):
+            column = column.astype(str)
+        data[field.name] = pa.array(column, type=field.type)
+    return pa.Table.from_pydict(data, schema=schema)
+
+
+def table_to_frame(table):
+    df = table.to_pandas()
+    df['timestamp'] = pd.to_datetime(df['timestamp'].to_numpy(dtype='<i8').astype('datetime64[ms]'))
+    return df
+
+
+def write_frame(df, target, file_format='csv', schema=None):
+    # target bisa path atau file object yang sudah terbuka (mode biner untuk format kolumnar)
+    if file_format == 'csv':
+        if isinstance(target, str):
+            df.to_csv(target, index=False)
+        else:
+            target.write(df.to_csv(index=False).encode())
+        return
+    table = frame_to_table(df, schema or schema_for(target if isinstance(target, str) else target.name))
+    if file_format == 'parquet':
+        pq.write_table(table, target)
+    elif file_format == 'arrow':
+        feather.write_feather(table, target, compression='uncompressed')
+    else:
+        raise ValueError(f"Format file tidak dikenal: {file_format}")
+
+
+def read_frame(path):
+    # Baca file stream sesuai ekstensinya; timestamp selalu dikembalikan sebagai datetime
+    if path.endswith('.parquet'):
+        return table_to_frame(pq.read_table(path))
+    if path.endswith('.arrow'):
+        return table_to_frame(feather.read_table(path, memory_map=True))
+    return pd.read_csv(path)
+
+
+def convert_directory(directory, file_format, remove_source=False):
+    # Konversi file CSV lama (vital_signs_*, bed_status_*) ke format kolumnar
+    extension = FILE_FORMATS[file_format]
+    converted = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.csv') or not name.startswith(tuple(SCHEMAS)):
+            continue
+        source = os.path.join(directory, name)
+        target = source[:-len('.csv')] + extension
+        tmp_path = os.path.join(directory, f'.{os.path.basename(target)}.tmp')
+        write_frame(pd.read_csv(source), tmp_path, file_format, schema_for(name))
+        os.replace(tmp_path, target)
+        if remove_source:
+            os.remove(source)
+        converted.append(target)
+    return converted
+
+
+def _measure(read, paths, repeat):
+    # Waktu baca rata-rata per file dan memori DataFrame hasil baca
+    frames = [read(path) for path in paths]
+    memory = sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+    del frames
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            df = read(path)
+            if 'timestamp' in df:
+                pd.to_datetime(df['timestamp'])  # seperti series_for_forecast
+    elapsed = time.perf_counter() - start
+    # Puncak alokasi diukur terpisah karena tracemalloc memperlambat pembacaan
+    tracemalloc.start()
+    for path in paths:
+        read(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ms_per_file': elapsed / (repeat * len(paths)) * 1000,
+        'frame_bytes': memory,
+        'peak_bytes': peak,
+        'file_bytes': sum(os.path.getsize(path) for path in paths),
+    }
+
+
+def compare_formats(n_rows=100000, repeat=5, directory='data/format_benchmark', seed=0):
+    # Bandingkan pd.read_csv dengan format kolumnar pada data sintetis yang sama
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('2024-01-01', periods=n_rows, freq='s')
+    frames = {
+        'vital_signs': pd.DataFrame({
+            'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+            'heart_rate': rng.normal(75, 5, n_rows).astype(int),
+            'blood_pressure_systolic': rng.normal(120, 10, n_rows).astype(int),
+            'blood_pressure_diastolic': rng.normal(80, 8, n_rows).astype(int),
+            'oxygen_saturation': rng.normal(98, 1, n_rows).astype(int).clip(0, 100),
+            'temperature': rng.normal(37, 0.3, n_rows).round(1),
+        }),
+        'bed_status': pd.DataFrame({
+            'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+            'unit': rng.choice(['Instalasi Gawat Darurat', 'Ruang ICU', 'Instalasi Bedah Sentral',
+                                'Ruang Rawat Inap'], n_rows),
+            'kapasitas_total': rng.integers(5, 21, n_rows),
+            'bed_terpakai': rng.integers(0, 5, n_rows),
+            'bed_tersedia': rng.integers(0, 5, n_rows),
+        }),
+    }
+    os.makedirs(directory, exist_ok=True)
+    report = {}
+    for prefix, df in frames.items():
+        report[prefix] = {}
+        for file_format, extension in FILE_FORMATS.items():
+            path = os.path.join(directory, f'{prefix}_benchmark{extension}')
+            write_frame(df, path, file_format, SCHEMAS[prefix])
+            report[prefix][file_format] = _measure(read_frame, [path], repeat)
+    return report
+
+
+def print_report(report):
+    for prefix, results in report.items():
+        baseline = results['csv']
+        print(f"\n{prefix}:")
+        for file_format, result in results.items():
+            print(f"  {file_format:8s} baca {result['ms_per_file']:8.2f} ms "
+                  f"({baseline['ms_per_file'] / result['ms_per_file']:5.1f}x), "
+                  f"DataFrame {result['frame_bytes'] / 1e6:6.2f} MB "
+                  f"({baseline['frame_bytes'] / result['frame_bytes']:4.1f}x lebih kecil), "
+                  f"puncak alokasi {result['peak_bytes'] / 1e6:6.2f} MB, "
+                  f"file {result['file_bytes'] / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Konversi file CSV ke format kolumnar dan laporan kecepatan baca")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Konversi file CSV di folder data")
+    convert_parser.add_argument("--to", choices=["parquet", "arrow"], default="parquet")
+    convert_parser.add_argument("--remove-source", action="store_true", help="Hapus file CSV setelah dikonversi")
+    convert_parser.add_argument("directories", nargs="*", default=["data", "data/bed_availability"])
+    report_parser = subparsers.add_parser("report", help="Bandingkan kecepatan baca dan memori antar format")
+    report_parser.add_argument("--rows", type=int, default=100000)
+    report_parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for directory in args.directories:
+            if os.path.exists(directory):
+                converted = convert_directory(directory, args.to, args.remove_source)
+                print(f"{directory}: {len(converted)} file dikonversi ke {args.to}")
+    else:
+        print_report(compare_formats(args.rows, args.repeat))
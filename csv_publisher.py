@@ -0,0 +1,106 @@
+import os
+from collections import deque, namedtuple
+from datetime import datetime
+from columnar_io import FILE_FORMATS, write_frame
+
+# Batas retensi; None berarti tidak dibatasi. File terbaru selalu dipertahankan.
+RetentionPolicy = namedtuple('RetentionPolicy', ['max_files', 'max_age', 'max_bytes'],
+                             defaults=[5, None, None])  # max_age dalam detik
+
+PublishedFile = namedtuple('PublishedFile', ['name', 'published_at', 'size'])
+
+STAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+
+class CsvPublisher:
+    # Menulis file stream (CSV, atau Parquet/Arrow) secara atomik (file sementara lalu os.replace)
+    # dan menjaga indeks file yang sudah dipublikasikan di memori sehingga retensi tidak perlu scan direktori
+
+    def __init__(self, directory, prefix, policy=None, on_retire=None, file_format='csv'):
+        self.directory = directory
+        self.prefix = prefix
+        self.file_format = file_format
+        self.extension = FILE_FORMATS[file_format]
+        self.policy = policy or RetentionPolicy()
+        self.on_retire = on_retire  # dipanggil dengan path file sebelum file dihapus (mis. untuk arsip)
+        self.files = deque()
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # Satu kali scan saat start: adopsi file dari proses sebelumnya, hapus sisa file sementara
+        existing = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(f'.{self.prefix}_') and name.endswith('.tmp'):
+                os.remove(path)
+            elif name.startswith(f'{self.prefix}_') and name.endswith(self.extension):
+                stat = os.stat(path)
+                existing.append(PublishedFile(name, self._published_at(name, stat), stat.st_size))
+        for entry in sorted(existing):
+            self.files.append(entry)
+            self.total_bytes += entry.size
+        # Umur diukur terhadap file terbaru agar tetap dalam jam yang sama dengan stempel nama file
+        self.enforce_retention(self.files[-1].published_at if self.files else None)
+
+    def _published_at(self, name, stat):
+        # Stempel waktu publish diambil dari nama file (waktu simulasi saat publish), bukan mtime
+        # dinding, karena retensi umur dibandingkan dengan current_time dari SimClock
+        stamp = name[len(self.prefix) + 1:-len(self.extension)]
+        try:
+            return datetime.strptime(stamp, STAMP_FORMAT)
+        except ValueError:
+            return datetime.fromtimestamp(stat.st_mtime)
+
+    def path_for(self, name):
+        return os.path.join(self.directory, name)
+
+    def publish(self, df, current_time=None):
+        current_time = current_time or datetime.now()
+        name = f'{self.prefix}_{current_time.strftime(STAMP_FORMAT)}{self.extension}'
+        # Nama file sementara tidak berakhiran .csv/.parquet/.arrow agar tidak pernah terbaca oleh dashboard
+        tmp_path = self.path_for(f'.{name}.tmp')
+        with open(tmp_path, 'wb') as f:
+            write_frame(df, f, self.file_format)
+            f.flush()
+            os.fsync(f.fileno())
+        size = os.path.getsize(tmp_path)
+
+        # Nama sama (dua tick dalam satu detik) menimpa file yang sudah ada di indeks; isi lama
+        # diserahkan ke on_retire sebelum tertimpa agar tidak hilang dari arsip
+        if self.files and self.files[-1].name == name:
+            self.total_bytes -= self.files.pop().size
+            if self.on_retire is not None and os.path.exists(self.path_for(name)):
+                self.on_retire(self.path_for(name))
+        os.replace(tmp_path, self.path_for(name))
+        self.files.append(PublishedFile(name, current_time, size))
+        self.total_bytes += size
+        self.enforce_retention(current_time)
+        return name
+
+    def _over_limit(self, now):
+        oldest = self.files[0]
+        policy = self.policy
+        return ((policy.max_files is not None and len(self.files) > policy.max_files)
+                or (policy.max_bytes is not None and self.total_bytes > policy.max_bytes)
+                or (policy.max_age is not None
+                    and (now - oldest.published_at).total_seconds() > policy.max_age))
+
+    def enforce_retention(self, now=None):
+        now = now or datetime.now()
+        removed = []
+        while len(self.files) > 1 and self._over_limit(now):
+            entry = self.files.popleft()
+            self.total_bytes -= entry.size
+            if self.on_retire is not None and os.path.exists(self.path_for(entry.name)):
+                self.on_retire(self.path_for(entry.name))
+            try:
+                os.remove(self.path_for(entry.name))
+            except FileNotFoundError:
+                pass
+            removed.append(entry.name)
+        return removed
+
+    def latest(self):
+        return self.files[-1].name if self.files else None
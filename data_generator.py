@@ -1,11 +1,40 @@
+import os
 import pandas as pd
 import numpy as np
+from collections import namedtuple
 from datetime import datetime
 import time
-import os
+import argparse
+from vital_store import (VitalStore, VITAL_DTYPE, VITAL_PARAMETERS, TEMPERATURE_SCALE,
+                         DEFAULT_PATIENT_ID, DEFAULT_BLOCK_CAPACITY, frame_to_records, from_epoch_ms)
+from vital_archive import VitalArchive, DEFAULT_ARCHIVE_DIR
+from csv_publisher import CsvPublisher, RetentionPolicy
+from columnar_io import FILE_FORMATS, FILE_EXTENSIONS, read_frame
+from sim_clock import SimClock
+from bed_history import BedHistory
+from bed_units import load_units
+
+# Rata-rata dan simpangan baku setiap parameter (urutan sesuai VITAL_PARAMETERS)
+NORMAL_MEAN = np.array([75, 120, 80, 98, 37])
+NORMAL_STD = np.array([5, 10, 8, 1, 0.3])
+CRITICAL_MEAN = np.array([55, 85, 45, 88, 39.5])
+CRITICAL_STD = np.array([2, 2, 2, 1, 0.2])
+
+CRITICAL_INTERVAL = 20 * 60  # 20 menit dalam detik
+CRITICAL_DURATION = 30  # Generate data kritis selama 30 detik
+DATA_DIR = 'data'
+BED_DIR = 'data/bed_availability'
+BED_INTERVAL = 5  # status bed dipublikasikan paling sering setiap 5 detik simulasi
+REPORT_INTERVAL = 1.0  # laporan throughput paling sering setiap 1 detik nyata
+
+# Profil beban mode multi-pasien (semua durasi dalam detik simulasi):
+# jitter = variasi acak jarak antar tick dan timestamp per pasien (fraksi interval, 0-1),
+# selama burst_length detik setiap burst_every detik interval dibagi burst_factor
+LoadProfile = namedtuple('LoadProfile', ['jitter', 'burst_factor', 'burst_every', 'burst_length'],
+                         defaults=[0.0, 1.0, 0, 0])
 
-def generate_vital_signs_data(is_critical=False):
-    current_time = datetime.now()
+def generate_vital_signs_data(is_critical=False, current_time=None):
+    current_time = current_time or datetime.now()
     
     if is_critical:
         # Generate data kritis
@@ -15,7 +44,7 @@ def generate_vital_signs_data(is_critical=False):
             'blood_pressure_systolic': [int(np.random.normal(85, 2))],  # Systolic < 90
             'blood_pressure_diastolic': [int(np.random.normal(45, 2))],  # Diastolic < 50
             'oxygen_saturation': [int(np.random.normal(88, 1))],  # SpO2 < 90
-            'temperature': [int(np.random.normal(39.5, 0.2))]  # Temp > 39
+            'temperature': [round(np.random.normal(39.5, 0.2), 1)]  # Temp > 39
         }
     else:
         # Generate data normal
@@ -24,84 +53,325 @@ def generate_vital_signs_data(is_critical=False):
             'heart_rate': [int(np.random.normal(75, 5))],
             'blood_pressure_systolic': [int(np.random.normal(120, 10))],
             'blood_pressure_diastolic': [int(np.random.normal(80, 8))],
-            'oxygen_saturation': [int(np.random.normal(98, 1))],
-            'temperature': [int(np.random.normal(37, 0.3))]
+            'oxygen_saturation': [min(int(np.random.normal(98, 1)), 100)],  # SpO2 tidak pernah > 100%
+            'temperature': [round(np.random.normal(37, 0.3), 1)]
         }
     
     return pd.DataFrame(data)
 
-def generate_bed_availability():
-    current_time = datetime.now()
-    
-    # Kapasitas maksimal setiap ruangan
-    max_capacity = {
-        'Instalasi Gawat Darurat': 10,
-        'Ruang ICU': 8,
-        'Instalasi Bedah Sentral': 5,
-        'Ruang Rawat Inap': 20
-    }
-    
-    # Generate data ketersediaan bed
-    data = {
+def generate_vital_signs_batch(critical_mask, current_time=None):
+    # Generate satu tick untuk seluruh pasien dengan satu kali pengambilan sampel NumPy
+    if current_time is None:
+        current_time = datetime.now()
+    critical_mask = np.asarray(critical_mask, dtype=bool)
+    n_patients = len(critical_mask)
+    
+    mean = np.where(critical_mask[:, None], CRITICAL_MEAN, NORMAL_MEAN)
+    std = np.where(critical_mask[:, None], CRITICAL_STD, NORMAL_STD)
+    values = np.random.normal(mean, std, size=(n_patients, len(VITAL_PARAMETERS)))
+    spo2 = VITAL_PARAMETERS.index('oxygen_saturation')
+    values[:, spo2] = np.minimum(values[:, spo2], 100)  # SpO2 tidak pernah > 100%
+    
+    # Simpan langsung dalam format kolumnar ring buffer
+    records = np.empty(n_patients, dtype=VITAL_DTYPE)
+    records['timestamp'] = np.datetime64(current_time, 'ms').astype('<i8')
+    for i, param in enumerate(VITAL_PARAMETERS):
+        if param == 'temperature':
+            # Suhu disimpan dengan resolusi 0.1 derajat (tidak dibulatkan ke derajat penuh)
+            records[param] = np.round(values[:, i] * TEMPERATURE_SCALE)
+        else:
+            records[param] = values[:, i].astype(int)  # Sama seperti int() pada mode satu pasien
+    
+    return records
+
+def critical_schedule(n_patients, elapsed_time, interval=CRITICAL_INTERVAL, duration=CRITICAL_DURATION):
+    # Onset episode kritis tiap pasien digeser merata di sepanjang critical_interval
+    onset_offsets = np.arange(n_patients) * interval // max(n_patients, 1)
+    return (int(elapsed_time) + onset_offsets) % interval < duration
+
+def generate_bed_availability(current_time=None, units=None):
+    current_time = current_time or datetime.now()
+    
+    # Kapasitas maksimal setiap ruangan dari konfigurasi unit (jumlah unit bebas)
+    units = load_units() if units is None else units
+    capacity = units['kapasitas_total'].to_numpy()
+    
+    # Generate jumlah bed terpakai dengan fluktuasi kecil, sekaligus untuk semua unit
+    used_beds = np.clip(np.random.normal(capacity * 0.7, 1).astype(int), 0, capacity)
+    
+    return pd.DataFrame({
         'timestamp': current_time.strftime('%Y-%m-%d %H:%M:%S'),
-        'unit': [],
-        'kapasitas_total': [],
-        'bed_terpakai': [],
-        'bed_tersedia': []
-    }
-    
-    for unit, capacity in max_capacity.items():
-        # Generate jumlah bed terpakai dengan fluktuasi kecil
-        used_beds = min(capacity, int(np.random.normal(capacity * 0.7, 1)))
-        available_beds = capacity - used_beds
-        
-        data['unit'].append(unit)
-        data['kapasitas_total'].append(capacity)
-        data['bed_terpakai'].append(used_beds)
-        data['bed_tersedia'].append(available_beds)
+        'unit': units['unit'].to_numpy(),
+        'kapasitas_total': capacity,
+        'bed_terpakai': used_beds,
+        'bed_tersedia': capacity - used_beds
+    })
+
+def write_bed_availability(bed_publisher, current_time, bed_history=None):
+    # Publikasi atomik; file lama dihapus sesuai kebijakan retensi tanpa scan direktori.
+    # Setiap snapshot juga disimpan ke riwayat bed agar tidak hilang oleh retensi file
+    df_bed = generate_bed_availability(current_time)
+    bed_publisher.publish(df_bed, current_time)
+    if bed_history is not None:
+        bed_history.append(df_bed, current_time)
+
+def generator_tick(current_time, elapsed_time, patient_id, store, vital_publisher, bed_publisher,
+                   critical_interval=CRITICAL_INTERVAL, critical_duration=CRITICAL_DURATION, bed_history=None):
+    # Satu tick mode satu pasien: tanda vital ke ring buffer atau file, lalu status bed
+    # Cek apakah sudah waktunya generate data kritis (default setiap 20 menit)
+    is_critical_time = int(elapsed_time) % critical_interval < critical_duration
     
-    return pd.DataFrame(data)
+    # Generate vital signs data
+    df_vital = generate_vital_signs_data(is_critical=is_critical_time, current_time=current_time)
+    if store is not None:
+        # Simpan timestamp presisi milidetik agar latensi alert dapat diukur
+        records = frame_to_records(df_vital)
+        records['timestamp'] = np.datetime64(current_time, 'ms').astype('<i8')
+        store.append(patient_id, records)
+    else:
+        vital_publisher.publish(df_vital, current_time)
+    
+    # Generate bed availability data
+    write_bed_availability(bed_publisher, current_time, bed_history)
 
-def main():
-    # Buat folder data jika belum ada
-    if not os.path.exists('data'):
-        os.makedirs('data')
+def main(output_format='ring', patient_id=DEFAULT_PATIENT_ID, retention=None, file_format='csv', clock=None,
+         interval=5, duration=None, critical_interval=CRITICAL_INTERVAL, critical_duration=CRITICAL_DURATION):
+    bed_publisher = CsvPublisher(BED_DIR, 'bed_status', retention, file_format=file_format)
+    bed_history = BedHistory()
     
-    if not os.path.exists('data/bed_availability'):
-        os.makedirs('data/bed_availability')
+    # Ring buffer biner per pasien (format default)
+    store = VitalStore() if output_format == 'ring' else None
+    vital_publisher = None
+    archive = None
+    if store is None:
+        # File CSV yang dipensiunkan dipindahkan ke arsip, bukan dihapus
+        archive = VitalArchive()
+        vital_publisher = CsvPublisher(
+            DATA_DIR, 'vital_signs', retention, file_format=file_format,
+            on_retire=lambda path: archive.append(patient_id, frame_to_records(read_frame(path))))
     
-    start_time = datetime.now()
-    critical_interval = 20 * 60  # 20 menit dalam detik
+    # Jam dinding biasa kecuali dipercepat dengan --speed
+    clock = clock or SimClock()
+    tick = 0
         
-    while True:
-        current_time = datetime.now()
-        elapsed_time = (current_time - start_time).total_seconds()
+    try:
+        while duration is None or tick * interval < duration:
+            current_time = clock.now()
+            elapsed_time = clock.elapsed()
+            generator_tick(current_time, elapsed_time, patient_id, store, vital_publisher, bed_publisher,
+                           critical_interval, critical_duration, bed_history)
+            
+            # Tunggu sampai jadwal tick berikutnya (default 5 detik)
+            tick += 1
+            clock.sleep_until(tick * interval)
+    finally:
+        # Data yang masih ditampung arsip ditulis saat generator dihentikan
+        if archive is not None:
+            archive.flush()
+        bed_history.flush()
+
+def tick_interval(profile, interval, elapsed_time):
+    # Jarak (detik simulasi) ke tick berikutnya menurut profil beban
+    if profile.burst_every and elapsed_time % profile.burst_every < profile.burst_length:
+        interval = interval / profile.burst_factor
+    if profile.jitter:
+        interval = interval * (1 + np.random.uniform(-profile.jitter, profile.jitter))
+    return interval
+
+def main_batch(n_patients, interval=5, ticks=None, capacity=DEFAULT_BLOCK_CAPACITY, retention=None,
+               file_format='csv', clock=None, profile=None, duration=None,
+               critical_interval=CRITICAL_INTERVAL, critical_duration=CRITICAL_DURATION):
+    # Mode multi-pasien untuk load test dashboard dan alert daemon
+    bed_publisher = CsvPublisher(BED_DIR, 'bed_status', retention, file_format=file_format)
+    bed_history = BedHistory()
+    
+    patient_ids = [f'SIM-{i:05d}' for i in range(1, n_patients + 1)]
+    store = VitalStore()
+    block = store.block(patient_ids=patient_ids, capacity=capacity)
+    clock = clock or SimClock()
+    profile = profile or LoadProfile()
+    print(f"Mode multi-pasien: {n_patients} pasien -> {block.path} ({clock}, "
+          f"{1 / interval:g} sampel/detik per pasien)")
+    
+    total_rows = 0
+    total_seconds = 0.0
+    tick = 0
+    next_at = 0.0
+    next_bed_at = 0.0
+    max_lag = 0.0
+    lagging_ticks = 0
+    last_report = 0.0
+    
+    while (ticks is None or tick < ticks) and (duration is None or next_at < duration):
+        # Tick terlambat tidak dikejar dengan tidur; keterlambatan dicatat sebagai tanda
+        # bahwa penulis tidak sanggup mengikuti laju sampel yang diminta
+        lag = clock.sleep_until(next_at)
+        current_time = clock.now()
+        elapsed_time = clock.elapsed()
         
-        # Cek apakah sudah waktunya generate data kritis (setiap 20 menit)
-        is_critical_time = int(elapsed_time) % critical_interval < 30  # Generate data kritis selama 30 detik
+        # Generate dan tulis satu blok untuk seluruh pasien
+        tick_start = time.perf_counter()
+        critical_mask = critical_schedule(n_patients, elapsed_time, critical_interval, critical_duration)
+        records = generate_vital_signs_batch(critical_mask, current_time)
+        if profile.jitter:
+            # Sensor tidak tersinkron: timestamp tiap pasien bergeser di dalam interval
+            records['timestamp'] += (np.random.uniform(0, profile.jitter, n_patients) * interval * 1000).astype('<i8')
+        block.append_block(records)
+        tick_seconds = time.perf_counter() - tick_start
         
-        # Generate vital signs data
-        df_vital = generate_vital_signs_data(is_critical=is_critical_time)
-        vital_filename = f'data/vital_signs_{current_time.strftime("%Y%m%d_%H%M%S")}.csv'
-        df_vital.to_csv(vital_filename, index=False)
+        tick += 1
+        total_rows += n_patients
+        total_seconds += tick_seconds
+        max_lag = max(max_lag, lag)
+        lagging_ticks += lag > 0
         
-        # Generate bed availability data
-        df_bed = generate_bed_availability()
-        bed_filename = f'data/bed_availability/bed_status_{current_time.strftime("%Y%m%d_%H%M%S")}.csv'
-        df_bed.to_csv(bed_filename, index=False)
+        if elapsed_time >= next_bed_at:
+            write_bed_availability(bed_publisher, current_time, bed_history)
+            next_bed_at = elapsed_time + BED_INTERVAL
         
-        # Hapus file lama (vital signs)
-        vital_files = sorted([f for f in os.listdir('data') if f.startswith('vital_signs')])
-        if len(vital_files) > 5:
-            os.remove(os.path.join('data', vital_files[0]))
-            
-        # Hapus file lama (bed availability)
-        bed_files = sorted([f for f in os.listdir('data/bed_availability')])
-        if len(bed_files) > 5:
-            os.remove(os.path.join('data/bed_availability', bed_files[0]))
-            
-        # Tunggu 5 detik
-        time.sleep(5)
+        if time.monotonic() - last_report >= REPORT_INTERVAL:
+            last_report = time.monotonic()
+            print(f"Tick {tick} [{current_time:%Y-%m-%d %H:%M:%S}]: {n_patients} baris dalam "
+                  f"{tick_seconds * 1000:.1f} ms ({n_patients / max(tick_seconds, 1e-9):,.0f} baris/detik, "
+                  f"rata-rata {total_rows / max(total_seconds, 1e-9):,.0f} baris/detik, "
+                  f"{int(critical_mask.sum())} pasien kritis, terlambat {lag:.1f} detik simulasi)")
+        
+        next_at = max(next_at + tick_interval(profile, interval, elapsed_time), elapsed_time)
+    
+    block.flush()
+    bed_history.flush()
+    print(f"Selesai: {tick} tick, {total_rows:,} baris, {clock.elapsed() / 3600:.2f} jam simulasi, "
+          f"{lagging_ticks} tick terlambat (maks {max_lag:.1f} detik simulasi)")
+    return total_rows / max(total_seconds, 1e-9)
+
+def load_recording(path=None, archive_patient=None, archive_root=DEFAULT_ARCHIVE_DIR,
+                   patient_id=DEFAULT_PATIENT_ID):
+    # Rekaman untuk replay: dict patient_id -> record (urut dari lama ke baru).
+    # Sumber: file stream (CSV/Parquet/Arrow), folder berisi file stream, atau arsip per jam
+    if archive_patient is not None:
+        columns = VitalArchive(archive_root).query(archive_patient, 0, np.iinfo('<i8').max)
+        if columns is None:
+            return {}
+        records = np.empty(len(columns['timestamp']), dtype=VITAL_DTYPE)
+        for name in VITAL_DTYPE.names:
+            records[name] = columns[name]
+        return {patient_id: records}
+    
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                 if name.startswith('vital_signs') and name.endswith(FILE_EXTENSIONS)]
+    else:
+        paths = [path]
+    df = pd.concat([read_frame(p) for p in paths], ignore_index=True)
+    # Rekaman multi-pasien memakai kolom patient_id; selain itu semua baris milik satu pasien
+    groups = df.groupby('patient_id') if 'patient_id' in df else [(patient_id, df)]
+    recording = {}
+    for pid, group in groups:
+        records = frame_to_records(group)
+        records = records[np.argsort(records['timestamp'], kind='stable')]
+        # File stream yang bertumpuk bisa memuat sampel yang sama lebih dari sekali
+        keep = np.r_[True, np.diff(records['timestamp']) > 0]
+        recording[str(pid)] = records[keep]
+    return recording
+
+def replay(recording, store, clock):
+    # Putar ulang rekaman ke ring buffer mengikuti jam simulasi. Sampel pertama jatuh pada
+    # clock.start; jarak antar sampel dipertahankan (dibagi speed dalam waktu nyata).
+    patient_ids = list(recording)
+    merged = np.concatenate([recording[pid] for pid in patient_ids])
+    owner = np.repeat(np.arange(len(patient_ids)), [len(recording[pid]) for pid in patient_ids])
+    order = np.argsort(merged['timestamp'], kind='stable')
+    merged, owner = merged[order], owner[order]
+    offsets = (merged['timestamp'] - merged['timestamp'][0]) / 1000  # detik simulasi
+    merged['timestamp'] += np.datetime64(clock.start, 'ms').astype('<i8') - merged['timestamp'][0]
+    print(f"Replay {len(merged):,} sampel dari {len(patient_ids)} pasien "
+          f"({offsets[-1] / 3600:.2f} jam rekaman, {clock})")
+    
+    position = 0
+    total_seconds = 0.0
+    max_lag = 0.0
+    last_report = 0.0
+    while position < len(merged):
+        max_lag = max(max_lag, clock.sleep_until(offsets[position]))
+        # Semua sampel yang jadwalnya sudah lewat ditulis sekaligus per pasien
+        end = int(np.searchsorted(offsets, clock.elapsed(), side='right'))
+        batch_start = time.perf_counter()
+        batch, batch_owner = merged[position:end], owner[position:end]
+        for index in np.unique(batch_owner):
+            store.append(patient_ids[index], batch[batch_owner == index])
+        total_seconds += time.perf_counter() - batch_start
+        position = end
+        
+        if time.monotonic() - last_report >= REPORT_INTERVAL or position == len(merged):
+            last_report = time.monotonic()
+            print(f"Replay {position:,}/{len(merged):,} sampel "
+                  f"[{from_epoch_ms(merged['timestamp'][position - 1:position])[0]:%Y-%m-%d %H:%M:%S}], "
+                  f"{position / max(total_seconds, 1e-9):,.0f} sampel/detik tulis, "
+                  f"terlambat maks {max_lag:.1f} detik simulasi")
+    store.flush()
+    return position / max(total_seconds, 1e-9)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generator data simulasi tanda vital dan ketersediaan bed")
+    parser.add_argument("--format", choices=["ring", "csv"], default="ring",
+                        help="Format penyimpanan tanda vital: ring buffer biner (default) atau CSV per tick")
+    parser.add_argument("--patient-id", default=DEFAULT_PATIENT_ID, help="ID pasien yang disimulasikan")
+    parser.add_argument("--patients", type=int, default=None,
+                        help="Aktifkan mode multi-pasien dengan jumlah pasien tertentu (mis. 1000-50000)")
+    parser.add_argument("--interval", type=float, default=5, help="Interval antar tick (detik simulasi)")
+    parser.add_argument("--sample-rate", type=float, default=None,
+                        help="Laju sampel per pasien (sampel/detik simulasi); menggantikan --interval")
+    parser.add_argument("--ticks", type=int, default=None, help="Jumlah tick sebelum berhenti (default: terus berjalan)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Berhenti setelah durasi simulasi ini (detik), mis. 86400 untuk 24 jam")
+    parser.add_argument("--speed", type=float, default=1,
+                        help="Kecepatan jam simulasi relatif terhadap waktu nyata (0 = secepat mungkin)")
+    parser.add_argument("--start", default=None,
+                        help="Waktu awal simulasi (default: sekarang, atau timestamp rekaman dengan --keep-timestamps)")
+    parser.add_argument("--critical-interval", type=int, default=CRITICAL_INTERVAL,
+                        help="Jarak antar episode kritis (detik simulasi)")
+    parser.add_argument("--critical-duration", type=int, default=CRITICAL_DURATION,
+                        help="Lama episode kritis (detik simulasi)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Variasi acak jarak tick dan timestamp per pasien (fraksi interval, 0-1)")
+    parser.add_argument("--burst-factor", type=float, default=1.0, help="Pengali laju sampel selama burst")
+    parser.add_argument("--burst-every", type=float, default=0, help="Jarak antar awal burst (detik simulasi)")
+    parser.add_argument("--burst-length", type=float, default=0, help="Lama burst (detik simulasi)")
+    parser.add_argument("--replay", default=None,
+                        help="Putar ulang file atau folder stream vital signs (CSV/Parquet/Arrow) ke ring buffer")
+    parser.add_argument("--replay-archive", default=None, metavar="PATIENT_ID",
+                        help="Putar ulang arsip per jam milik pasien ini ke ring buffer")
+    parser.add_argument("--archive-root", default=DEFAULT_ARCHIVE_DIR, help="Folder arsip untuk --replay-archive")
+    parser.add_argument("--keep-timestamps", action="store_true",
+                        help="Replay dengan timestamp asli rekaman (default: digeser ke waktu awal simulasi)")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_BLOCK_CAPACITY,
+                        help="Jumlah tick yang disimpan per pasien pada mode multi-pasien")
+    parser.add_argument("--file-format", choices=list(FILE_FORMATS), default="csv",
+                        help="Format file untuk stream vital signs (mode csv) dan bed availability")
+    parser.add_argument("--retention-files", type=int, default=5,
+                        help="Jumlah file CSV maksimal per stream (vital signs dan bed availability)")
+    parser.add_argument("--retention-age", type=float, default=None, help="Umur maksimal file CSV (detik)")
+    parser.add_argument("--retention-bytes", type=int, default=None, help="Total ukuran maksimal file CSV per stream")
+    args = parser.parse_args()
+    retention = RetentionPolicy(args.retention_files, args.retention_age, args.retention_bytes)
+    interval = 1 / args.sample_rate if args.sample_rate else args.interval
+    start = pd.to_datetime(args.start).to_pydatetime() if args.start else None
+    
+    if args.replay or args.replay_archive:
+        recording = load_recording(args.replay, args.replay_archive, args.archive_root, args.patient_id)
+        if not recording:
+            parser.error("Rekaman kosong: tidak ada sampel untuk diputar ulang")
+        if args.keep_timestamps:
+            start = from_epoch_ms([min(records['timestamp'][0] for records in recording.values())])[0].to_pydatetime()
+        replay(recording, VitalStore(), SimClock(start, args.speed))
+    elif args.patients:
+        profile = LoadProfile(args.jitter, args.burst_factor, args.burst_every, args.burst_length)
+        main_batch(args.patients, interval=interval, ticks=args.ticks, capacity=args.capacity,
+                   retention=retention, file_format=args.file_format, clock=SimClock(start, args.speed),
+                   profile=profile, duration=args.duration, critical_interval=args.critical_interval,
+                   critical_duration=args.critical_duration)
+    else:
+        main(output_format=args.format, patient_id=args.patient_id, retention=retention,
+             file_format=args.file_format, clock=SimClock(start, args.speed), interval=interval,
+             duration=args.duration, critical_interval=args.critical_interval,
+             critical_duration=args.critical_duration)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+PIXEL_BUDGET = 800  # jumlah titik maksimal per deret yang dikirim ke browser
+
+
+def _as_numeric(x):
+    # Timestamp diubah ke angka (ns) agar luas segitiga bisa dihitung
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype('<i8').astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: pilih satu titik per bucket yang membentuk segitiga terbesar
+    # dengan titik terpilih sebelumnya dan rata-rata bucket berikutnya. x harus terurut naik.
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_numeric(x)
+    y = np.asarray(y, dtype=float)
+
+    # Titik pertama dan terakhir selalu dipertahankan, sisanya dibagi ke n_out - 2 bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    sums_x = np.add.reduceat(x[1:n - 1], starts - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], starts - 1)
+    sizes = ends - starts
+    # Rata-rata bucket berikutnya; bucket terakhir berpasangan dengan titik terakhir
+    next_x = np.append(sums_x[1:] / sizes[1:], x[-1])
+    next_y = np.append(sums_y[1:] / sizes[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        area = np.abs((x[previous] - next_x[i]) * (bucket_y - y[previous])
+                      - (x[previous] - bucket_x) * (next_y[i] - y[previous]))
+        # NaN tidak boleh terpilih kecuali seluruh bucket NaN
+        previous = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        indices[i + 1] = previous
+    return indices
+
+
+def _first_in_bucket(mask, bucket_of):
+    # Indeks posisi pertama yang memenuhi mask di setiap bucket
+    positions = np.flatnonzero(mask)
+    _, first = np.unique(bucket_of[positions], return_index=True)
+    return positions[first]
+
+
+def minmax_indices(y, n_out):
+    # Ambil nilai minimum dan maksimum setiap bucket (2 titik per bucket) sehingga lonjakan tetap terlihat
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    starts = np.linspace(0, n, n_buckets + 1).astype(int)[:-1]
+    sizes = np.diff(np.append(starts, n))
+    bucket_of = np.repeat(np.arange(n_buckets), sizes)
+    filled = np.nan_to_num(y, nan=np.nanmean(y) if np.isfinite(y).any() else 0.0)
+    low = _first_in_bucket(filled == np.repeat(np.minimum.reduceat(filled, starts), sizes), bucket_of)
+    high = _first_in_bucket(filled == np.repeat(np.maximum.reduceat(filled, starts), sizes), bucket_of)
+    return np.unique(np.concatenate([low, high]))
+
+
+def downsample(x, y, n_out=PIXEL_BUDGET, method='lttb'):
+    # Kurangi deret (x, y) menjadi maksimal n_out titik; hasil (x, y) yang terurut sesuai x
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == 'minmax':
+        indices = minmax_indices(y, n_out)
+    else:
+        indices = lttb_indices(x, y, n_out)
+    return x[indices], y[indices]
+
+
+def downsample_frame(df, x_col, y_cols, n_out=PIXEL_BUDGET, method='lttb'):
+    # DataFrame terurut naik menurut x_col -> DataFrame dengan titik terpilih dari setiap kolom y.
+    # Titik terpilih digabung sehingga setiap kolom tetap mempertahankan lonjakannya sendiri.
+    if len(df) <= n_out:
+        return df
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+    x = df[x_col].to_numpy()
+    per_column = max(n_out // len(y_cols), 3)
+    indices = np.unique(np.concatenate([
+        minmax_indices(df[col].to_numpy(), per_column) if method == 'minmax'
+        else lttb_indices(x, df[col].to_numpy(), per_column)
+        for col in y_cols
+    ]))
+    return df.iloc[indices]
+
+
+def visible_range(df, x_col, start, end):
+    # Potong DataFrame (terurut naik) ke rentang waktu yang sedang ditampilkan
+    x = pd.to_datetime(df[x_col])
+    return df[(x >= pd.Timestamp(start)) & (x <= pd.Timestamp(end))]
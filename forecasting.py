@@ -0,0 +1,358 @@
+import os
+import hashlib
+import threading
+import time
+import warnings
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from instrumentation import METRICS
+from validation import clean_rows
+
+ARIMA_ORDER = (1, 1, 1)
+FORECAST_STEPS = 60
+REFIT_EVERY = 500  # jumlah sampel baru sebelum estimasi ulang terjadwal
+REFIT_INTERVAL = 60 * 60  # estimasi ulang paling lambat setiap 1 jam (detik)
+DRIFT_THRESHOLD = 4.0  # rata-rata kuadrat error terstandardisasi yang dianggap drift
+DRIFT_SMOOTHING = 0.1  # bobot EWMA untuk statistik drift
+MAX_HISTORY = 2000  # jumlah data maksimal untuk estimasi ulang penuh
+FORECAST_WORKERS = int(os.environ.get('FORECAST_WORKERS', min(4, os.cpu_count() or 1)))
+FORECAST_TIMEOUT = float(os.environ.get('FORECAST_TIMEOUT', 30))  # batas waktu per job (detik)
+FORECAST_CACHE_TTL = 300  # umur maksimal hasil prediksi di cache (detik)
+FORECAST_CACHE_SIZE = 1024  # jumlah entri maksimal (LRU)
+
+
+def fit_arima(values, order=ARIMA_ORDER):
+    # Estimasi penuh ARIMA pada deret nilai (urut dari lama ke baru)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(np.asarray(values, dtype=float), order=order).fit()
+
+
+def fit_arima_params(values, order=ARIMA_ORDER):
+    # Dijalankan di proses worker; hanya parameter (dan durasi fitting untuk metrik di proses
+    # utama) yang dikirim balik agar pickling ringan
+    start = time.perf_counter()
+    params = np.asarray(fit_arima(values, order).params)
+    return params, time.perf_counter() - start
+
+
+def filter_arima(values, params, order=ARIMA_ORDER):
+    # Bangun ulang hasil fitting dari parameter tanpa optimasi (hanya satu kali filter)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(np.asarray(values, dtype=float), order=order).filter(params)
+
+
+class ForecastState:
+    # Hasil fitting ARIMA yang disimpan untuk satu (pasien, parameter)
+
+    def __init__(self, results, last_timestamp, last_value):
+        self.results = results
+        self.last_timestamp = last_timestamp
+        self.last_value = last_value
+        self.fitted_at = time.time()
+        self.new_since_fit = 0
+        self.drift = 0.0
+        self.refits = 1
+        self.extends = 0
+
+
+class IncrementalForecaster:
+    # Menyimpan model per (pasien, parameter) dan memperbaruinya dengan filter state-space
+    # ketika data baru masuk; estimasi ulang penuh hanya terjadwal atau ketika terdeteksi drift
+
+    def __init__(self, order=ARIMA_ORDER, refit_every=REFIT_EVERY, refit_interval=REFIT_INTERVAL,
+                 drift_threshold=DRIFT_THRESHOLD, max_history=MAX_HISTORY):
+        self.order = order
+        self.refit_every = refit_every
+        self.refit_interval = refit_interval
+        self.drift_threshold = drift_threshold
+        self.max_history = max_history
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def _install(self, key, timestamps, values, results):
+        state = ForecastState(results, timestamps[-1], values[-1])
+        previous = self.states.get(key)
+        if previous is not None:
+            state.refits = previous.refits + 1
+        self.states[key] = state
+        return state
+
+    def _refit(self, key, timestamps, values):
+        values = values[-self.max_history:]
+        with METRICS.timer('arima_fit'):
+            results = fit_arima(values, self.order)
+        return self._install(key, timestamps, values, results)
+
+    def install_params(self, key, timestamps, values, params):
+        # Pasang hasil estimasi dari proses worker
+        timestamps = np.asarray(timestamps, dtype='<i8')
+        values = np.asarray(values, dtype=float)[-self.max_history:]
+        results = filter_arima(values, params, self.order)
+        with self.lock:
+            return self._install(key, timestamps, values, results)
+
+    def _needs_refit(self, state):
+        return (state.new_since_fit >= self.refit_every
+                or time.time() - state.fitted_at >= self.refit_interval
+                or state.drift > self.drift_threshold)
+
+    def try_update(self, key, timestamps, values):
+        # Perbarui model secara inkremental; None jika perlu estimasi ulang penuh.
+        # timestamps (int64 epoch ms) dan values harus terurut dari lama ke baru
+        timestamps = np.asarray(timestamps, dtype='<i8')
+        values = np.asarray(values, dtype=float)
+
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                return None
+
+            # Cek kesinambungan: data terakhir yang sudah difilter harus ada di deret baru
+            position = np.searchsorted(timestamps, state.last_timestamp)
+            if (position >= len(timestamps) or timestamps[position] != state.last_timestamp
+                    or values[position] != state.last_value):
+                return None
+
+            new_values = values[position + 1:]
+            if len(new_values) == 0:
+                return state
+
+            # Perbarui model hanya dengan observasi baru
+            with warnings.catch_warnings(), METRICS.timer('arima_extend'):
+                warnings.simplefilter('ignore')
+                results = state.results.extend(new_values)
+            errors = results.forecasts_error[0]
+            variances = results.forecasts_error_cov[0, 0]
+            z_squared = float(np.mean(errors ** 2 / np.maximum(variances, 1e-12)))
+            state.drift = (1 - DRIFT_SMOOTHING) * state.drift + DRIFT_SMOOTHING * z_squared
+            state.results = results
+            state.last_timestamp = timestamps[-1]
+            state.last_value = values[-1]
+            state.new_since_fit += len(new_values)
+            state.extends += 1
+
+            if self._needs_refit(state):
+                return None
+            return state
+
+    def update(self, key, timestamps, values):
+        state = self.try_update(key, timestamps, values)
+        if state is None:
+            with self.lock:
+                state = self._refit(key, np.asarray(timestamps, dtype='<i8'),
+                                    np.asarray(values, dtype=float))
+        return state
+
+    def forecast(self, key, timestamps, values, steps=FORECAST_STEPS):
+        state = self.update(key, timestamps, values)
+        return np.asarray(state.results.forecast(steps=steps))
+
+
+class ForecastCache:
+    # Cache hasil prediksi berdasarkan hash isi jendela input, orde model dan horizon
+
+    def __init__(self, ttl=FORECAST_CACHE_TTL, max_size=FORECAST_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(timestamps, values, order, steps):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(timestamps, dtype='<i8').tobytes())
+        digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+        digest.update(repr((tuple(order), steps)).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, forecast = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return forecast
+
+    def put(self, key, forecast):
+        forecast = np.asarray(forecast)
+        forecast.flags.writeable = False
+        with self.lock:
+            self.entries[key] = (time.monotonic(), forecast)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+class ForecastEngine:
+    # Menjalankan estimasi ARIMA (pasien, parameter) secara paralel di process pool.
+    # Setiap job menghasilkan Future berisi array prediksi.
+
+    def __init__(self, max_workers=FORECAST_WORKERS, timeout=FORECAST_TIMEOUT, forecaster=None,
+                 cache=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.forecaster = forecaster or IncrementalForecaster()
+        self.cache = cache or ForecastCache()
+        self.pending = {}  # key -> (Future, batas waktu monotonic job tersebut)
+        self.lock = threading.Lock()
+        self.executor = self._create_executor()
+
+    def _create_executor(self):
+        # spawn agar worker tidak mewarisi thread milik Streamlit
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, key, timestamps, values, steps=FORECAST_STEPS):
+        timestamps = np.asarray(timestamps, dtype='<i8')
+        values = np.asarray(values, dtype=float)
+
+        # Input yang sama (mis. rerun karena klik widget lain) langsung dilayani dari cache
+        cache_key = self.cache.make_key(timestamps, values, self.forecaster.order, steps)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        # Jalur cepat: pembaruan inkremental langsung di proses ini
+        state = self.forecaster.try_update(key, timestamps, values)
+        if state is not None:
+            forecast = np.asarray(state.results.forecast(steps=steps))
+            self.cache.put(cache_key, forecast)
+            future = Future()
+            future.set_result(forecast)
+            return future
+
+        with self.lock:
+            self._expire_jobs()
+            # Jangan kirim ulang job yang masih berjalan untuk key yang sama
+            pending = self.pending.get(key)
+            if pending is not None and not pending[0].done():
+                return pending[0]
+
+            try:
+                job = self.executor.submit(fit_arima_params, values[-self.forecaster.max_history:],
+                                           self.forecaster.order)
+            except BrokenProcessPool:
+                self.executor = self._create_executor()
+                job = self.executor.submit(fit_arima_params, values[-self.forecaster.max_history:],
+                                           self.forecaster.order)
+
+            future = Future()
+            self.pending[key] = (future, time.monotonic() + self.timeout)
+            submitted = time.perf_counter()
+
+        def on_done(job):
+            # Future sudah selesai jika job dihentikan karena melewati batas waktu
+            try:
+                params, fit_seconds = job.result()
+                METRICS.observe('arima_fit', fit_seconds)
+                # Termasuk antrean di pool dan pengiriman data ke/dari worker
+                METRICS.observe('arima_job', time.perf_counter() - submitted)
+                state = self.forecaster.install_params(key, timestamps, values, params)
+                forecast = np.asarray(state.results.forecast(steps=steps))
+                self.cache.put(cache_key, forecast)
+                if not future.done():
+                    future.set_result(forecast)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+        job.add_done_callback(on_done)
+        return future
+
+    def _expire_jobs(self):
+        # Job yang melewati batas waktunya sendiri: future diberi TimeoutError dan key dilepas dari
+        # pending agar submit berikutnya mengirim job baru. ARIMA.fit yang sedang berjalan tidak bisa
+        # dibatalkan, jadi pool diganti dan worker lamanya dihentikan; job lain di pool lama ikut gagal
+        # (BrokenProcessPool) dan dikirim ulang pada submit berikutnya. Dipanggil dengan self.lock
+        now = time.monotonic()
+        expired = [key for key, (future, deadline) in self.pending.items() if not future.done() and now >= deadline]
+        for key in expired:
+            future, _ = self.pending.pop(key)
+            future.set_exception(TimeoutError(f"Prediksi {key} melebihi batas waktu {self.timeout:g} detik"))
+        if expired:
+            METRICS.increment('forecast_timeouts', len(expired))
+            self._recycle_executor()
+        return expired
+
+    def _recycle_executor(self):
+        old, self.executor = self.executor, self._create_executor()
+        processes = list((getattr(old, '_processes', None) or {}).values())
+        old.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def iter_completed(self, futures, timeout=None):
+        # Hasilkan (key, future) sesuai urutan selesai; future None jika job melewati batas waktunya
+        # sendiri (sejak submit) atau batas timeout pemanggilan ini
+        keys = {future: key for key, future in futures.items()}
+        now = time.monotonic()
+        with self.lock:
+            deadlines = {entry[0]: entry[1] for entry in self.pending.values() if entry[0] in keys}
+        deadlines = {future: deadlines.get(future, now + self.timeout) for future in keys}
+        call_deadline = None if timeout is None else now + timeout
+        remaining = set(keys)
+        while remaining:
+            until = min(deadlines[future] for future in remaining)
+            if call_deadline is not None:
+                until = min(until, call_deadline)
+            done, _ = wait(remaining, timeout=max(0.0, until - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                remaining.discard(future)
+                yield keys[future], future
+            if done:
+                continue
+            now = time.monotonic()
+            with self.lock:
+                self._expire_jobs()
+            for future in [future for future in remaining if now >= deadlines[future]
+                           or (call_deadline is not None and now >= call_deadline)]:
+                remaining.discard(future)
+                yield keys[future], None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def series_for_forecast(df, param):
+    # Siapkan deret (timestamp epoch ms, nilai) terurut dari lama ke baru, tanpa data yang dikarantina
+    ts_data = clean_rows(df)[['timestamp', param]].copy()
+    ts_data['timestamp'] = pd.to_datetime(ts_data['timestamp'])
+    # Snapshot ingestion sudah terurut (terbaru di baris 0): cukup dibalik, pengurutan penuh
+    # hanya untuk data yang memang tidak berurutan
+    if ts_data['timestamp'].is_monotonic_decreasing:
+        ts_data = ts_data.iloc[::-1]
+    elif not ts_data['timestamp'].is_monotonic_increasing:
+        ts_data = ts_data.sort_values('timestamp')
+    timestamps = ts_data['timestamp'].to_numpy(dtype='datetime64[ms]').astype('<i8')
+    return ts_data, timestamps, ts_data[param].to_numpy(dtype=float)
@@ -0,0 +1,140 @@
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import aiohttp
+from vital_store import now_epoch_ms
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+# Setelah pengiriman selesai, tunggu server meneruskan isi buffer pengurutan ulang (lateness/idle 5 detik)
+DRAIN_TIMEOUT = 15  # detik
+DRAIN_POLL = 0.2  # detik
+
+
+def make_batch(patient_ids, size, rng, last_timestamps):
+    # Data sensor acak dengan skema yang sama seperti data_generator. Timestamp unik dan naik per pasien
+    # (waktu sekarang, atau 1 ms setelah data terakhir pasien itu di semua koneksi) agar server tidak
+    # membuangnya sebagai duplikat (pasien, timestamp)
+    patients = rng.choice(patient_ids, size)
+    values = rng.normal([75, 120, 80, 98, 37], [5, 10, 8, 1, 0.3], size=(size, 5))
+    now = now_epoch_ms()
+    rows = []
+    for i in range(size):
+        patient_id = str(patients[i])
+        timestamp = max(now, last_timestamps.get(patient_id, 0) + 1)
+        last_timestamps[patient_id] = timestamp
+        rows.append({
+            'patient_id': patient_id,
+            'timestamp': timestamp,
+            'heart_rate': round(values[i, 0]),
+            'blood_pressure_systolic': round(values[i, 1]),
+            'blood_pressure_diastolic': round(values[i, 2]),
+            'oxygen_saturation': round(values[i, 3]),
+            'temperature': round(values[i, 4], 1),
+        })
+    return rows
+
+
+async def server_stats(session, url):
+    async with session.get(f'{url}/health') as response:
+        return await response.json()
+
+
+async def drain(session, url):
+    # Tunggu sampai buffer pengurutan ulang server kosong dan data yang dilepas selesai ditulis;
+    # hasil statistik /health terakhir
+    deadline = time.perf_counter() + DRAIN_TIMEOUT
+    stats = await server_stats(session, url)
+    while ((stats['reorder']['pending'] or stats['written'] < stats['reorder']['released'])
+           and time.perf_counter() < deadline):
+        await asyncio.sleep(DRAIN_POLL)
+        stats = await server_stats(session, url)
+    return stats
+
+
+async def http_worker(session, url, patient_ids, batch_size, deadline, latencies, counters, seed, last_timestamps):
+    rng = np.random.default_rng(seed)
+    while time.perf_counter() < deadline:
+        body = '\n'.join(json.dumps(row) for row in make_batch(patient_ids, batch_size, rng, last_timestamps))
+        start = time.perf_counter()
+        async with session.post(f'{url}/vitals', data=body,
+                                headers={'Content-Type': 'application/x-ndjson'}) as response:
+            result = await response.json()
+        latencies.append(time.perf_counter() - start)
+        counters['accepted'] += result.get('accepted', 0)
+        counters['rejected'] += len(result.get('rejected', []))
+
+
+async def ws_worker(session, url, patient_ids, batch_size, deadline, latencies, counters, seed, last_timestamps):
+    rng = np.random.default_rng(seed)
+    async with session.ws_connect(f"{url.replace('http', 'ws', 1)}/ws") as ws:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await ws.send_str(json.dumps(make_batch(patient_ids, batch_size, rng, last_timestamps)))
+            result = await ws.receive_json()
+            latencies.append(time.perf_counter() - start)
+            counters['accepted'] += result.get('accepted', 0)
+            counters['rejected'] += len(result.get('rejected', []))
+
+
+async def run_load_test(url, mode, connections, batch_size, duration, n_patients):
+    patient_ids = [f'LOAD-{i:05d}' for i in range(1, n_patients + 1)]
+    latencies = []
+    counters = {'accepted': 0, 'rejected': 0}
+    last_timestamps = {}
+    worker = ws_worker if mode == 'ws' else http_worker
+
+    async with aiohttp.ClientSession() as session:
+        before = await server_stats(session, url)
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            worker(session, url, patient_ids, batch_size, deadline, latencies, counters, seed, last_timestamps)
+            for seed in range(connections)
+        ])
+        elapsed = time.perf_counter() - start
+        after = await drain(session, url)
+
+    # Throughput dihitung dari baris yang benar-benar ditulis server (counter /health), bukan dari
+    # jawaban "accepted" yang juga mencakup data yang kemudian dibuang buffer pengurutan ulang
+    written = after['written'] - before['written']
+    reorder = {key: after['reorder'][key] - before['reorder'].get(key, 0)
+               for key in ('duplicates', 'late_dropped')}
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        'mode': mode,
+        'connections': connections,
+        'batch_size': batch_size,
+        'accepted': counters['accepted'],
+        'messages': written,
+        'rejected': counters['rejected'],
+        'duplicates': reorder['duplicates'],
+        'late_dropped': reorder['late_dropped'],
+        'pending': after['reorder']['pending'],
+        'messages_per_second': written / elapsed,
+        'requests': len(latencies),
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+        'latency_p99_ms': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test untuk ingest_server.py")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--mode", choices=["http", "ws"], default="http")
+    parser.add_argument("--connections", type=int, default=8, help="Jumlah koneksi paralel")
+    parser.add_argument("--batch-size", type=int, default=100, help="Jumlah data per request/pesan")
+    parser.add_argument("--duration", type=float, default=10, help="Lama pengujian (detik)")
+    parser.add_argument("--patients", type=int, default=100, help="Jumlah pasien simulasi")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.url, args.mode, args.connections, args.batch_size,
+                                       args.duration, args.patients))
+    print(f"Mode {result['mode']}: {result['accepted']:,} data diterima ({result['rejected']} ditolak) "
+          f"dari {result['requests']:,} request")
+    print(f"Ditulis server: {result['messages']:,} data ({result['duplicates']:,} duplikat, "
+          f"{result['late_dropped']:,} terlambat, {result['pending']:,} masih tertahan)")
+    print(f"Throughput: {result['messages_per_second']:,.0f} data/detik")
+    print(f"Latensi ingest: p50 {result['latency_p50_ms']:.1f} ms, p99 {result['latency_p99_ms']:.1f} ms")
@@ -0,0 +1,232 @@
+import json
+import asyncio
+import argparse
+from collections import defaultdict
+import numpy as np
+from aiohttp import web, WSMsgType
+from vital_store import VitalStore, VITAL_DTYPE, VITAL_PARAMETERS, TEMPERATURE_SCALE, to_epoch_ms, now_epoch_ms
+from reorder_buffer import ReorderBuffer, DEFAULT_LATENESS_MS
+
+HOST = '127.0.0.1'
+PORT = 8765
+BATCH_SIZE = 500  # jumlah data maksimal per penulisan ke store
+FLUSH_INTERVAL = 0.05  # detik, batas tunggu sebelum batch ditulis
+
+# Rentang nilai yang masih bisa disimpan dalam dtype ring buffer
+STORAGE_LIMITS = {name: (np.iinfo(VITAL_DTYPE[name]).min, np.iinfo(VITAL_DTYPE[name]).max)
+                  for name in VITAL_PARAMETERS}
+
+
+def parse_ndjson(body):
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def parse_payload(body, content_type=''):
+    # Terima objek JSON, array JSON, atau NDJSON (satu objek per baris). Tanpa content type
+    # NDJSON, body dibaca sebagai JSON dulu (boleh pretty-printed) lalu NDJSON jika gagal
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return parse_ndjson(body)
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError as error:
+        if '\n' not in body.strip():
+            raise
+        try:
+            return parse_ndjson(body)
+        except json.JSONDecodeError:
+            raise error
+    return payload if isinstance(payload, list) else [payload]
+
+
+def validate_readings(readings, default_patient_id=None):
+    # Validasi skema tanda vital; hasil (dict patient_id -> record array, daftar error)
+    valid = defaultdict(list)
+    errors = []
+    received_ms = now_epoch_ms()
+
+    for index, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            errors.append({'index': index, 'error': 'data harus berupa objek JSON'})
+            continue
+        patient_id = reading.get('patient_id', default_patient_id)
+        if not patient_id:
+            errors.append({'index': index, 'error': 'patient_id wajib diisi'})
+            continue
+
+        missing = [param for param in VITAL_PARAMETERS if param not in reading]
+        if missing:
+            errors.append({'index': index, 'error': f"field tidak ada: {', '.join(missing)}"})
+            continue
+        try:
+            values = [float(reading[param]) for param in VITAL_PARAMETERS]
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'nilai tanda vital harus numerik'})
+            continue
+        if not np.all(np.isfinite(values)):
+            errors.append({'index': index, 'error': 'nilai tanda vital tidak boleh NaN/inf'})
+            continue
+
+        timestamp = reading.get('timestamp')
+        try:
+            if timestamp is None:
+                timestamp_ms = received_ms
+            elif isinstance(timestamp, (int, float)):
+                timestamp_ms = int(timestamp)
+            else:
+                timestamp_ms = int(to_epoch_ms([timestamp])[0])
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': f'timestamp tidak valid: {timestamp}'})
+            continue
+
+        valid[str(patient_id)].append((timestamp_ms, values))
+
+    records = {}
+    for patient_id, rows in valid.items():
+        batch = np.empty(len(rows), dtype=VITAL_DTYPE)
+        batch['timestamp'] = [row[0] for row in rows]
+        values = np.array([row[1] for row in rows])
+        for i, param in enumerate(VITAL_PARAMETERS):
+            column = values[:, i] * (TEMPERATURE_SCALE if param == 'temperature' else 1)
+            low, high = STORAGE_LIMITS[param]
+            batch[param] = np.clip(np.round(column), low, high)
+        records[patient_id] = batch
+    return records, errors
+
+
+class BatchWriter:
+    # Mengumpulkan data dari banyak koneksi dan menulisnya ke store dalam batch. Data melewati
+    # buffer pengurutan ulang sehingga ring buffer selalu terisi urut waktu walaupun sensor
+    # mengirim data terlambat, ganda, atau tidak berurutan.
+
+    def __init__(self, store, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, reorder=None):
+        self.store = store
+        self.reorder = reorder or ReorderBuffer()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(list)
+        self.pending_rows = 0
+        self.waiters = []
+        self.wakeup = asyncio.Event()
+        self.stats = {'received': 0, 'written': 0, 'rejected': 0, 'batches': 0}
+
+    async def submit(self, records):
+        # Masukkan record ke antrian; selesai ketika batch berisi record ini sudah tertulis
+        future = asyncio.get_running_loop().create_future()
+        for patient_id, batch in records.items():
+            self.pending[patient_id].append(batch)
+            self.pending_rows += len(batch)
+            self.stats['received'] += len(batch)
+        self.waiters.append(future)
+        if self.pending_rows >= self.batch_size:
+            self.wakeup.set()
+        await future
+
+    def _write(self, released):
+        for patient_id, rows in released.items():
+            if len(rows):
+                self.store.append(patient_id, rows)
+                self.stats['written'] += len(rows)
+
+    def flush(self, final=False):
+        pending, waiters = self.pending, self.waiters
+        self.pending, self.waiters, self.pending_rows = defaultdict(list), [], 0
+        self._write({patient_id: self.reorder.push(patient_id, np.concatenate(batches))
+                     for patient_id, batches in pending.items()})
+        # Data pasien yang berhenti mengirim tidak ditahan lebih lama dari batas idle
+        self._write(self.reorder.flush() if final else self.reorder.expire())
+        if pending:
+            self.stats['batches'] += 1
+        # Pengirim tidak menunggu watermark: data sudah diterima begitu masuk buffer pengurutan
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if self.pending_rows or self.reorder.pending_count():
+                self.flush()
+
+
+async def handle_post(request):
+    writer = request.app['writer']
+    try:
+        readings = parse_payload(await request.text(), request.content_type)
+    except json.JSONDecodeError as e:
+        return web.json_response({'error': f'JSON tidak valid: {str(e)}'}, status=400)
+
+    records, errors = validate_readings(readings, request.query.get('patient_id'))
+    writer.stats['rejected'] += len(errors)
+    accepted = sum(len(batch) for batch in records.values())
+    if accepted:
+        await writer.submit(records)
+    status = 200 if accepted or not errors else 400
+    return web.json_response({'accepted': accepted, 'rejected': errors}, status=status)
+
+
+async def handle_ws(request):
+    # Stream WebSocket: setiap pesan berisi satu objek, array, atau NDJSON
+    writer = request.app['writer']
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    default_patient_id = request.query.get('patient_id')
+
+    async for message in ws:
+        if message.type != WSMsgType.TEXT:
+            continue
+        try:
+            readings = parse_payload(message.data)
+        except json.JSONDecodeError as e:
+            await ws.send_json({'error': f'JSON tidak valid: {str(e)}'})
+            continue
+        records, errors = validate_readings(readings, default_patient_id)
+        writer.stats['rejected'] += len(errors)
+        accepted = sum(len(batch) for batch in records.values())
+        if accepted:
+            await writer.submit(records)
+        await ws.send_json({'accepted': accepted, 'rejected': errors})
+    return ws
+
+
+async def handle_health(request):
+    writer = request.app['writer']
+    return web.json_response(dict(writer.stats, reorder=writer.reorder.summary()))
+
+
+async def start_writer(app):
+    app['writer_task'] = asyncio.create_task(app['writer'].run())
+
+
+async def stop_writer(app):
+    app['writer_task'].cancel()
+    app['writer'].flush(final=True)
+    app['writer'].store.flush()
+
+
+def create_app(store=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, lateness_ms=DEFAULT_LATENESS_MS):
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app['writer'] = BatchWriter(store or VitalStore(), batch_size, flush_interval, ReorderBuffer(lateness_ms))
+    app.router.add_post('/vitals', handle_post)
+    app.router.add_get('/ws', handle_ws)
+    app.router.add_get('/health', handle_health)
+    app.on_startup.append(start_writer)
+    app.on_cleanup.append(stop_writer)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server ingestion lokal untuk data sensor (HTTP POST dan WebSocket)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL)
+    parser.add_argument("--lateness-ms", type=int, default=DEFAULT_LATENESS_MS,
+                        help="Lama data ditahan untuk pengurutan ulang (ms); data lebih tua dibuang")
+    args = parser.parse_args()
+    web.run_app(create_app(batch_size=args.batch_size, flush_interval=args.flush_interval,
+                           lateness_ms=args.lateness_ms),
+                host=args.host, port=args.port)
@@ -0,0 +1,217 @@
+import os
+import threading
+from collections import namedtuple, deque
+from datetime import datetime
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+from vital_store import VitalStore, VITAL_DTYPE, frame_to_records, records_to_frame
+from reorder_buffer import ReorderBuffer
+from validation import validate_frame
+from bed_history import BedCensusTracker
+from columnar_io import FILE_EXTENSIONS, read_frame
+from alert_daemon import read_alert_events, ALERT_LOG
+from instrumentation import METRICS
+
+POLL_INTERVAL = 2  # detik
+IOT_WINDOW = 500  # jumlah data terbaru per pasien yang dipublikasikan
+DATA_DIR = 'data'
+BED_DIR = 'data/bed_availability'
+ALERT_HISTORY = 200  # jumlah event alert terakhir yang dipublikasikan
+CSV_STREAM = 'csv'  # key buffer pengurutan ulang untuk stream file lama (tanpa ID pasien)
+
+# Snapshot tidak pernah diubah setelah dipublikasikan; setiap pembaruan membuat objek baru
+IngestionSnapshot = namedtuple('IngestionSnapshot', [
+    'version',           # bertambah setiap ada data baru
+    'updated_at',        # waktu snapshot dibuat
+    'vitals',            # patient_id -> DataFrame tanda vital tervalidasi (urut waktu, terbaru di baris 0)
+    'sources',           # patient_id -> sumber data (ring buffer / nama file CSV)
+    'first_timestamps',  # patient_id -> timestamp data pertama yang tersimpan
+    'beds',              # DataFrame ketersediaan bed terbaru
+    'bed_source',        # nama file bed terbaru, atau 'riwayat bed'
+    'bed_stats',         # DataFrame statistik okupansi dan prediksi sensus per unit (None tanpa riwayat)
+    'bed_forecast',      # DataFrame prediksi sensus per unit untuk beberapa horizon
+    'alerts',            # tuple event dari alert daemon (terbaru di akhir)
+])
+
+EMPTY_SNAPSHOT = IngestionSnapshot(0, None, MappingProxyType({}), MappingProxyType({}),
+                                   MappingProxyType({}), None, None, None, None, ())
+
+
+def newest_file(directory):
+    # Nama file stream terbaru (nama berisi timestamp sehingga urutan nama = urutan waktu)
+    if not os.path.exists(directory):
+        return None
+    files = [f for f in os.listdir(directory) if f.endswith(FILE_EXTENSIONS)]
+    return max(files) if files else None
+
+
+class IngestionService:
+    # Worker tunggal per proses yang membaca sumber data dan mempublikasikan snapshot
+    # untuk dibaca oleh semua sesi Streamlit
+
+    def __init__(self, store=None, poll_interval=POLL_INTERVAL, window=IOT_WINDOW, reorder=None, bed_census=None):
+        self.store = store or VitalStore(readonly=True)
+        self.bed_census = bed_census or BedCensusTracker()
+        self.reorder = reorder or ReorderBuffer()
+        self.poll_interval = poll_interval
+        self.window = window
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.watched = set()
+        self.ring_counts = {}
+        self.csv_seen = set()
+        self.csv_window = np.empty(0, dtype=VITAL_DTYPE)
+        self.csv_version = 0
+        self.csv_source = None
+        self.csv_frame = None
+        self.csv_first_timestamp = None
+        self.bed_file = None
+        self.alert_offset = 0
+        self.alert_events = deque(maxlen=ALERT_HISTORY)
+        self._snapshot = EMPTY_SNAPSHOT
+
+        self.thread = threading.Thread(target=self._run, name='ingestion-service', daemon=True)
+        self.thread.start()
+
+    def snapshot(self):
+        return self._snapshot
+
+    def watch(self, patient_id):
+        # Daftarkan pasien; pembacaan pertama dilakukan langsung agar sesi baru tidak menunggu
+        if patient_id not in self.watched:
+            self.watched.add(patient_id)
+            self.refresh()
+        return self._snapshot
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=self.poll_interval * 2)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                with METRICS.timer('ingestion_refresh'):
+                    self.refresh()
+                METRICS.write_prometheus()
+            except Exception as e:
+                print(f"Error ingestion service: {str(e)}")
+            self.stop_event.wait(self.poll_interval)
+
+    def _read_new_files(self):
+        # Semua file yang belum pernah dibaca (bukan hanya nama terbesar) dilewatkan ke buffer
+        # pengurutan ulang; jendela terbaru hanya ditambah record yang sudah lewat watermark
+        if not os.path.exists(DATA_DIR):
+            return
+        names = {f for f in os.listdir(DATA_DIR) if f.endswith(FILE_EXTENSIONS)}
+        new_files = sorted(names - self.csv_seen)
+        self.csv_seen = names
+        released = []
+        if new_files:
+            with METRICS.timer('vital_file_read'):
+                records = np.concatenate([frame_to_records(read_frame(os.path.join(DATA_DIR, name)))
+                                          for name in new_files])
+            released.append(self.reorder.push(CSV_STREAM, records))
+            self.csv_source = new_files[-1]
+        released.extend(self.reorder.expire().values())
+        released = [records for records in released if len(records)]
+        if not released:
+            return
+        self.csv_window = np.concatenate([self.csv_window] + released)[-self.window:]
+        if self.csv_first_timestamp is None:
+            self.csv_first_timestamp = pd.Timestamp(self.csv_window['timestamp'][0], unit='ms')
+        self.csv_frame = validate_frame(records_to_frame(self.csv_window[::-1]))
+        self.csv_version += 1
+
+    def refresh(self):
+        with self.lock:
+            current = self._snapshot
+            vitals = dict(current.vitals)
+            sources = dict(current.sources)
+            first_timestamps = dict(current.first_timestamps)
+            beds = current.beds
+            bed_source = current.bed_source
+            bed_stats = current.bed_stats
+            bed_forecast = current.bed_forecast
+            changed = False
+
+            # Ring buffer: baca ulang hanya jika counter record berubah. Counter baru dicatat setelah
+            # snapshot terbit agar pembacaan yang gagal diulang pada refresh berikutnya
+            read_counts = {}
+            csv_needed = []
+            for patient_id in list(self.watched):
+                ring = self.store.ring(patient_id)
+                if ring is None:
+                    block = self.store.block()
+                    if block is not None and patient_id in block.patient_index:
+                        count = ('block', block.count)
+                    else:
+                        csv_needed.append(patient_id)
+                        continue
+                else:
+                    count = ('ring', ring.count)
+                if self.ring_counts.get(patient_id) == count:
+                    continue
+                with METRICS.timer('ring_read'):
+                    frame = self.store.latest_frame(patient_id, self.window)
+                if frame is None:
+                    # Ring/blok baru dibuat (mis. main_batch baru mulai) tetapi belum berisi data:
+                    # frame sebelumnya dipertahankan dan dibaca lagi saat counter bertambah
+                    continue
+                vitals[patient_id] = validate_frame(frame)
+                sources[patient_id] = 'ring buffer'
+                first_timestamps[patient_id] = self.store.first_timestamp(patient_id)
+                read_counts[patient_id] = count
+                changed = True
+
+            # Fallback file stream lama: satu kali scan direktori untuk semua pasien
+            if csv_needed:
+                self._read_new_files()
+                for patient_id in csv_needed:
+                    if self.csv_frame is None or self.ring_counts.get(patient_id) == ('csv', self.csv_version):
+                        continue
+                    vitals[patient_id] = self.csv_frame
+                    sources[patient_id] = self.csv_source
+                    first_timestamps[patient_id] = self.csv_first_timestamp
+                    read_counts[patient_id] = ('csv', self.csv_version)
+                    changed = True
+
+            # Ketersediaan bed: dari riwayat bed (hanya snapshot baru yang diproses) jika tersedia,
+            # selain itu dari file bed terbaru
+            with METRICS.timer('bed_census'):
+                census_changed = self.bed_census.refresh()
+            if census_changed:
+                beds = self.bed_census.history.latest_frame()
+                bed_source = 'riwayat bed'
+                bed_stats = self.bed_census.summary()
+                bed_forecast = self.bed_census.forecast_frame()
+                changed = True
+            latest_bed_file = None if self.bed_census.ring is not None else newest_file(BED_DIR)
+            if latest_bed_file is not None and latest_bed_file != self.bed_file:
+                self.bed_file = latest_bed_file
+                with METRICS.timer('bed_file_read'):
+                    beds = read_frame(os.path.join(BED_DIR, self.bed_file))
+                bed_source = self.bed_file
+                changed = True
+
+            # Event dari alert daemon (hanya baris baru sejak pembacaan terakhir)
+            events, self.alert_offset = read_alert_events(ALERT_LOG, self.alert_offset)
+            if events:
+                self.alert_events.extend(events)
+                changed = True
+
+            if changed:
+                self._snapshot = IngestionSnapshot(
+                    version=current.version + 1,
+                    updated_at=datetime.now(),
+                    vitals=MappingProxyType(vitals),
+                    sources=MappingProxyType(sources),
+                    first_timestamps=MappingProxyType(first_timestamps),
+                    beds=beds,
+                    bed_source=bed_source,
+                    bed_stats=bed_stats,
+                    bed_forecast=bed_forecast,
+                    alerts=tuple(self.alert_events),
+                )
+                self.ring_counts.update(read_counts)
+        return self._snapshot
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+import threading
+import functools
+from collections import deque, Counter
+from datetime import datetime
+import numpy as np
+
+METRICS_FILE = os.environ.get('DASHBOARD_METRICS_FILE', 'data/metrics/dashboard.prom')
+METRICS_WRITE_INTERVAL = 15  # detik
+ROLLING_WINDOW = 1024  # jumlah durasi terakhir per langkah untuk persentil bergulir
+QUANTILES = (0.5, 0.9, 0.99)
+# Batas bucket histogram (detik), kumulatif seperti histogram Prometheus
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PROFILE_DIR = 'data/profiles'
+PROFILE_INTERVAL = 0.005  # detik antar sampel stack
+# Profil hanya disimpan jika rerun lebih lambat dari batas ini (ms); 0 = tidak aktif
+PROFILE_SLOW_MS = float(os.environ.get('DASHBOARD_PROFILE_SLOW_MS', 0))
+
+
+class StepMetrics:
+    # Statistik durasi satu langkah: jendela bergulir untuk persentil dan histogram kumulatif
+
+    def __init__(self):
+        self.recent = deque(maxlen=ROLLING_WINDOW)
+        self.buckets = np.zeros(len(HISTOGRAM_BUCKETS), dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.recent.append(seconds)
+        self.buckets[np.searchsorted(HISTOGRAM_BUCKETS, seconds):] += 1
+        self.count += 1
+        self.total += seconds
+
+
+class Timer:
+    # Stopwatch untuk satu langkah; bisa dipakai sebagai context manager atau start()/stop()
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started
+        self.started = None
+        self.registry.observe(self.name, elapsed)
+        return elapsed
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class MetricsRegistry:
+    # Kumpulan metrik durasi dan counter per proses, dibagi oleh semua sesi dashboard
+
+    def __init__(self):
+        self.steps = {}
+        self.counters = Counter()
+        self.lock = threading.Lock()
+        self.last_write = 0.0
+
+    def observe(self, name, seconds):
+        with self.lock:
+            step = self.steps.get(name)
+            if step is None:
+                step = self.steps[name] = StepMetrics()
+            step.observe(seconds)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def timer(self, name):
+        return Timer(self, name)
+
+    def timed(self, name, profile_slow_ms=0):
+        # Decorator untuk mengukur setiap pemanggilan fungsi. Dengan profile_slow_ms > 0 setiap
+        # pemanggilan juga diprofil (mis. fragment Streamlit yang berjalan tanpa rerun halaman)
+        # dan profilnya disimpan jika lebih lambat dari batas tersebut
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                profiler = SamplingProfiler().start() if profile_slow_ms else None
+                try:
+                    with self.timer(name):
+                        return function(*args, **kwargs)
+                finally:
+                    finish_profile(profiler, profile_slow_ms, label=name)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        # Satu baris per langkah: jumlah, persentil bergulir dan maksimum (ms)
+        with self.lock:
+            steps = {name: (list(step.recent), step.count, step.total) for name, step in self.steps.items()}
+        rows = []
+        for name, (recent, count, total) in sorted(steps.items()):
+            recent_ms = np.asarray(recent) * 1000
+            row = {'langkah': name, 'jumlah': count, 'rata-rata (ms)': total / count * 1000}
+            for q in QUANTILES:
+                row[f'p{int(q * 100)} (ms)'] = float(np.quantile(recent_ms, q))
+            row['maks (ms)'] = float(recent_ms.max())
+            rows.append(row)
+        return rows
+
+    def render_prometheus(self):
+        with self.lock:
+            steps = {name: (list(step.recent), step.buckets.copy(), step.count, step.total)
+                     for name, step in self.steps.items()}
+            counters = dict(self.counters)
+
+        lines = ['# HELP dashboard_step_duration_seconds Durasi langkah dashboard sejak proses dimulai',
+                 '# TYPE dashboard_step_duration_seconds histogram']
+        for name, (_, buckets, count, total) in sorted(steps.items()):
+            for bound, cumulative in zip(HISTOGRAM_BUCKETS, buckets):
+                lines.append(f'dashboard_step_duration_seconds_bucket{{step="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'dashboard_step_duration_seconds_bucket{{step="{name}",le="+Inf"}} {count}')
+            lines.append(f'dashboard_step_duration_seconds_sum{{step="{name}"}} {total:.6f}')
+            lines.append(f'dashboard_step_duration_seconds_count{{step="{name}"}} {count}')
+
+        lines += ['# HELP dashboard_step_recent_seconds Persentil bergulir dari durasi terakhir',
+                  '# TYPE dashboard_step_recent_seconds summary']
+        for name, (recent, _, _, _) in sorted(steps.items()):
+            for q in QUANTILES:
+                lines.append(f'dashboard_step_recent_seconds{{step="{name}",quantile="{q}"}} '
+                             f'{float(np.quantile(recent, q)):.6f}')
+            lines.append(f'dashboard_step_recent_seconds_sum{{step="{name}"}} {sum(recent):.6f}')
+            lines.append(f'dashboard_step_recent_seconds_count{{step="{name}"}} {len(recent)}')
+
+        if counters:
+            lines += ['# TYPE dashboard_events_total counter']
+            for name, value in sorted(counters.items()):
+                lines.append(f'dashboard_events_total{{event="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=METRICS_FILE, min_interval=METRICS_WRITE_INTERVAL):
+        # Tulis file teks Prometheus (format textfile collector) secara atomik, dibatasi per interval
+        now = time.monotonic()
+        if now - self.last_write < min_interval:
+            return False
+        self.last_write = now
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        return True
+
+
+# Registry tunggal per proses
+METRICS = MetricsRegistry()
+
+
+class SamplingProfiler:
+    # Profiler sampling ringan: thread terpisah mengambil stack thread target secara berkala
+    # dan menghitung stack dalam format "collapsed" (bisa dibuka dengan flamegraph/speedscope)
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+
+    def _sample(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        return (time.perf_counter() - self.started) * 1000
+
+    def dump(self, directory=PROFILE_DIR, label='rerun'):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{label}_{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}.collapsed')
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+def finish_profile(profiler, slow_ms, label='rerun'):
+    # Hentikan profiler; simpan hasilnya hanya jika rerun (atau fragment) lebih lambat dari slow_ms
+    if profiler is None:
+        return None
+    elapsed_ms = profiler.stop()
+    if elapsed_ms >= slow_ms:
+        METRICS.increment('slow_rerun_profiles')
+        return profiler.dump(label=label)
+    return None
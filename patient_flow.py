@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+
+def calculate_duration(history, now=None):
+    # Total durasi perawatan per unit dari riwayat perpindahan (Masuk/Keluar)
+    now = now or datetime.now()
+    durations = {}
+    current_unit = None
+    current_time = None
+    
+    for record in history:
+        timestamp = datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S')
+        unit = record['unit']
+        status = record['status']
+        
+        if status == 'Masuk':
+            current_unit = unit
+            current_time = timestamp
+        elif status == 'Keluar' and current_unit == unit:
+            if unit not in durations:
+                durations[unit] = timedelta()
+            duration = timestamp - current_time
+            durations[unit] += duration
+            current_unit = None
+            
+    # Tambahkan durasi untuk lokasi saat ini jika masih dalam perawatan
+    if current_unit:
+        if current_unit not in durations:
+            durations[current_unit] = timedelta()
+        durations[current_unit] += now - current_time
+        
+    return durations
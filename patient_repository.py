@@ -0,0 +1,255 @@
+import os
+import queue
+import sqlite3
+import threading
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from adt_store import AdtEvent, ADMIT, to_ms
+from vital_store import from_epoch_ms, DEFAULT_STORE_DIR
+from instrumentation import METRICS
+
+PATIENT_DB = os.environ.get('PATIENT_DB', os.path.join(DEFAULT_STORE_DIR, 'patients.db'))
+POOL_SIZE = 4  # koneksi SQLite yang dipakai bergantian oleh thread script Streamlit
+BUSY_TIMEOUT_MS = 5000  # tunggu kunci tulis dari koneksi/proses lain sebelum gagal
+RECORD_CACHE_SIZE = 256  # jumlah rekam pasien terakhir yang disimpan di cache baca
+
+# Kolom tabel patients untuk setiap field form data pasien
+PATIENT_FIELDS = {
+    'ID Pasien': 'patient_id',
+    'Nama': 'nama',
+    'Usia': 'usia',
+    'Jenis Kelamin': 'jenis_kelamin',
+    'Golongan Darah': 'golongan_darah',
+    'Diagnosa': 'diagnosa',
+    'Dokter Penanggung Jawab': 'dokter',
+}
+THERAPY_FIELDS = ['medicine', 'dosage', 'frequency', 'route', 'notes', 'doctor']
+EMPTY_PATIENT = {
+    'ID Pasien': '',
+    'Nama': '',
+    'Usia': '',
+    'Jenis Kelamin': 'Laki-laki',
+    'Golongan Darah': 'O+',
+    'Diagnosa': '',
+    'Dokter Penanggung Jawab': '',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    nama TEXT, usia TEXT, jenis_kelamin TEXT, golongan_darah TEXT, diagnosa TEXT, dokter TEXT,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transfers_patient ON transfers (patient_id, timestamp);
+CREATE INDEX IF NOT EXISTS transfers_unit ON transfers (unit, timestamp);
+CREATE TABLE IF NOT EXISTS therapy_orders (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    medicine TEXT, dosage TEXT, frequency TEXT, route TEXT, notes TEXT, doctor TEXT
+);
+CREATE INDEX IF NOT EXISTS therapy_patient ON therapy_orders (patient_id, timestamp);
+CREATE TABLE IF NOT EXISTS dose_administrations (
+    order_id INTEGER NOT NULL,
+    due INTEGER NOT NULL,
+    given_at INTEGER NOT NULL,
+    PRIMARY KEY (order_id, due)
+);
+"""
+
+# Rekam satu pasien dalam format yang dipakai dashboard (riwayat lokasi dan terapi sebagai list dict)
+PatientRecord = namedtuple('PatientRecord', ['patient_data', 'location_history', 'current_location', 'therapy_advice'])
+
+
+def format_ms(values):
+    return list(from_epoch_ms(values).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+class ConnectionPool:
+    # Pool koneksi SQLite mode WAL: pembaca tidak menunggu penulis, dan setiap koneksi dipakai
+    # oleh satu thread dalam satu waktu (check_same_thread=False karena thread script Streamlit berganti)
+
+    def __init__(self, path=PATIENT_DB, size=POOL_SIZE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connections = queue.Queue()
+        for _ in range(size):
+            self.connections.put(self._connect())
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                                     isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        return connection
+
+    @contextmanager
+    def connection(self):
+        connection = self.connections.get()
+        try:
+            yield connection
+        finally:
+            self.connections.put(connection)
+
+    @contextmanager
+    def transaction(self):
+        # Satu transaksi tulis (BEGIN IMMEDIATE agar kunci tulis diambil di awal)
+        with self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get().close()
+
+
+class PatientRepository:
+    # Data pasien, riwayat perpindahan dan order terapi yang tahan reload dan dibagi semua sesi.
+    # Baca lewat cache per pasien; cache pasien dibuang setiap kali repository ini menulis datanya
+
+    def __init__(self, path=PATIENT_DB, pool_size=POOL_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.transaction() as connection:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    connection.execute(statement)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = 0  # naik setiap ada tulis; hasil baca yang bersamaan dengan tulis tidak di-cache
+
+    def _invalidate(self, patient_ids):
+        with self.lock:
+            for patient_id in patient_ids:
+                self.cache.pop(patient_id, None)
+            self.version += 1
+
+    def has_patient(self, patient_id):
+        with self.pool.connection() as connection:
+            return connection.execute('SELECT 1 FROM patients WHERE patient_id = ?', (patient_id,)).fetchone() is not None
+
+    def list_patients(self):
+        with self.pool.connection() as connection:
+            return [row[0] for row in connection.execute('SELECT patient_id FROM patients ORDER BY patient_id')]
+
+    def _write_patient(self, connection, patient_data, now_ms, replace=True):
+        columns = list(PATIENT_FIELDS.values()) + ['updated_at']
+        values = [patient_data.get(field, '') for field in PATIENT_FIELDS] + [now_ms]
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        cursor = connection.execute(f"{verb} INTO patients ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                    values)
+        return cursor.rowcount
+
+    def _write_events(self, connection, events):
+        connection.executemany('INSERT INTO transfers (patient_id, unit, status, timestamp) VALUES (?, ?, ?, ?)',
+                               [(event.patient_id, event.unit, event.status, event.timestamp) for event in events])
+
+    def _write_therapy(self, connection, orders):
+        # Hasil: id order baru (dipakai indeks dosis)
+        columns = ['patient_id', 'timestamp'] + THERAPY_FIELDS
+        statement = f"INSERT INTO therapy_orders ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        return [connection.execute(statement, [order['patient_id'], to_ms(order['timestamp'])]
+                                   + [order.get(field, '') for field in THERAPY_FIELDS]).lastrowid
+                for order in orders]
+
+    def create_patient(self, patient_data, events=()):
+        # Buat pasien baru beserta event awal; tidak menimpa jika sudah ada (aman dipanggil banyak sesi)
+        with METRICS.timer('repository_write'):
+            with self.pool.transaction() as connection:
+                created = self._write_patient(connection, patient_data, to_ms(datetime.now()), replace=False) > 0
+                if created:
+                    self._write_events(connection, events)
+        self._invalidate([patient_data['ID Pasien']])
+        return created
+
+    def save_form(self, patient_data, events=(), therapy_orders=()):
+        # Satu submit form = satu transaksi: data pasien, event perpindahan dan order terapi sekaligus.
+        # Hasil: id order terapi yang baru dibuat
+        with METRICS.timer('repository_write'):
+            with self.pool.transaction() as connection:
+                self._write_patient(connection, patient_data, to_ms(datetime.now()))
+                self._write_events(connection, events)
+                order_ids = self._write_therapy(connection, therapy_orders)
+        self._invalidate({patient_data['ID Pasien']} | {event.patient_id for event in events})
+        return order_ids
+
+    def record_administrations(self, doses, given_at=None):
+        # Tandai dosis (order_id, due) sudah diberikan, semua dalam satu transaksi
+        given_at = to_ms(given_at or datetime.now())
+        with METRICS.timer('repository_write'):
+            with self.pool.transaction() as connection:
+                connection.executemany('INSERT OR IGNORE INTO dose_administrations (order_id, due, given_at) '
+                                       'VALUES (?, ?, ?)', [(order_id, due, given_at) for order_id, due in doses])
+
+    def therapy_orders(self):
+        # Semua order terapi sebagai argumen DoseIndex.add_order, urut waktu order
+        with self.pool.connection() as connection:
+            return connection.execute('SELECT id, patient_id, medicine, dosage, route, frequency, timestamp '
+                                      'FROM therapy_orders ORDER BY timestamp, id').fetchall()
+
+    def administrations(self, since=None):
+        # Dosis yang sudah diberikan (order_id, due), sejak waktu tertentu jika diberikan
+        with self.pool.connection() as connection:
+            return connection.execute('SELECT order_id, due FROM dose_administrations WHERE due >= ?',
+                                      (to_ms(since) if since is not None else 0,)).fetchall()
+
+    def transfer_events(self):
+        # Semua event perpindahan, urut waktu per pasien, untuk memuat indeks ADT saat start
+        with self.pool.connection() as connection:
+            rows = connection.execute('SELECT patient_id, unit, status, timestamp FROM transfers '
+                                      'ORDER BY timestamp, id').fetchall()
+        return [AdtEvent(*row) for row in rows]
+
+    def load_patient(self, patient_id):
+        # Rekam satu pasien dari cache, atau tiga query berindeks jika belum ada di cache
+        with self.lock:
+            record = self.cache.get(patient_id)
+            if record is not None:
+                self.cache.move_to_end(patient_id)
+                METRICS.increment('repository_cache_hit')
+                return record
+            version = self.version
+        METRICS.increment('repository_cache_miss')
+        with METRICS.timer('repository_read'), self.pool.connection() as connection:
+            columns = list(PATIENT_FIELDS.values())
+            row = connection.execute(f"SELECT {', '.join(columns)} FROM patients WHERE patient_id = ?",
+                                     (patient_id,)).fetchone()
+            transfers = connection.execute('SELECT unit, status, timestamp FROM transfers WHERE patient_id = ? '
+                                           'ORDER BY timestamp, id', (patient_id,)).fetchall()
+            therapy = connection.execute(f"SELECT timestamp, id, {', '.join(THERAPY_FIELDS)} FROM therapy_orders "
+                                         'WHERE patient_id = ? ORDER BY timestamp, id', (patient_id,)).fetchall()
+
+        patient_data = dict(EMPTY_PATIENT) if row is None else dict(zip(PATIENT_FIELDS, row))
+        location_history = [{'timestamp': timestamp, 'unit': unit, 'status': status}
+                            for (unit, status, _), timestamp
+                            in zip(transfers, format_ms([row[2] for row in transfers]))]
+        current_location = ''
+        if transfers and transfers[-1][1] == ADMIT:
+            current_location = transfers[-1][0]
+        therapy_advice = [dict(zip(THERAPY_FIELDS, row[2:]), timestamp=timestamp, order_id=row[1])
+                          for row, timestamp in zip(therapy, format_ms([row[0] for row in therapy]))]
+        record = PatientRecord(patient_data, location_history, current_location, therapy_advice)
+
+        with self.lock:
+            # Jangan simpan hasil baca yang sudah basi karena ada tulis di tengah pembacaan
+            if version == self.version:
+                self.cache[patient_id] = record
+                while len(self.cache) > RECORD_CACHE_SIZE:
+                    self.cache.popitem(last=False)
+        return record
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import Counter
+import numpy as np
+
+DEFAULT_LATENESS_MS = 5000  # data ditahan sampai data 5 detik lebih baru sudah diterima
+DEFAULT_BUFFER_CAPACITY = 1000  # jumlah record tertahan maksimal per pasien
+DEFAULT_IDLE_SECONDS = 5.0  # pasien tanpa data baru selama ini dikosongkan buffernya
+RECENT_TIMESTAMPS = 1000  # timestamp terakhir yang diteruskan, untuk membedakan duplikat dari data terlambat
+
+
+class ReorderBuffer:
+    # Buffer pengurutan ulang per pasien di jalur ingestion. Record ditahan sampai watermark
+    # (timestamp terbesar yang sudah diterima dikurangi lateness) melewatinya, lalu diteruskan
+    # terurut waktu. Record dengan (pasien, timestamp) yang sama hanya diteruskan sekali, dan
+    # record yang lebih tua dari data yang sudah diteruskan dibuang sebagai data terlambat.
+    # Hanya isi buffer (kecil dan terbatas) yang diurutkan, bukan seluruh riwayat.
+
+    def __init__(self, lateness_ms=DEFAULT_LATENESS_MS, capacity=DEFAULT_BUFFER_CAPACITY,
+                 idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.lateness_ms = lateness_ms
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self.pending = {}  # patient_id -> record tertahan, urut timestamp
+        self.max_seen = {}  # patient_id -> timestamp terbesar yang pernah diterima
+        self.released = {}  # patient_id -> timestamp terakhir yang sudah diteruskan (urut)
+        self.last_arrival = {}  # patient_id -> waktu monotonic data terakhir diterima
+        self.stats = Counter({'received': 0, 'released': 0, 'duplicates': 0, 'late_dropped': 0,
+                              'forced_releases': 0})
+        self.lock = threading.Lock()
+
+    def watermark(self, patient_id):
+        max_seen = self.max_seen.get(patient_id)
+        return None if max_seen is None else max_seen - self.lateness_ms
+
+    def _drop_stale(self, patient_id, records):
+        # Buang record yang tidak lebih baru dari data terakhir yang sudah diteruskan
+        released = self.released.get(patient_id)
+        if released is None or len(records) == 0:
+            return records
+        stale = records['timestamp'] <= released[-1]
+        if stale.any():
+            duplicates = int(np.isin(records['timestamp'][stale], released).sum())
+            self.stats['duplicates'] += duplicates
+            self.stats['late_dropped'] += int(stale.sum()) - duplicates
+        return records[~stale]
+
+    def _release(self, patient_id, count):
+        pending = self.pending[patient_id]
+        out, self.pending[patient_id] = pending[:count], pending[count:]
+        if len(out):
+            previous = self.released.get(patient_id, out['timestamp'][:0])
+            self.released[patient_id] = np.concatenate([previous, out['timestamp']])[-RECENT_TIMESTAMPS:]
+            self.stats['released'] += len(out)
+        return out
+
+    def push(self, patient_id, records):
+        # Terima record (urutan bebas); hasil: record yang sudah boleh diteruskan, urut waktu
+        with self.lock:
+            self.stats['received'] += len(records)
+            self.last_arrival[patient_id] = time.monotonic()
+            records = self._drop_stale(patient_id, records)
+
+            pending = self.pending.get(patient_id)
+            if pending is not None and len(pending):
+                records = np.concatenate([pending, records])
+            # Urutan stabil: untuk timestamp kembar, record yang datang lebih dulu dipertahankan
+            records = records[np.argsort(records['timestamp'], kind='stable')]
+            first = np.r_[True, np.diff(records['timestamp']) > 0] if len(records) else np.ones(0, dtype=bool)
+            self.stats['duplicates'] += int(len(records) - first.sum())
+            records = records[first]
+            self.pending[patient_id] = records
+            if len(records) == 0:
+                return records
+
+            self.max_seen[patient_id] = max(self.max_seen.get(patient_id, records['timestamp'][-1]),
+                                            int(records['timestamp'][-1]))
+            count = int(np.searchsorted(records['timestamp'], self.watermark(patient_id), side='right'))
+            # Buffer penuh: record tertua diteruskan lebih awal walaupun watermark belum lewat
+            forced = max(0, len(records) - count - self.capacity)
+            self.stats['forced_releases'] += forced
+            return self._release(patient_id, count + forced)
+
+    def expire(self, now=None):
+        # Kosongkan buffer pasien yang tidak mengirim data selama idle_seconds, agar data
+        # terakhir tidak tertahan selamanya; hasil dict patient_id -> record
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle = [patient_id for patient_id, records in self.pending.items()
+                    if len(records) and now - self.last_arrival[patient_id] >= self.idle_seconds]
+            return {patient_id: self._release(patient_id, len(self.pending[patient_id]))
+                    for patient_id in idle}
+
+    def flush(self):
+        with self.lock:
+            return {patient_id: self._release(patient_id, len(records))
+                    for patient_id, records in list(self.pending.items()) if len(records)}
+
+    def pending_count(self):
+        with self.lock:
+            return sum(len(records) for records in self.pending.values())
+
+    def summary(self):
+        with self.lock:
+            summary = dict(self.stats)
+        summary['pending'] = self.pending_count()
+        return summary
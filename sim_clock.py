@@ -0,0 +1,44 @@
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+
+class SimClock:
+    # Jam simulasi bersama untuk generator: waktu simulasi = start + waktu nyata x speed.
+    # speed=1 dan start=None sama dengan jam dinding biasa; speed=0 berarti secepat mungkin
+    # (menunggu tidak tidur, waktu simulasi langsung melompat ke target).
+
+    def __init__(self, start=None, speed=1.0):
+        self.start = start or datetime.now()
+        self.speed = speed
+        self.started = time.monotonic()
+        self.offset = 0.0  # detik simulasi hasil lompatan pada speed=0
+
+    def elapsed(self):
+        # Detik simulasi sejak start
+        return (time.monotonic() - self.started) * self.speed + self.offset
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed())
+
+    def now_ms(self):
+        return int(np.datetime64(self.now(), 'ms').astype('<i8'))
+
+    def sleep_until(self, elapsed):
+        # Tunggu sampai waktu simulasi mencapai elapsed (detik sejak start); hasil: keterlambatan
+        # dalam detik simulasi (positif jika target sudah terlewat, mis. tick lebih lambat dari jadwal)
+        remaining = elapsed - self.elapsed()
+        if remaining <= 0:
+            return -remaining
+        if self.speed:
+            time.sleep(remaining / self.speed)
+        else:
+            self.offset += remaining
+        return 0.0
+
+    def sleep(self, seconds):
+        return self.sleep_until(self.elapsed() + seconds)
+
+    def __repr__(self):
+        speed = f'{self.speed:g}x' if self.speed else 'secepat mungkin'
+        return f'SimClock(start={self.start:%Y-%m-%d %H:%M:%S}, speed={speed})'
@@ -0,0 +1,93 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from data_generator import generate_vital_signs_batch
+from vital_store import VitalStore, VITAL_PARAMETERS
+from validation import FLATLINE_SAMPLES
+from alert_rules import MAX_WINDOW
+from alert_daemon import AlertDaemon, AlertLog
+
+PATIENT_ID = 'P1'
+
+
+def samples(start, n, critical=False):
+    # n sampel satu pasien dengan interval 1 detik, urut dari lama ke baru
+    return np.concatenate([generate_vital_signs_batch(np.array([critical]), start + timedelta(seconds=i))
+                           for i in range(n)])
+
+
+def frozen(last, n):
+    # Sensor beku: nilai sampel terakhir berulang dengan timestamp yang terus maju
+    rows = np.repeat(last[np.newaxis], n)
+    rows['timestamp'] = last['timestamp'] + 1000 * np.arange(1, n + 1)
+    return rows
+
+
+@pytest.fixture
+def writer(tmp_path):
+    np.random.seed(0)
+    return VitalStore(str(tmp_path / 'vitals'), archive_root=None, rollups=False)
+
+
+@pytest.fixture
+def daemon(tmp_path, writer):
+    store = VitalStore(writer.root, readonly=True, archive_root=None)
+    daemon = AlertDaemon(store=store, log=AlertLog(str(tmp_path / 'alerts.jsonl')))
+    yield daemon
+    daemon.log.close()
+
+
+def source(daemon):
+    return daemon.sources[f'{PATIENT_ID}.vring']
+
+
+def test_window_has_history_for_flatline_detection(writer, daemon):
+    history = samples(datetime(2026, 1, 1, 8), 30)
+    # Sampel terakhir riwayat ditambah FLATLINE_SAMPLES - 1 ulangan = tepat satu deretan beku
+    writer.append(PATIENT_ID, np.concatenate([history, frozen(history[-1], FLATLINE_SAMPLES - 1)]))
+    writer.flush()
+    daemon.discover()
+
+    window, timestamps = daemon._validated_window(source(daemon), 1)
+    assert window.shape == (1, MAX_WINDOW, len(VITAL_PARAMETERS))
+    assert timestamps.shape == (1, MAX_WINDOW)
+    # Deretan terdeteksi pada sampel terbaru walaupun dimulai jauh sebelum MAX_WINDOW sampel terakhir
+    quarantined = np.isnan(window[0]).all(axis=-1)
+    assert quarantined.tolist() == [True] + [False] * (MAX_WINDOW - 1)
+
+    writer.append(PATIENT_ID, frozen(writer.ring(PATIENT_ID).latest(1)[0], 2))
+    writer.flush()
+    window, _ = daemon._validated_window(source(daemon), 2)
+    assert np.isnan(window[0]).all(axis=-1).tolist() == [True] * 3 + [False] * (MAX_WINDOW - 2)
+
+
+def test_window_returns_new_samples_and_rule_history(writer, daemon):
+    writer.append(PATIENT_ID, samples(datetime(2026, 1, 1, 8), 40))
+    writer.flush()
+    daemon.discover()
+
+    window, timestamps = daemon._validated_window(source(daemon), 5)
+    assert window.shape[1] == 5 + MAX_WINDOW - 1
+    assert not np.isnan(window).any()
+    assert np.all(np.diff(timestamps[0]) < 0)  # sampel terbaru di indeks 0
+
+
+@pytest.mark.parametrize('offset, realtime', [(timedelta(0), True), (timedelta(days=-1), False)])
+def test_latency_is_measured_only_for_realtime_clock(writer, daemon, offset, realtime):
+    start = datetime.now() + offset - timedelta(seconds=40)
+    writer.append(PATIENT_ID, samples(start, 30))
+    writer.flush()
+    daemon.discover()
+    writer.append(PATIENT_ID, samples(start + timedelta(seconds=30), 10, critical=True))
+    writer.flush()
+
+    events = daemon.poll()
+    assert events
+    assert all(event['poll_lag_ms'] >= 0 for event in events)
+    if realtime:
+        assert all(event['latency_ms'] >= 0 for event in events)
+    else:
+        assert all(event['latency_ms'] is None for event in events)
+        assert not daemon.latencies
+    assert os.path.getsize(daemon.log.path) > 0
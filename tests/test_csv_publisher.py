@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from csv_publisher import CsvPublisher, RetentionPolicy
+
+START = datetime(2020, 1, 1, 12)
+
+
+def test_overwritten_file_is_retired_first(tmp_path):
+    retired = []
+    publisher = CsvPublisher(str(tmp_path), 'vital_signs', RetentionPolicy(max_files=None),
+                             on_retire=lambda path: retired.append(pd.read_csv(path)['x'].tolist()))
+    publisher.publish(pd.DataFrame({'x': [1]}), START)
+    publisher.publish(pd.DataFrame({'x': [2]}), START)  # nama file sama (detik yang sama)
+    assert retired == [[1]]
+    assert len(publisher.files) == 1
+    assert publisher.total_bytes == publisher.files[0].size
+
+
+def test_adopted_files_are_aged_by_publish_stamp(tmp_path):
+    # Waktu simulasi jauh dari jam dinding: umur file adopsi tetap dihitung dalam waktu simulasi
+    policy = RetentionPolicy(max_files=None, max_age=60)
+    publisher = CsvPublisher(str(tmp_path), 'vital_signs', policy)
+    publisher.publish(pd.DataFrame({'x': [1]}), START)
+    publisher.publish(pd.DataFrame({'x': [2]}), START + timedelta(seconds=30))
+
+    restarted = CsvPublisher(str(tmp_path), 'vital_signs', policy)
+    assert [entry.published_at for entry in restarted.files] == [START, START + timedelta(seconds=30)]
+    restarted.publish(pd.DataFrame({'x': [3]}), START + timedelta(seconds=75))
+    assert [entry.published_at for entry in restarted.files] == [START + timedelta(seconds=30),
+                                                                 START + timedelta(seconds=75)]
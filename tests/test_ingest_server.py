@@ -0,0 +1,20 @@
+import json
+import pytest
+from ingest_server import parse_payload
+
+READING = {'patient_id': 'P1', 'heart_rate': 80}
+
+
+@pytest.mark.parametrize('body', [
+    json.dumps(READING, indent=2),
+    json.dumps([READING, READING], indent=2),
+    json.dumps(READING) + '\n' + json.dumps(READING),
+])
+def test_websocket_message_formats(body):
+    readings = parse_payload(body)
+    assert readings and all(reading == READING for reading in readings)
+
+
+def test_invalid_json_reports_json_error():
+    with pytest.raises(json.JSONDecodeError):
+        parse_payload('{"patient_id":\n "P1",,}')
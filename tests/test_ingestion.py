@@ -0,0 +1,34 @@
+import numpy as np
+from vital_store import VitalStore, VITAL_DTYPE, now_epoch_ms
+from ingestion import IngestionService
+
+
+def test_failed_ring_read_is_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = np.zeros(10, dtype=VITAL_DTYPE)
+    rows['timestamp'] = now_epoch_ms() - 10000 + 1000 * np.arange(10)
+    rows['heart_rate'] = 80
+    writer = VitalStore('vitals', archive_root=None, rollups=False)
+    writer.append('P1', rows)
+    writer.flush()
+
+    service = IngestionService(store=VitalStore('vitals', readonly=True, archive_root=None))
+    latest_frame = service.store.latest_frame
+    calls = []
+
+    def flaky_latest_frame(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError('ring sedang ditulis ulang')
+        return latest_frame(*args)
+
+    monkeypatch.setattr(service.store, 'latest_frame', flaky_latest_frame)
+    service.watched.add('P1')
+    try:
+        service.refresh()
+    except OSError:
+        pass
+    assert 'P1' not in service.ring_counts
+    snapshot = service.refresh()
+    assert len(snapshot.vitals['P1']) == 10
+    assert service.ring_counts['P1'] == ('ring', 10)
@@ -0,0 +1,75 @@
+from datetime import datetime
+import pytest
+from adt_store import to_ms
+from therapy_schedule import DoseIndex, parse_frequency, UNPARSED, MINUTE_MS, HOUR_MS
+
+# Teks frekuensi -> (interval menit, dosis tunggal, jika perlu)
+FREQUENCY_CASES = {
+    'q6h': (360, False, False),
+    'q1,5h': (90, False, False),
+    'tiap 1.5 jam': (90, False, False),
+    'setiap 8 jam': (480, False, False),
+    '3x1': (480, False, False),
+    '1x500mg': (1440, False, False),
+    '2x seminggu': (5040, False, False),
+    'b.i.d.': (720, False, False),
+    'q.6.h.': (360, False, False),
+    'TID': (480, False, False),
+    'prn': (None, False, True),
+    'k/p': (None, False, True),
+    'stat': (None, True, False),
+}
+
+START = to_ms(datetime(2026, 1, 1, 8))
+
+
+def dues(doses):
+    # Jatuh tempo dalam menit sejak START
+    return [(dose.due - START) // MINUTE_MS for dose in doses]
+
+
+@pytest.mark.parametrize('text, expected', FREQUENCY_CASES.items())
+def test_parse_frequency(text, expected):
+    schedule = parse_frequency(text)
+    assert (schedule.interval_minutes, schedule.once, schedule.as_needed) == expected
+
+
+def test_unknown_frequency_is_unparsed():
+    assert parse_frequency('tiap dua jam') == UNPARSED
+
+
+@pytest.fixture
+def index():
+    index = DoseIndex()
+    now = START - 10 * MINUTE_MS
+    index.add_order(1, 'P1', 'Obat A', '500 mg', 'IV', 'q6h', START, now=now)
+    index.add_order(2, 'P2', 'Obat B', '1 tab', 'Oral', 'stat', START, now=now)
+    index.add_order(3, 'P2', 'Obat C', '1 tab', 'Oral', 'prn', START, now=now)
+    return index
+
+
+def test_due_soon_and_overdue(index):
+    assert dues(index.due_soon(START - 10 * MINUTE_MS)) == [0, 0]
+    assert dues(index.due_soon(START - 10 * MINUTE_MS, patient_id='P1')) == [0]
+    now = START + 5 * HOUR_MS + 40 * MINUTE_MS
+    assert dues(index.due_soon(now)) == [360]
+    assert dues(index.overdue(now)) == [0, 0]
+
+
+def test_overdue_rollover_counts_missed_doses(index):
+    index.mark_given(1, START)
+    index.mark_given(2, START)
+    assert dues(index.overdue(START + 6 * HOUR_MS + 10 * MINUTE_MS)) == [360]
+    # Dosis 6 jam keluar dari jendela terlambat 12 jam tanpa diberikan
+    assert dues(index.overdue(START + 18 * HOUR_MS + 30 * MINUTE_MS)) == [720, 1080]
+    assert index.missed == 1
+    # Jadwal diperpanjang melewati horizon 24 jam awal
+    assert dues(index.due_soon(START + 30 * HOUR_MS - 10 * MINUTE_MS)) == [1800]
+
+
+def test_load_old_order_keeps_only_overdue_window():
+    index = DoseIndex()
+    index.load([(1, 'P1', 'Obat A', '500 mg', 'IV', 'q6h', START)], given=[(1, START + 36 * HOUR_MS)],
+               now=START + 47 * HOUR_MS)
+    assert dues(index.overdue(START + 47 * HOUR_MS)) == [2520]
+    assert dues(index.due_soon(START + 47 * HOUR_MS + 40 * MINUTE_MS)) == [2880]
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from data_generator import generate_vital_signs_batch
+from vital_store import records_to_values
+from validation import validate_block, quarantine_mask, QUALITY_FLAGS, FLATLINE_SAMPLES
+
+N_PATIENTS = 200
+WINDOW = 120
+
+
+def simulated_block(interval_seconds, critical_from=None, seed=0):
+    # Blok (pasien, window, parameter) dari generator multi-pasien, sampel terbaru di indeks 0.
+    # critical_from: tick mulai episode kritis (onset mendadak seperti generator)
+    np.random.seed(seed)
+    start = datetime(2026, 1, 1, 8)
+    ticks = []
+    for tick in range(WINDOW):
+        critical = np.full(N_PATIENTS, critical_from is not None and tick >= critical_from)
+        ticks.append(generate_vital_signs_batch(critical, start + timedelta(seconds=tick * interval_seconds)))
+    records = np.stack(ticks[::-1], axis=1)
+    values = np.stack([records_to_values(row) for row in records])
+    return values, records['timestamp']
+
+
+@pytest.mark.parametrize('interval_seconds', [5, 1, 0.2])
+def test_clean_simulated_data_is_not_quarantined(interval_seconds):
+    values, timestamps = simulated_block(interval_seconds)
+    assert quarantine_mask(validate_block(values, timestamps)).sum() == 0
+
+
+@pytest.mark.parametrize('interval_seconds', [5, 1])
+def test_critical_onset_is_not_quarantined(interval_seconds):
+    values, timestamps = simulated_block(interval_seconds, critical_from=WINDOW // 2)
+    assert quarantine_mask(validate_block(values, timestamps)).sum() == 0
+
+
+def test_single_sample_spike_is_flagged_as_rate():
+    values, timestamps = simulated_block(1)
+    values[:, 10, 0] = 180  # HR melompat lalu kembali: artefak, masih dalam rentang fisiologis
+    values[:, 20, 3] = 65  # SpO2 turun 30% dalam satu sampel
+    flags = validate_block(values, timestamps)
+    assert np.all(flags[:, 10, 0] & QUALITY_FLAGS['rate'])
+    assert np.all(flags[:, 20, 3] & QUALITY_FLAGS['rate'])
+
+
+def test_out_of_range_glitch_does_not_quarantine_next_sample():
+    values, timestamps = simulated_block(1)
+    values[:, 5, 3] = 0  # SpO2 = 0 karena sensor lepas
+    flags = validate_block(values, timestamps)
+    assert np.all(flags[:, 5, 3] & QUALITY_FLAGS['range'])
+    assert not quarantine_mask(flags)[:, 4].any()
+
+
+def test_flatline_needs_full_run_of_identical_samples():
+    values, timestamps = simulated_block(1)
+    values[0, :FLATLINE_SAMPLES] = values[0, 0]
+    values[1, :FLATLINE_SAMPLES - 1] = values[1, 0]
+    flags = validate_block(values, timestamps)
+    frozen = (flags & QUALITY_FLAGS['flatline']).any(axis=-1)
+    assert frozen[0, 0]
+    assert not frozen[1].any()
+
+
+@pytest.mark.parametrize('gap_seconds, flagged', [(1, True), (600, False)])
+def test_rate_limit_scales_with_gap_between_samples(gap_seconds, flagged):
+    # Suhu turun 7 derajat: artefak antar sampel 1 detik, masih wajar setelah sensor lepas 10 menit
+    values, timestamps = simulated_block(1)
+    timestamps[:, 30:] -= (gap_seconds - 1) * 1000
+    values[:, 30:, 4] -= 7
+    flags = validate_block(values, timestamps)
+    rate = (flags[:, 29, 4] & QUALITY_FLAGS['rate']) > 0
+    assert rate.all() if flagged else not rate.any()
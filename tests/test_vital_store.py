@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from vital_store import VitalStore, VITAL_DTYPE
+from vital_archive import PARTITION_MS
+
+
+def records(n, start, interval_ms=100):
+    rows = np.zeros(n, dtype=VITAL_DTYPE)
+    rows['timestamp'] = start + interval_ms * np.arange(n)
+    rows['heart_rate'] = np.arange(n) % 200
+    return rows
+
+
+@pytest.mark.parametrize('chunk', [1, 7, 250])
+def test_ring_wrapping_within_an_hour_is_archived(tmp_path, chunk):
+    # Ring 100 sampel pada 10 Hz berputar setiap 10 detik, jauh sebelum partisi jam lengkap
+    store = VitalStore(str(tmp_path / 'vitals'), capacity=100, rollups=False,
+                       archive_root=str(tmp_path / 'archive'))
+    rows = records(500, 10 * PARTITION_MS - 20000)
+    for i in range(0, len(rows), chunk):
+        store.append('P1', rows[i:i + chunk])
+
+    archived = store.archive.query('P1', 0, rows['timestamp'][-1])['timestamp']
+    in_ring = store.ring('P1').latest(100)['timestamp'][::-1]
+    assert len(np.unique(archived)) == len(archived)
+    assert np.array_equal(np.concatenate([archived, in_ring]), rows['timestamp'])
@@ -0,0 +1,178 @@
+import re
+import heapq
+import threading
+from collections import namedtuple
+from datetime import datetime
+import pandas as pd
+from adt_store import to_ms
+from vital_store import from_epoch_ms
+
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+# Indeks dosis: roda waktu dengan bucket 5 menit. Dosis dijadwalkan sampai 24 jam ke depan dan
+# dosis yang belum diberikan tetap tercatat terlambat selama 12 jam sebelum dibuang
+BUCKET_MS = 5 * MINUTE_MS
+SCHEDULE_HORIZON_MS = DAY_MS
+OVERDUE_WINDOW_MS = 12 * HOUR_MS
+DUE_SOON_MINUTES = 30
+
+# Jadwal hasil parsing frekuensi: interval antar dosis (menit), atau dosis tunggal / jika perlu
+DoseSchedule = namedtuple('DoseSchedule', ['interval_minutes', 'once', 'as_needed', 'label'])
+Dose = namedtuple('Dose', ['due', 'order_id', 'patient_id', 'medicine', 'dosage', 'route'])  # due epoch ms
+
+AS_NEEDED = DoseSchedule(None, False, True, 'jika perlu')
+UNPARSED = DoseSchedule(None, False, True, 'tidak dikenali')
+# Singkatan Latin: kali per hari
+LATIN_PER_DAY = {'qd': 1, 'od': 1, 'bid': 2, 'tid': 3, 'qid': 4}
+AS_NEEDED_WORDS = ('prn', 'jika perlu', 'bila perlu', 'k/p', 'kp')
+ONCE_WORDS = ('stat', 'sekali', 'dosis tunggal', 'once')
+EVERY_HOURS = re.compile(r'^(?:q|tiap|setiap)\s*(\d+(?:[.,]\d+)?)\s*(?:h|j|jam)\b')
+TIMES_PER_PERIOD = re.compile(r'^(\d+)\s*x(.*)$')
+LATIN_DOTS = re.compile(r'(?<!\d)\.|\.(?!\d)')
+
+
+def parse_frequency(text):
+    # Frekuensi bebas dari form, mis. "q6h", "tiap 8 jam", "3x1", "2x sehari", "bid", "prn", "stat"
+    # Titik singkatan (b.i.d., q.6.h.) dibuang, titik desimal ("tiap 1.5 jam") dipertahankan
+    value = ' '.join(LATIN_DOTS.sub('', str(text or '').lower()).split())
+    if not value or value in AS_NEEDED_WORDS:
+        return AS_NEEDED if value else UNPARSED
+    if value in ONCE_WORDS:
+        return DoseSchedule(None, True, False, 'dosis tunggal')
+    if value in LATIN_PER_DAY:
+        per_day = LATIN_PER_DAY[value]
+        return DoseSchedule(24 * 60 // per_day, False, False, f'{per_day}x sehari')
+    match = EVERY_HOURS.match(value)
+    if match:
+        hours = float(match.group(1).replace(',', '.'))
+        if hours > 0:
+            return DoseSchedule(int(round(hours * 60)), False, False, f'tiap {hours:g} jam')
+    match = TIMES_PER_PERIOD.match(value)
+    if match and int(match.group(1)) > 0:
+        # "3x1", "2x sehari", "1x500mg" = kali per hari; "2x seminggu" = kali per minggu
+        times = int(match.group(1))
+        weekly = 'minggu' in match.group(2)
+        return DoseSchedule((7 if weekly else 1) * 24 * 60 // times, False, False,
+                            f"{times}x {'seminggu' if weekly else 'sehari'}")
+    return UNPARSED
+
+
+class DoseIndex:
+    # Indeks dosis semua pasien dalam roda waktu: bucket (waktu // BUCKET_MS) -> {(order, due): Dose}.
+    # "Dosis dalam 30 menit ke depan" hanya membaca 7 bucket, tidak bergantung jumlah order.
+    # Dosis dijadwalkan bertahap: heap (dosis berikutnya, order) memperpanjang jadwal saat waktu berjalan
+
+    def __init__(self, horizon_ms=SCHEDULE_HORIZON_MS, overdue_ms=OVERDUE_WINDOW_MS):
+        self.horizon_ms = horizon_ms
+        self.overdue_ms = overdue_ms
+        self.buckets = {}
+        self.orders = {}  # order_id -> (Dose template, DoseSchedule)
+        self.pending = []  # heap (due berikutnya, order_id) untuk order berulang
+        self.given = set()  # (order_id, due) yang sudah diberikan
+        self.scheduled_until = None
+        self.oldest_bucket = None
+        self.missed = 0  # dosis yang keluar dari jendela terlambat tanpa diberikan
+        self.version = 0
+        self.lock = threading.RLock()
+
+    def _add(self, dose):
+        if (dose.order_id, dose.due) in self.given:
+            return
+        if self.oldest_bucket is not None and dose.due // BUCKET_MS < self.oldest_bucket:
+            return
+        self.buckets.setdefault(dose.due // BUCKET_MS, {})[(dose.order_id, dose.due)] = dose
+
+    def _add_order(self, order_id, patient_id, medicine, dosage, route, frequency, start):
+        schedule = parse_frequency(frequency)
+        template = Dose(to_ms(start), order_id, patient_id, medicine, dosage, route)
+        self.orders[order_id] = (template, schedule)
+        if not schedule.as_needed:
+            self._add(template)
+            if schedule.interval_minutes:
+                heapq.heappush(self.pending, (template.due + schedule.interval_minutes * MINUTE_MS, order_id))
+        return schedule
+
+    def add_order(self, order_id, patient_id, medicine, dosage, route, frequency, start, now=None):
+        # Order terapi baru: dosis pertama pada waktu order, berikutnya sesuai interval frekuensi
+        with self.lock:
+            schedule = self._add_order(order_id, patient_id, medicine, dosage, route, frequency, start)
+            self.version += 1
+            self.advance(now)
+        return schedule
+
+    def load(self, orders, given=(), now=None):
+        # Muat banyak order (tuple argumen add_order tanpa now) dan dosis yang sudah diberikan sekaligus
+        with self.lock:
+            self.given.update((order_id, due) for order_id, due in given)
+            for order in orders:
+                self._add_order(*order)
+            self.version += 1
+            self.advance(now)
+
+    def advance(self, now=None):
+        # Jadwalkan dosis berulang sampai now + horizon dan buang bucket yang lebih tua dari jendela terlambat
+        now = to_ms(now or datetime.now())
+        until = now + self.horizon_ms
+        with self.lock:
+            while self.pending and self.pending[0][0] <= until:
+                due, order_id = heapq.heappop(self.pending)
+                template, schedule = self.orders[order_id]
+                interval = schedule.interval_minutes * MINUTE_MS
+                if due < now - self.overdue_ms:
+                    # Order lama: lompat ke dosis pertama yang masih di jendela terlambat
+                    due += -(-(now - self.overdue_ms - due) // interval) * interval
+                self._add(template._replace(due=due))
+                heapq.heappush(self.pending, (due + interval, order_id))
+            oldest = (now - self.overdue_ms) // BUCKET_MS
+            if self.oldest_bucket is None:
+                for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+                    del self.buckets[bucket]
+            elif oldest > self.oldest_bucket:
+                for bucket in range(self.oldest_bucket, oldest):
+                    expired = self.buckets.pop(bucket, None)
+                    if expired:
+                        self.missed += len(expired)
+            self.oldest_bucket = max(oldest, self.oldest_bucket or oldest)
+            self.scheduled_until = until
+
+    def mark_given(self, order_id, due):
+        with self.lock:
+            self.given.add((order_id, due))
+            bucket = self.buckets.get(due // BUCKET_MS)
+            if bucket is not None:
+                bucket.pop((order_id, due), None)
+            self.version += 1
+
+    def between(self, t1, t2, patient_id=None):
+        # Dosis yang belum diberikan dengan waktu di [t1, t2), urut waktu
+        t1, t2 = to_ms(t1), to_ms(t2)
+        with self.lock:
+            doses = [dose for bucket in range(t1 // BUCKET_MS, (t2 - 1) // BUCKET_MS + 1)
+                     for dose in self.buckets.get(bucket, {}).values()
+                     if t1 <= dose.due < t2 and (patient_id is None or dose.patient_id == patient_id)]
+        return sorted(doses)
+
+    def due_soon(self, now=None, minutes=DUE_SOON_MINUTES, patient_id=None):
+        now = to_ms(now or datetime.now())
+        self.advance(now)
+        return self.between(now, now + minutes * MINUTE_MS, patient_id)
+
+    def overdue(self, now=None, patient_id=None):
+        now = to_ms(now or datetime.now())
+        self.advance(now)
+        return self.between(now - self.overdue_ms, now, patient_id)
+
+    def schedule(self, order_id):
+        with self.lock:
+            entry = self.orders.get(order_id)
+        return None if entry is None else entry[1]
+
+    def frame(self, doses, now=None):
+        # DataFrame dosis untuk tabel/timeline dashboard
+        now = to_ms(now or datetime.now())
+        df = pd.DataFrame(doses, columns=Dose._fields)
+        df['waktu'] = from_epoch_ms(df['due'].to_numpy(dtype='<i8'))
+        df['status'] = ['terlambat' if due < now else 'terjadwal' for due in df['due']]
+        return df
+
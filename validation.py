@@ -0,0 +1,186 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from vital_store import VITAL_PARAMETERS, to_epoch_ms
+from instrumentation import METRICS
+
+# Tabel aturan kualitas data: satu baris per parameter (urutan sesuai VITAL_PARAMETERS)
+# low/high = rentang fisiologis yang masih masuk akal untuk sensor,
+# max_step = lonjakan antar dua sampel berurutan yang masih mungkin (noise sensor + onset akut, mis. demam),
+# max_rate = perubahan fisiologis per detik yang ditambahkan sesuai jarak waktu antar sampel
+QUALITY_RULES = pd.DataFrame([
+    {'parameter': 'heart_rate', 'low': 20, 'high': 250, 'max_step': 50, 'max_rate': 1.0},
+    {'parameter': 'blood_pressure_systolic', 'low': 40, 'high': 260, 'max_step': 80, 'max_rate': 1.5},
+    {'parameter': 'blood_pressure_diastolic', 'low': 20, 'high': 180, 'max_step': 70, 'max_rate': 1.0},
+    {'parameter': 'oxygen_saturation', 'low': 50, 'high': 100, 'max_step': 20, 'max_rate': 0.5},
+    {'parameter': 'temperature', 'low': 25, 'high': 45, 'max_step': 4.5, 'max_rate': 0.01},
+])
+LOWS = QUALITY_RULES['low'].to_numpy(dtype=float)
+HIGHS = QUALITY_RULES['high'].to_numpy(dtype=float)
+MAX_STEPS = QUALITY_RULES['max_step'].to_numpy(dtype=float)
+MAX_RATES = QUALITY_RULES['max_rate'].to_numpy(dtype=float)
+# Batas lonjakan juga mengikuti sebaran langkah antar sampel per pasien dalam jendela: median +
+# STEP_MAD_FACTOR x MAD (diskalakan ke simpangan baku). Sensor yang memang berisik pada laju sampel
+# berapa pun tidak dikarantina, sedangkan lonjakan tunggal (artefak) tetap jauh di luar sebaran
+STEP_MAD_FACTOR = 6.0
+MAD_SCALE = 1.4826
+MIN_MAD_STEPS = 5  # jumlah langkah valid minimal sebelum batas robust dipakai
+
+# Sensor beku: seluruh parameter tidak berubah selama sekian sampel berturut-turut
+FLATLINE_SAMPLES = 12
+
+# Bit flag kualitas per nilai; kolom quality pada DataFrame berisi gabungan flag per baris
+QUALITY_FLAGS = {
+    'missing': 1,
+    'type': 2,
+    'range': 4,
+    'rate': 8,
+    'flatline': 16,
+}
+FLAG_LABELS = {
+    'missing': 'kosong',
+    'type': 'bukan angka',
+    'range': 'di luar rentang fisiologis',
+    'rate': 'perubahan terlalu cepat',
+    'flatline': 'nilai tidak berubah (sensor beku)',
+}
+
+
+def window_median(values, counts):
+    # Median per (pasien, parameter) sepanjang sumbu sampel dengan NaN diabaikan; counts = jumlah nilai
+    # non-NaN. Lebih cepat dari np.nanmedian karena NaN selalu terurut di akhir oleh np.sort
+    ordered = np.sort(values, axis=1)
+    low = np.maximum(counts - 1, 0) // 2
+    high = counts // 2
+    median = (np.take_along_axis(ordered, low, axis=1) + np.take_along_axis(ordered, high, axis=1)) / 2
+    return np.where(counts > 0, median, np.nan)
+
+
+def validate_block(values, timestamps):
+    # values: (pasien, window, parameter), timestamps: (pasien, window) epoch ms, window[0] = terbaru.
+    # Hasil flag (pasien, window, parameter); 0 = lolos semua pemeriksaan
+    values = np.asarray(values, dtype=float)
+    flags = np.zeros(values.shape, dtype=np.uint8)
+    missing = np.isnan(values)
+    flags[missing] |= QUALITY_FLAGS['missing']
+
+    with np.errstate(invalid='ignore'):
+        out_of_range = (values < LOWS) | (values > HIGHS)
+    flags[out_of_range] |= QUALITY_FLAGS['range']
+
+    if values.shape[1] > 1:
+        # Perubahan terhadap sampel sebelumnya (baris berikutnya); hanya antar nilai yang valid
+        # sehingga sampel pertama setelah glitch tidak ikut dikarantina
+        valid = ~missing & ~out_of_range
+        seconds = np.diff(-np.asarray(timestamps, dtype=float), axis=1) / 1000
+        seconds = np.maximum(seconds, 0)[:, :, np.newaxis]
+        steps_valid = valid[:, :-1] & valid[:, 1:]
+        steps = np.where(steps_valid, values[:, :-1] - values[:, 1:], np.nan)
+        n_steps = steps_valid.sum(axis=1, keepdims=True)
+        center = window_median(steps, n_steps)
+        spread = MAD_SCALE * window_median(np.abs(steps - center), n_steps)
+        enough = n_steps >= MIN_MAD_STEPS
+        robust = np.where(enough, np.abs(center) + STEP_MAD_FACTOR * spread, 0)
+        limit = np.maximum(MAX_STEPS, robust) + MAX_RATES * seconds
+        with np.errstate(invalid='ignore'):
+            too_fast = np.abs(steps) > limit
+        flags[:, :-1][too_fast] |= QUALITY_FLAGS['rate']
+
+        # Panjang deretan sampel identik, dihitung dari yang terlama ke terbaru
+        unchanged = np.all(values[:, :-1] == values[:, 1:], axis=-1)[:, ::-1]
+        index = np.arange(1, values.shape[1])
+        run_start = np.maximum.accumulate(np.where(unchanged, 0, index), axis=1)
+        run_length = index - run_start + 1
+        frozen = np.zeros(values.shape[:2], dtype=bool)
+        frozen[:, :-1] = (unchanged & (run_length >= FLATLINE_SAMPLES))[:, ::-1]
+        flags[frozen] |= QUALITY_FLAGS['flatline']
+
+    METRICS.increment('validated_rows', values.shape[0] * values.shape[1])
+    METRICS.increment('quarantined_rows', int(flags.any(axis=-1).sum()))
+    return flags
+
+
+def quarantine_mask(flags):
+    # True untuk baris (pasien, sampel) yang tidak boleh masuk jalur alert/prediksi
+    return flags.any(axis=-1)
+
+
+def mask_quarantined(values, flags):
+    # Salinan values dengan baris yang dikarantina diganti NaN (diabaikan oleh aturan alert)
+    values = np.array(values, dtype=float)
+    values[quarantine_mask(flags)] = np.nan
+    return values
+
+
+def describe_flags(row_flags, row_values, parameters=VITAL_PARAMETERS):
+    # Alasan karantina satu baris, mis. "oxygen_saturation: di luar rentang fisiologis (0)"
+    flatline = QUALITY_FLAGS['flatline']
+    reasons = [f"semua parameter: {FLAG_LABELS['flatline']}"] if np.all(row_flags & flatline) else []
+    for i in np.flatnonzero(row_flags & ~np.uint8(flatline)):
+        names = [FLAG_LABELS[name] for name, bit in QUALITY_FLAGS.items() if row_flags[i] & bit and bit != flatline]
+        reasons.append(f"{parameters[i]}: {', '.join(names)} ({row_values[i]:g})")
+    return '; '.join(reasons)
+
+
+def validate_frame(df):
+    # Validasi DataFrame satu pasien (terbaru di baris 0). Tanda vital dipaksa numerik (suhu float),
+    # kolom quality berisi gabungan flag per baris dan quarantine berisi alasan ('' = bersih)
+    start = time.perf_counter()
+    flags_type = np.zeros((len(df), len(VITAL_PARAMETERS)), dtype=np.uint8)
+    columns = {}
+    for i, param in enumerate(VITAL_PARAMETERS):
+        column = df[param]
+        if not pd.api.types.is_numeric_dtype(column):
+            numeric = pd.to_numeric(column, errors='coerce')
+            flags_type[(numeric.isna() & column.notna()).to_numpy(), i] = QUALITY_FLAGS['type']
+            column = numeric
+        columns[param] = column.to_numpy(dtype=float)
+
+    values = np.column_stack([columns[param] for param in VITAL_PARAMETERS])
+    timestamps = to_epoch_ms(df['timestamp'])
+    flags = validate_block(values[np.newaxis], timestamps[np.newaxis])[0] | flags_type
+
+    quarantine = np.full(len(df), '', dtype=object)
+    for row in np.flatnonzero(flags.any(axis=1)):
+        quarantine[row] = describe_flags(flags[row], values[row])
+    df = df.assign(**columns, quality=np.bitwise_or.reduce(flags, axis=1), quarantine=quarantine)
+    METRICS.observe('validation', time.perf_counter() - start)
+    return df
+
+
+def clean_rows(df):
+    # Hanya baris yang lolos validasi (untuk alert dan prediksi)
+    if 'quarantine' not in df:
+        return df
+    return df[df['quarantine'] == '']
+
+
+def measure_throughput(n_patients=10000, window=60, repeat=5, seed=0):
+    # Throughput validate_block dalam baris (pasien x sampel) per detik pada data sintetis
+    rng = np.random.default_rng(seed)
+    values = rng.normal([75, 120, 80, 97, 37], [5, 10, 8, 1, 0.3], size=(n_patients, window, len(VITAL_PARAMETERS)))
+    values[rng.random(values.shape[:2]) < 0.01, 3] = 0  # glitch SpO2
+    timestamps = np.broadcast_to(np.arange(window)[::-1] * 5000, (n_patients, window))
+    validate_block(values, timestamps)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        flags = validate_block(values, timestamps)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        'rows': n_patients * window,
+        'ms': elapsed * 1000,
+        'rows_per_second': n_patients * window / elapsed,
+        'quarantined': int(quarantine_mask(flags).sum()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ukur throughput validasi kualitas data tanda vital")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--window", type=int, default=60, help="Jumlah sampel per pasien")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    result = measure_throughput(args.patients, args.window, args.repeat)
+    print(f"{result['rows']:,} baris dalam {result['ms']:.1f} ms "
+          f"({result['rows_per_second']:,.0f} baris/detik, {result['quarantined']:,} dikarantina)")
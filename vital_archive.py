@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import threading
+import numpy as np
+
+DEFAULT_ARCHIVE_DIR = 'data/archive'
+PARTITION_MS = 60 * 60 * 1000  # satu partisi per jam
+INDEX_FILE = 'index.jsonl'
+
+
+class VitalArchive:
+    # Arsip tanda vital terkompresi yang dipartisi per jam: satu file .npz per segmen dengan satu
+    # anggota per kolom, sehingga query hanya membuka partisi dan kolom yang diperlukan.
+    # Indeks jarang (rentang timestamp per segmen) disimpan di index.jsonl per pasien.
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+        self.indexes = {}  # patient_id -> (ukuran index.jsonl, starts, ends, files)
+        self.buffers = {}  # patient_id -> record yang menunggu partisinya lengkap
+        self.lock = threading.Lock()
+
+    def patient_dir(self, patient_id):
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(patient_id))
+        return os.path.join(self.root, safe_id)
+
+    def _index(self, patient_id):
+        # Muat ulang indeks hanya jika file indeks bertambah (ditulis proses lain)
+        path = os.path.join(self.patient_dir(patient_id), INDEX_FILE)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        cached = self.indexes.get(patient_id)
+        if cached is not None and cached[0] == size:
+            return cached
+        entries = []
+        if size:
+            with open(path, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.endswith('\n')]
+        index = (size,
+                 np.array([entry['start'] for entry in entries], dtype='<i8'),
+                 np.array([entry['end'] for entry in entries], dtype='<i8'),
+                 [entry['file'] for entry in entries])
+        self.indexes[patient_id] = index
+        return index
+
+    def first_timestamp(self, patient_id):
+        _, starts, _, _ = self._index(patient_id)
+        return int(starts.min()) if len(starts) else None
+
+    def last_timestamp(self, patient_id):
+        _, _, ends, _ = self._index(patient_id)
+        return int(ends.max()) if len(ends) else None
+
+    def write(self, patient_id, records):
+        # Tulis record (urut dari lama ke baru) sebagai segmen baru, dipecah per partisi jam
+        if len(records) == 0:
+            return
+        directory = self.patient_dir(patient_id)
+        partitions = records['timestamp'] // PARTITION_MS
+        boundaries = np.flatnonzero(np.diff(partitions)) + 1
+        lines = []
+        with self.lock:
+            for segment in np.split(records, boundaries):
+                start, end = int(segment['timestamp'][0]), int(segment['timestamp'][-1])
+                hour = np.datetime64(start, 'ms').astype('datetime64[h]').astype(str)
+                name = f"{hour[:10].replace('-', '')}/{hour[11:13]}_{start}.npz"
+                path = os.path.join(directory, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    np.savez_compressed(f, **{column: segment[column] for column in records.dtype.names})
+                os.replace(tmp_path, path)
+                lines.append(json.dumps({'file': name, 'start': start, 'end': end, 'rows': len(segment)}))
+            # Indeks ditulis setelah file segmen ada sehingga pembaca tidak melihat segmen yang belum lengkap
+            with open(os.path.join(directory, INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in lines))
+
+    def append(self, patient_id, records):
+        # Tampung record kecil (mis. file CSV yang dipensiunkan) dan tulis per partisi yang sudah lengkap
+        buffered = self.buffers.get(patient_id)
+        if buffered is not None:
+            records = np.concatenate([buffered, records])
+        if len(records) == 0:
+            return
+        records = records[np.argsort(records['timestamp'], kind='stable')]
+        current_partition = records['timestamp'][-1] // PARTITION_MS
+        complete = records['timestamp'] // PARTITION_MS < current_partition
+        self.write(patient_id, records[complete])
+        self.buffers[patient_id] = records[~complete]
+
+    def flush(self):
+        for patient_id, records in self.buffers.items():
+            self.write(patient_id, records)
+        self.buffers = {}
+
+    def query(self, patient_id, start_ms, end_ms, columns=None):
+        # Record dalam [start_ms, end_ms] sebagai dict kolom -> array, urut dari lama ke baru.
+        # None jika tidak ada segmen arsip yang beririsan dengan rentang waktu.
+        _, starts, ends, files = self._index(patient_id)
+        selected = np.flatnonzero((starts <= end_ms) & (ends >= start_ms))
+        if len(selected) == 0:
+            return None
+        selected = selected[np.argsort(starts[selected], kind='stable')]
+
+        parts = []
+        for i in selected:
+            with np.load(os.path.join(self.patient_dir(patient_id), files[i])) as segment:
+                timestamps = segment['timestamp']
+                names = segment.files if columns is None else [name for name in columns if name in segment.files]
+                # Segmen yang seluruhnya berada di dalam rentang tidak perlu difilter
+                if starts[i] >= start_ms and ends[i] <= end_ms:
+                    mask = slice(None)
+                else:
+                    mask = (timestamps >= start_ms) & (timestamps <= end_ms)
+                part = {'timestamp': timestamps[mask]}
+                part.update({name: segment[name][mask] for name in names if name != 'timestamp'})
+                parts.append(part)
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
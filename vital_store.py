@@ -0,0 +1,667 @@
+import os
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from vital_archive import VitalArchive, DEFAULT_ARCHIVE_DIR, PARTITION_MS
+
+# Skema tetap untuk penyimpanan tanda vital
+VITAL_PARAMETERS = ["heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic",
+                    "oxygen_saturation", "temperature"]
+
+VITAL_DTYPE = np.dtype([
+    ('timestamp', '<i8'),                 # epoch milidetik (waktu lokal)
+    ('heart_rate', '<i2'),
+    ('blood_pressure_systolic', '<i2'),
+    ('blood_pressure_diastolic', '<i2'),
+    ('oxygen_saturation', 'u1'),
+    ('temperature', '<i2'),               # satuan 0.1 derajat Celsius
+])
+TEMPERATURE_SCALE = 10
+
+# Header file ring buffer (ukuran tetap 64 byte)
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('record_size', '<u4'),
+    ('width', '<u4'),                     # jumlah kolom pasien (1 untuk ring per pasien)
+    ('capacity', '<u8'),
+    ('count', '<u8'),                     # total record yang pernah ditulis
+    ('written_at', '<i8'),                # waktu dinding append terakhir (epoch ms), 0 = belum ada
+])
+RING_MAGIC = b'VTLRING1'
+
+DEFAULT_STORE_DIR = 'data/store'
+DEFAULT_CAPACITY = 17280                  # 24 jam data dengan interval 5 detik
+DEFAULT_BLOCK_CAPACITY = 360              # 30 menit data per pasien untuk mode multi-pasien
+DEFAULT_PATIENT_ID = 'P-2024-001'
+
+# Rollup multi-resolusi: ukuran bucket (ms) dan kapasitas ring per resolusi
+ROLLUP_RESOLUTIONS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+}
+ROLLUP_CAPACITY = {
+    '1m': 7 * 24 * 60,                    # 7 hari
+    '5m': 30 * 24 * 12,                   # 30 hari
+    '1h': 365 * 24,                       # 1 tahun
+}
+ROLLUP_STATS = ['min', 'max', 'mean', 'last']
+# timestamp = awal bucket (epoch ms); nilai dalam satuan asli (suhu dalam derajat Celsius)
+ROLLUP_DTYPE = np.dtype([('timestamp', '<i8'), ('count', '<u4')]
+                        + [(f'{param}_{stat}', '<f4') for param in VITAL_PARAMETERS for stat in ROLLUP_STATS])
+WARD_BLOCK_NAME = 'ward'
+
+
+def to_epoch_ms(timestamps):
+    # Konversi timestamp (string/datetime) ke epoch milidetik tanpa konversi zona waktu
+    values = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ms]')
+    return values.astype('<i8')
+
+
+def now_epoch_ms():
+    return int(np.datetime64(datetime.now(), 'ms').astype('<i8'))
+
+
+def from_epoch_ms(values):
+    return pd.to_datetime(np.asarray(values, dtype='<i8').astype('datetime64[ms]'))
+
+
+def frame_to_records(df):
+    # Konversi DataFrame tanda vital (format CSV lama) ke record biner
+    records = np.empty(len(df), dtype=VITAL_DTYPE)
+    records['timestamp'] = to_epoch_ms(df['timestamp'])
+    for param in VITAL_PARAMETERS:
+        values = df[param].to_numpy(dtype=float)
+        if param == 'temperature':
+            values = values * TEMPERATURE_SCALE
+        records[param] = np.round(values)
+    return records
+
+
+def records_to_values(records, parameters=VITAL_PARAMETERS):
+    # Record biner -> array float (baris, parameter) dengan suhu dalam derajat Celsius
+    values = np.stack([records[param] for param in parameters], axis=-1).astype(float)
+    if 'temperature' in parameters:
+        values[:, list(parameters).index('temperature')] /= TEMPERATURE_SCALE
+    return values
+
+
+def records_to_frame(records):
+    # Konversi record biner ke DataFrame dengan kolom yang sama seperti file CSV
+    data = {'timestamp': from_epoch_ms(records['timestamp'])}
+    for param in VITAL_PARAMETERS:
+        if param == 'temperature':
+            data[param] = records[param] / TEMPERATURE_SCALE
+        else:
+            data[param] = records[param]
+    return pd.DataFrame(data)
+
+
+def aggregate_records(records, resolution_ms):
+    # Agregasi record mentah ke bucket waktu (min, max, mean, count, last), urut dari lama ke baru
+    if len(records) == 0:
+        return np.empty(0, dtype=ROLLUP_DTYPE)
+    records = records[np.argsort(records['timestamp'], kind='stable')]
+    timestamps = records['timestamp']
+    buckets = timestamps - timestamps % resolution_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(records)]
+    values = records_to_values(records)
+    counts = ends - starts
+
+    rollups = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+    rollups['timestamp'] = buckets[starts]
+    rollups['count'] = counts
+    minimum = np.minimum.reduceat(values, starts, axis=0)
+    maximum = np.maximum.reduceat(values, starts, axis=0)
+    mean = np.add.reduceat(values, starts, axis=0) / counts[:, np.newaxis]
+    last = values[ends - 1]
+    for i, param in enumerate(VITAL_PARAMETERS):
+        rollups[f'{param}_min'] = minimum[:, i]
+        rollups[f'{param}_max'] = maximum[:, i]
+        rollups[f'{param}_mean'] = mean[:, i]
+        rollups[f'{param}_last'] = last[:, i]
+    return rollups
+
+
+def merge_rollup(bucket, newer):
+    # Gabungkan dua agregat untuk bucket yang sama (newer berisi data yang lebih baru)
+    merged = newer.copy()
+    total = bucket['count'] + newer['count']
+    merged['count'] = total
+    for param in VITAL_PARAMETERS:
+        merged[f'{param}_min'] = min(bucket[f'{param}_min'], newer[f'{param}_min'])
+        merged[f'{param}_max'] = max(bucket[f'{param}_max'], newer[f'{param}_max'])
+        merged[f'{param}_mean'] = (bucket[f'{param}_mean'] * float(bucket['count'])
+                                   + newer[f'{param}_mean'] * float(newer['count'])) / total
+    return merged
+
+
+def rollups_to_frame(rollups):
+    # Rollup -> DataFrame; kolom parameter berisi mean agar bisa dipakai seperti data mentah
+    data = {'timestamp': from_epoch_ms(rollups['timestamp']), 'count': rollups['count']}
+    for param in VITAL_PARAMETERS:
+        data[param] = rollups[f'{param}_mean']
+        for stat in ('min', 'max', 'last'):
+            data[f'{param}_{stat}'] = rollups[f'{param}_{stat}']
+    return pd.DataFrame(data)
+
+
+def choose_resolution(span_ms, sample_interval_ms, max_points):
+    # Resolusi terkecil yang cukup untuk menampilkan rentang waktu dalam max_points titik.
+    # None berarti data mentah sudah cukup kecil.
+    if span_ms / max(sample_interval_ms, 1) <= max_points:
+        return None
+    for name, resolution_ms in ROLLUP_RESOLUTIONS.items():
+        if span_ms / resolution_ms <= max_points:
+            return name
+    return list(ROLLUP_RESOLUTIONS)[-1]
+
+
+class VitalRing:
+    # Ring buffer append-only berbasis memory-map untuk satu pasien
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, readonly=False, dtype=VITAL_DTYPE):
+        self.path = path
+        self.readonly = readonly
+        self.dtype = dtype
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(path, capacity)
+
+        mode = 'r' if readonly else 'r+'
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, offset=0, shape=(1,))
+        if self.header['magic'][0] != RING_MAGIC or self.header['record_size'][0] != dtype.itemsize:
+            raise ValueError(f"Format ring buffer tidak dikenali: {path}")
+        self.capacity = int(self.header['capacity'][0])
+        self.records = np.memmap(path, dtype=dtype, mode=mode, offset=HEADER_SIZE,
+                                 shape=(self.capacity,))
+
+    def _create(self, path, capacity):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.truncate(HEADER_SIZE + capacity * self.dtype.itemsize)
+        header = np.memmap(tmp_path, dtype=HEADER_DTYPE, mode='r+', offset=0, shape=(1,))
+        header['magic'] = RING_MAGIC
+        header['record_size'] = self.dtype.itemsize
+        header['width'] = 1
+        header['capacity'] = capacity
+        header['count'] = 0
+        header.flush()
+        del header
+        os.replace(tmp_path, path)
+
+    @property
+    def count(self):
+        return int(self.header['count'][0])
+
+    @property
+    def written_at(self):
+        return int(self.header['written_at'][0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=self.dtype)
+        if len(rows) == 0:
+            return
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+
+        # Tulis data dulu, baru majukan counter agar pembaca tidak melihat record setengah jadi
+        count = self.count
+        start = count % self.capacity
+        end = start + len(rows)
+        if end <= self.capacity:
+            self.records[start:end] = rows
+        else:
+            split = self.capacity - start
+            self.records[start:] = rows[:split]
+            self.records[:end - self.capacity] = rows[split:]
+        self.header['written_at'] = now_epoch_ms()
+        self.header['count'] = count + len(rows)
+
+    def latest(self, n):
+        # Ambil n record terbaru (terbaru di indeks 0). Tanpa copy kecuali data melewati batas ring.
+        count = self.count
+        n = min(n, count, self.capacity)
+        if n <= 0:
+            return self.records[:0]
+        end = count % self.capacity or self.capacity
+        if end >= n:
+            return self.records[end - n:end][::-1]
+        head = self.records[:end][::-1]
+        tail = self.records[self.capacity - (n - end):][::-1]
+        return np.concatenate([head, tail])
+
+    def between(self, start_ms, end_ms):
+        # Record dengan timestamp dalam [start_ms, end_ms], urut dari lama ke baru.
+        # Timestamp dalam ring diasumsikan naik sehingga cukup binary search per segmen.
+        count = self.count
+        if count == 0:
+            return self.records[:0]
+        end = count % self.capacity or self.capacity
+        if count <= self.capacity:
+            segments = [self.records[:count]]
+        else:
+            segments = [self.records[end:], self.records[:end]]
+        parts = []
+        for segment in segments:
+            timestamps = segment['timestamp']
+            lo = np.searchsorted(timestamps, start_ms, side='left')
+            hi = np.searchsorted(timestamps, end_ms, side='right')
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        if not parts:
+            return self.records[:0]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def oldest(self):
+        count = self.count
+        if count == 0:
+            return None
+        if count <= self.capacity:
+            return self.records[0]
+        return self.records[count % self.capacity]
+
+    def flush(self):
+        if not self.readonly:
+            self.records.flush()
+            self.header.flush()
+
+
+class VitalBlockRing:
+    # Ring buffer kolumnar untuk banyak pasien: setiap field disimpan sebagai array (tick x pasien)
+    # sehingga satu tick untuk seluruh pasien ditulis sebagai satu blok
+
+    def __init__(self, path, patient_ids=None, capacity=DEFAULT_BLOCK_CAPACITY, readonly=False,
+                 dtype=VITAL_DTYPE):
+        self.path = path
+        self.readonly = readonly
+        self.dtype = dtype
+        ids_path = path + '.ids'
+
+        if not os.path.exists(path):
+            if readonly or patient_ids is None:
+                raise FileNotFoundError(path)
+            self._create(path, ids_path, list(patient_ids), capacity)
+
+        mode = 'r' if readonly else 'r+'
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, offset=0, shape=(1,))
+        if self.header['magic'][0] != RING_MAGIC or self.header['record_size'][0] != dtype.itemsize:
+            raise ValueError(f"Format ring buffer tidak dikenali: {path}")
+        self.capacity = int(self.header['capacity'][0])
+        self.width = int(self.header['width'][0])
+
+        with open(ids_path) as f:
+            self.patient_ids = f.read().splitlines()
+        self.patient_index = {pid: i for i, pid in enumerate(self.patient_ids)}
+
+        # Satu memmap per field, berurutan setelah header
+        self.columns = {}
+        offset = HEADER_SIZE
+        for name in dtype.names:
+            field_dtype = dtype.fields[name][0]
+            self.columns[name] = np.memmap(path, dtype=field_dtype, mode=mode, offset=offset,
+                                           shape=(self.capacity, self.width))
+            offset += self.capacity * self.width * field_dtype.itemsize
+
+    def _create(self, path, ids_path, patient_ids, capacity):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(ids_path, 'w') as f:
+            f.write('\n'.join(patient_ids))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.truncate(HEADER_SIZE + capacity * len(patient_ids) * self.dtype.itemsize)
+        header = np.memmap(tmp_path, dtype=HEADER_DTYPE, mode='r+', offset=0, shape=(1,))
+        header['magic'] = RING_MAGIC
+        header['record_size'] = self.dtype.itemsize
+        header['width'] = len(patient_ids)
+        header['capacity'] = capacity
+        header['count'] = 0
+        header.flush()
+        del header
+        os.replace(tmp_path, path)
+
+    @property
+    def count(self):
+        return int(self.header['count'][0])
+
+    @property
+    def written_at(self):
+        return int(self.header['written_at'][0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append_block(self, records):
+        # records: array terstruktur dengan panjang = jumlah pasien (satu tick)
+        count = self.count
+        row = count % self.capacity
+        for name, column in self.columns.items():
+            column[row] = records[name]
+        self.header['written_at'] = now_epoch_ms()
+        self.header['count'] = count + 1
+
+    def latest(self, n, field):
+        # n tick terbaru untuk satu field, bentuk (n, pasien), tick terbaru di baris 0
+        count = self.count
+        n = min(n, count, self.capacity)
+        column = self.columns[field]
+        if n <= 0:
+            return column[:0]
+        end = count % self.capacity or self.capacity
+        if end >= n:
+            return column[end - n:end][::-1]
+        return np.concatenate([column[:end][::-1], column[self.capacity - (n - end):][::-1]])
+
+    def latest_window(self, n, parameters=VITAL_PARAMETERS):
+        # Blok (pasien, n, parameter) dalam float untuk evaluasi vektor seluruh ward
+        window = np.stack([self.latest(n, param) for param in parameters], axis=-1)
+        window = np.transpose(window, (1, 0, 2)).astype(float)
+        if 'temperature' in parameters:
+            window[:, :, list(parameters).index('temperature')] /= TEMPERATURE_SCALE
+        return window
+
+    def latest_patient(self, patient_id, n):
+        index = self.patient_index.get(patient_id)
+        if index is None:
+            return None
+        first = self.latest(n, self.dtype.names[0])
+        records = np.empty(len(first), dtype=self.dtype)
+        for name in self.dtype.names:
+            records[name] = self.latest(n, name)[:, index]
+        return records
+
+    def flush(self):
+        if not self.readonly:
+            for column in self.columns.values():
+                column.flush()
+            self.header.flush()
+
+
+class RollupWriter:
+    # Memperbarui rollup 1m/5m/1h satu pasien setiap kali data mentah ditulis.
+    # Bucket yang masih berjalan disimpan di memori; bucket ditulis ke ring setelah tertutup.
+
+    def __init__(self, rings, raw_ring):
+        self.rings = rings
+        self.open = {}
+        self.late = 0  # sampel yang datang setelah bucket-nya tertutup (diabaikan)
+
+        # Pulihkan bucket yang belum tertutup dari data mentah (mis. setelah restart)
+        for name, ring in rings.items():
+            closed_until = 0
+            if ring.count:
+                closed_until = int(ring.latest(1)['timestamp'][0]) + ROLLUP_RESOLUTIONS[name]
+            self._update(name, raw_ring.between(closed_until, np.iinfo('<i8').max))
+
+    def _update(self, name, records):
+        opened = self.open.get(name)
+        if opened is not None:
+            on_time = records['timestamp'] >= opened['timestamp']
+            self.late += int(len(records) - on_time.sum())
+            records = records[on_time]
+        rollups = aggregate_records(records, ROLLUP_RESOLUTIONS[name])
+        if len(rollups) == 0:
+            return
+        if opened is not None:
+            if rollups[0]['timestamp'] == opened['timestamp']:
+                rollups[0] = merge_rollup(opened, rollups[0])
+            else:
+                rollups = np.concatenate([opened[np.newaxis], rollups])
+        self.rings[name].append(rollups[:-1])
+        self.open[name] = rollups[-1].copy()
+
+    def update(self, records):
+        for name in self.rings:
+            self._update(name, records)
+
+
+class VitalStore:
+    # Kumpulan ring buffer tanda vital, satu file per pasien
+
+    def __init__(self, root=DEFAULT_STORE_DIR, capacity=DEFAULT_CAPACITY, readonly=False, rollups=True,
+                 archive_root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+        self.capacity = capacity
+        self.readonly = readonly
+        self.rollups = rollups
+        self.rings = {}
+        self.blocks = {}
+        self.rollup_rings = {}
+        self.rollup_writers = {}
+        # Data lama dipindahkan ke arsip per jam sebelum tertimpa di ring; None = tanpa arsip
+        self.archive = VitalArchive(archive_root) if archive_root else None
+        self.archived_until = {}
+
+    def path_for(self, patient_id):
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(patient_id))
+        return os.path.join(self.root, f'{safe_id}.vring')
+
+    def ring(self, patient_id):
+        ring = self.rings.get(patient_id)
+        if ring is None:
+            path = self.path_for(patient_id)
+            if self.readonly and not os.path.exists(path):
+                return None
+            ring = VitalRing(path, capacity=self.capacity, readonly=self.readonly)
+            self.rings[patient_id] = ring
+        return ring
+
+    def block(self, name=WARD_BLOCK_NAME, patient_ids=None, capacity=DEFAULT_BLOCK_CAPACITY):
+        path = os.path.join(self.root, f'{name}.vblock')
+        if not os.path.exists(path):
+            if self.readonly or patient_ids is None:
+                return None
+        elif self.readonly:
+            # Buka ulang jika generator membuat blok baru (jumlah pasien berubah)
+            inode = os.stat(path).st_ino
+            cached = self.blocks.get(name)
+            if cached is None or cached[1] != inode:
+                self.blocks[name] = (VitalBlockRing(path, readonly=True), inode)
+            return self.blocks[name][0]
+
+        cached = self.blocks.get(name)
+        if cached is None:
+            if patient_ids is not None and os.path.exists(path):
+                block = VitalBlockRing(path, readonly=False)
+                if block.patient_ids != list(patient_ids) or block.capacity != capacity:
+                    # Skema pasien berbeda, ganti dengan blok baru
+                    del block
+                    os.remove(path)
+            block = VitalBlockRing(path, patient_ids=patient_ids, capacity=capacity)
+            cached = (block, None)
+            self.blocks[name] = cached
+        return cached[0]
+
+    def rollup_ring(self, patient_id, resolution):
+        # Ring rollup disimpan di samping ring mentah: <ID Pasien>.<resolusi>.vroll
+        key = (patient_id, resolution)
+        ring = self.rollup_rings.get(key)
+        if ring is None:
+            path = self.path_for(patient_id)[:-len('.vring')] + f'.{resolution}.vroll'
+            if self.readonly and not os.path.exists(path):
+                return None
+            ring = VitalRing(path, capacity=ROLLUP_CAPACITY[resolution], readonly=self.readonly,
+                             dtype=ROLLUP_DTYPE)
+            self.rollup_rings[key] = ring
+        return ring
+
+    def append(self, patient_id, df):
+        records = df if isinstance(df, np.ndarray) else frame_to_records(df)
+        ring = self.ring(patient_id)
+        if self.archive is not None:
+            self._archive_overwritten(patient_id, ring, records)
+        ring.append(records)
+        if self.archive is not None:
+            self._archive_completed(patient_id, ring)
+        if self.rollups:
+            writer = self.rollup_writers.get(patient_id)
+            if writer is None:
+                # Writer baru sudah memulihkan bucket terbuka dari ring, termasuk records ini
+                rings = {name: self.rollup_ring(patient_id, name) for name in ROLLUP_RESOLUTIONS}
+                self.rollup_writers[patient_id] = RollupWriter(rings, ring)
+            else:
+                writer.update(records)
+
+    def _archived_until(self, patient_id, ring, records):
+        archived_until = self.archived_until.get(patient_id)
+        if archived_until is None:
+            last = self.archive.last_timestamp(patient_id)
+            oldest = ring.oldest()
+            if last is not None:
+                archived_until = last + 1
+            else:
+                archived_until = int(oldest['timestamp'] if oldest is not None else records['timestamp'][0])
+        return archived_until
+
+    def _archive_overwritten(self, patient_id, ring, records):
+        # Ring yang berputar dalam kurang dari satu jam (laju sampel tinggi) akan menimpa record
+        # sebelum partisinya lengkap; record yang akan tertimpa diarsipkan dulu sebagai segmen
+        # parsial, sisa jamnya diarsipkan saat partisi lengkap
+        overwritten = len(ring) + len(records) - ring.capacity
+        if overwritten <= 0:
+            return
+        archived_until = self._archived_until(patient_id, ring, records)
+        if len(ring):
+            first = ring.count - len(ring)
+            last = first + min(overwritten, len(ring)) - 1
+            last_timestamp = int(ring.records[last % ring.capacity]['timestamp'])
+            if last_timestamp >= archived_until:
+                self.archive.write(patient_id, ring.between(archived_until, last_timestamp))
+                archived_until = last_timestamp + 1
+        # Record baru yang melebihi kapasitas ring tidak pernah masuk ring
+        dropped = records[:max(len(records) - ring.capacity, 0)]
+        dropped = dropped[dropped['timestamp'] >= archived_until]
+        if len(dropped):
+            self.archive.write(patient_id, dropped)
+            archived_until = int(dropped['timestamp'][-1]) + 1
+        self.archived_until[patient_id] = archived_until
+
+    def _archive_completed(self, patient_id, ring):
+        # Arsipkan setiap partisi jam yang sudah lengkap, jauh sebelum data tersebut tertimpa di ring
+        archived_until = self._archived_until(patient_id, ring, None)
+        newest = int(ring.latest(1)['timestamp'][0])
+        current_partition = newest - newest % PARTITION_MS
+        if current_partition > archived_until:
+            self.archive.write(patient_id, ring.between(archived_until, current_partition - 1))
+            archived_until = current_partition
+        self.archived_until[patient_id] = archived_until
+
+    def query(self, patient_id, start, end, columns=None):
+        # Riwayat satu pasien dalam rentang waktu: arsip untuk data yang sudah keluar dari ring,
+        # ring buffer untuk sisanya. start/end: epoch ms, string, atau datetime.
+        start_ms = start if isinstance(start, (int, np.integer)) else int(to_epoch_ms([start])[0])
+        end_ms = end if isinstance(end, (int, np.integer)) else int(to_epoch_ms([end])[0])
+        columns = list(VITAL_PARAMETERS if columns is None else columns)
+        ring = self.ring(patient_id)
+        oldest = ring.oldest() if ring is not None else None
+        ring_start = int(oldest['timestamp']) if oldest is not None else end_ms + 1
+
+        parts = []
+        if self.archive is not None and start_ms < ring_start:
+            archived = self.archive.query(patient_id, start_ms, min(end_ms, ring_start - 1), columns)
+            if archived is not None:
+                parts.append(pd.DataFrame(archived))
+        if ring is not None and end_ms >= ring_start:
+            records = ring.between(max(start_ms, ring_start), end_ms)
+            parts.append(pd.DataFrame({name: records[name] for name in ['timestamp'] + columns}))
+        if not parts:
+            return None
+        df = pd.concat(parts, ignore_index=True)
+        if df.empty:
+            return None
+        df['timestamp'] = from_epoch_ms(df['timestamp'])
+        if 'temperature' in df:
+            df['temperature'] = df['temperature'] / TEMPERATURE_SCALE
+        return df
+
+    def history_start(self, patient_id):
+        # Timestamp (epoch ms) data tertua yang masih bisa di-query, dari arsip atau ring
+        candidates = []
+        if self.archive is not None:
+            candidates.append(self.archive.first_timestamp(patient_id))
+        ring = self.ring(patient_id)
+        oldest = ring.oldest() if ring is not None else None
+        if oldest is not None:
+            candidates.append(int(oldest['timestamp']))
+        candidates = [c for c in candidates if c is not None]
+        return min(candidates) if candidates else None
+
+    def latest(self, patient_id, n):
+        ring = self.ring(patient_id)
+        if ring is None:
+            # Pasien simulasi multi-pasien disimpan di blok ward
+            block = self.block()
+            if block is None:
+                return None
+            return block.latest_patient(patient_id, n)
+        return ring.latest(n)
+
+    def latest_frame(self, patient_id, n):
+        records = self.latest(patient_id, n)
+        if records is None or len(records) == 0:
+            return None
+        return records_to_frame(records)
+
+    def between_frame(self, patient_id, start_ms, end_ms):
+        # Data resolusi penuh untuk rentang waktu tertentu (urut dari lama ke baru)
+        ring = self.ring(patient_id)
+        if ring is not None:
+            records = ring.between(start_ms, end_ms)
+        else:
+            block = self.block()
+            records = None if block is None else block.latest_patient(patient_id, len(block))
+            if records is not None:
+                records = records[::-1]
+                records = records[(records['timestamp'] >= start_ms) & (records['timestamp'] <= end_ms)]
+        if records is None or len(records) == 0:
+            return None
+        return records_to_frame(records)
+
+    def rollups_between(self, patient_id, resolution, start_ms, end_ms):
+        # Bucket rollup dalam [start_ms, end_ms]: bucket tertutup dari ring rollup,
+        # bucket yang masih berjalan dihitung dari data mentah setelah bucket tertutup terakhir
+        raw_ring = self.ring(patient_id)
+        if raw_ring is None:
+            return None
+        resolution_ms = ROLLUP_RESOLUTIONS[resolution]
+        ring = self.rollup_ring(patient_id, resolution)
+        closed_until = 0
+        parts = []
+        if ring is not None and ring.count:
+            closed_until = int(ring.latest(1)['timestamp'][0]) + resolution_ms
+            parts.append(ring.between(start_ms - start_ms % resolution_ms, end_ms))
+        parts.append(aggregate_records(raw_ring.between(max(closed_until, start_ms), end_ms), resolution_ms))
+        return np.concatenate(parts)
+
+    def rollup_frame(self, patient_id, resolution, start_ms=0, end_ms=None):
+        end_ms = np.iinfo('<i8').max if end_ms is None else end_ms
+        rollups = self.rollups_between(patient_id, resolution, start_ms, end_ms)
+        if rollups is None or len(rollups) == 0:
+            return None
+        return rollups_to_frame(rollups)
+
+    def first_timestamp(self, patient_id):
+        ring = self.ring(patient_id)
+        if ring is None:
+            return None
+        record = ring.oldest()
+        if record is None:
+            return None
+        return from_epoch_ms([record['timestamp']])[0]
+
+    def flush(self):
+        for ring in self.rings.values():
+            ring.flush()
+        for ring in self.rollup_rings.values():
+            ring.flush()
+        for block, _ in self.blocks.values():
+            block.flush()